@@ -0,0 +1,63 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run against a throwaway test database, never ``db.sqlite3``.
+Run them from the project directory, e.g.::
+
+    python -m benchmarks.pagination
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import time
+
+
+def setup(test_database=None):
+    """Configure Django and create the test database, in memory unless a
+    ``test_database`` file is given"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
+    if test_database:
+        from django.conf import settings
+        settings.DATABASES['default']['TEST'] = {'NAME': test_database}
+    import django
+    django.setup()
+
+    # profile images and their variants go to a scratch MEDIA_ROOT
+    from django.conf import settings
+    from users.models import DEFAULT_IMAGE
+    media_root = tempfile.mkdtemp(prefix='bench-media-')
+    atexit.register(shutil.rmtree, media_root, ignore_errors=True)
+    shutil.copy(os.path.join(settings.MEDIA_ROOT, DEFAULT_IMAGE), media_root)
+    settings.MEDIA_ROOT = media_root
+
+    # creates the 'replica' mirror too, when the database profile has one
+    from django.test.utils import setup_databases
+    setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(func, repeat=50, warmup=3):
+    """Call ``func`` ``repeat`` times and return latency stats in ms."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'min': timings[0],
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+    }
+
+
+def report(name, stats):
+    print(f"{name:<44} p50 {stats['p50']:8.3f} ms   p95 {stats['p95']:8.3f} ms   "
+          f"p99 {stats['p99']:8.3f} ms")
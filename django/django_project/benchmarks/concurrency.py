@@ -0,0 +1,114 @@
+"""Feed read throughput while other threads write, per database profile.
+
+    python -m benchmarks.concurrency [--readers 4] [--writers 1] [--seconds 5]
+
+Runs every profile in django_project.settings.SQLITE_PROFILES in its own
+process against a temporary database file (WAL needs a real file), or just
+one with ``--profile``.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks import percentile, setup
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import Post
+
+    authors = [User.objects.create(username=f'bench{i}') for i in range(10)]
+    now = timezone.now()
+    Post.objects.bulk_create([
+        Post(title=f'Post {i}', content='Lorem ipsum ' * 20, author=authors[i % 10],
+             date_posted=now - timedelta(seconds=i))
+        for i in range(count)
+    ], batch_size=5000)
+    return authors
+
+
+def run(args):
+    from django.db import OperationalError, connection, transaction
+    from blog.models import Post
+    from django_project.db import read_replica
+
+    authors = seed(args.posts)
+    connection.close()
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+
+    @read_replica
+    def read_feed():
+        posts = list(Post.objects.select_related('author__profile')
+                     .order_by('-date_posted', '-id')[:5])
+        Post.objects.filter(author=posts[0].author).count()
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                read_feed()
+            except OperationalError as error:
+                errors.append(str(error))
+                continue
+            reads.append((time.perf_counter() - start) * 1000)
+        connection.close()
+
+    def writer(author):
+        while not stop.is_set():
+            try:
+                with transaction.atomic():
+                    Post.objects.create(title='Fresh', content='Lorem ipsum ' * 20, author=author)
+                writes.append(1)
+            except OperationalError as error:
+                errors.append(str(error))
+        connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(authors[i % 10],)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    reads.sort()
+    print(f'{args.profile:<12} reads {len(reads) / args.seconds:8.0f}/s   '
+          f'p50 {percentile(reads, 50):7.3f} ms   p95 {percentile(reads, 95):7.3f} ms   '
+          f'p99 {percentile(reads, 99):7.3f} ms   writes {len(writes) / args.seconds:6.0f}/s   '
+          f'errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile')
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    if args.profile is None:
+        from django_project.settings import SQLITE_PROFILES
+        print(f'{args.readers} readers, {args.writers} writers, {args.posts} posts, '
+              f'{args.seconds:g}s each')
+        for profile in SQLITE_PROFILES:
+            subprocess.run([sys.executable, '-m', 'benchmarks.concurrency', '--profile', profile,
+                            *sys.argv[1:]], check=True)
+        return
+
+    os.environ['DATABASE_PROFILE'] = args.profile
+    with tempfile.TemporaryDirectory() as directory:
+        setup(os.path.join(directory, 'bench.sqlite3'))
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
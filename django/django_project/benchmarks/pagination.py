@@ -0,0 +1,64 @@
+"""OFFSET vs keyset pagination of the home feed, page 1 vs page 10,000.
+
+    python -m benchmarks.pagination [--posts 50005]
+"""
+import argparse
+from datetime import timedelta
+
+from benchmarks import measure, report, setup
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import Post
+
+    author = User.objects.create_user('bench', password='bench-pass')
+    now = timezone.now()
+    batch = []
+    for i in range(count):
+        batch.append(Post(title=f'Post {i}', content='Lorem ipsum ' * 20,
+                          author=author, date_posted=now - timedelta(seconds=i)))
+        if len(batch) == 5000:
+            Post.objects.bulk_create(batch)
+            batch = []
+    Post.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=50005)
+    parser.add_argument('--per-page', type=int, default=5)
+    parser.add_argument('--page', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.paginator import Paginator
+    from blog.models import Post
+    from blog.pagination import NEXT, CursorPaginator, encode_cursor
+
+    seed(args.posts)
+    queryset = Post.objects.order_by('-date_posted', '-id')
+
+    def offset_page(number):
+        paginator = Paginator(queryset, args.per_page)
+        page = paginator.page(number)
+        list(page.object_list)
+        return paginator.num_pages
+
+    paginator = CursorPaginator(Post.objects.all(), args.per_page)
+    # the cursor a reader would follow to arrive at the same deep page
+    edge = queryset[(args.page - 1) * args.per_page - 1]
+    deep_cursor = encode_cursor(edge, NEXT)
+    assert [p.pk for p in paginator.page(deep_cursor)] == \
+        [p.pk for p in Paginator(queryset, args.per_page).page(args.page)]
+
+    print(f'{args.posts} posts, {args.per_page} per page')
+    report('offset  page 1', measure(lambda: offset_page(1)))
+    report(f'offset  page {args.page}', measure(lambda: offset_page(args.page)))
+    report('cursor  page 1', measure(lambda: list(paginator.page())))
+    report(f'cursor  page {args.page}', measure(lambda: list(paginator.page(deep_cursor))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Login throughput at each password hashing profile.
+
+    python -m benchmarks.passwords [--logins 20] [--threads N]
+
+For every profile in settings.PASSWORD_HASH_PROFILES, times password
+verification alone on one thread (logins/sec per core), the same through
+the shared verification pool from ``--threads`` client threads at once,
+and a full login POST through the test client. Profiles whose hashing
+library is not installed are skipped.
+"""
+import argparse
+import os
+import threading
+import time
+
+from benchmarks import measure, report, setup
+
+
+def rate(func, count, threads=1):
+    """Run ``func`` ``count`` times on each of ``threads`` threads, return calls/sec"""
+    def work():
+        for _ in range(count):
+            func()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return count * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.hashers import check_password, make_password
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    user = User.objects.create(username='bench')
+    print(f'{os.cpu_count()} cores, {args.threads} client threads')
+    for name, profile in settings.PASSWORD_HASH_PROFILES.items():
+        algorithm = profile['algorithm']
+        hasher_path = settings.PASSWORD_HASHERS_BY_ALGORITHM[algorithm]
+        hashers = [hasher_path] + [path for path in settings.PASSWORD_HASHERS if path != hasher_path]
+        with override_settings(PASSWORD_HASHERS=hashers,
+                               PASSWORD_HASH_COSTS={algorithm: profile['cost']}):
+            try:
+                encoded = make_password('correct horse')
+            except ValueError as error:
+                print(f'{name:<10} skipped: {error}')
+                continue
+            user.password = encoded
+            user.save()
+            per_core = rate(lambda: check_password('correct horse', encoded), args.logins)
+            pooled = rate(lambda: check_password('correct horse', encoded), args.logins, args.threads)
+            print(f'{name:<10} {algorithm:<14} cost {profile["cost"] or "default"!s:<8} '
+                  f'{per_core:8.1f} logins/s per core   {pooled:8.1f} logins/s pooled')
+
+            # DEBUG allows localhost, but not the test client's 'testserver'
+            client = Client(HTTP_HOST='localhost')
+
+            def login():
+                client.post('/login/', {'username': 'bench', 'password': 'correct horse'})
+                client.logout()
+            report(f'  login POST ({name})', measure(login, repeat=args.logins, warmup=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""FTS5 search vs an icontains scan over a synthetic corpus.
+
+    python -m benchmarks.search [--posts 100000]
+
+Also times single-post writes, which now pay for the index triggers.
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks import measure, report, setup
+
+
+COMMON = ('django flask python sqlite index query cursor cache template view model '
+          'signal thread worker image upload profile feed page search token phrase '
+          'rank title content author post blog bread starter water flour').split()
+# a Zipf-like vocabulary: a few common words and a long tail of rare ones
+VOCABULARY = COMMON + [f'word{i}' for i in range(20000)]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import Post
+
+    rng = random.Random(0)
+    author = User.objects.create_user('bench', password='bench-pass')
+    now = timezone.now()
+    batch = []
+    for i in range(count):
+        words = rng.choices(VOCABULARY, WEIGHTS, k=80)
+        batch.append(Post(title=' '.join(rng.choices(VOCABULARY, WEIGHTS, k=5)),
+                          content=' '.join(words),
+                          author=author, date_posted=now - timedelta(seconds=i)))
+        if len(batch) == 5000:
+            Post.objects.bulk_create(batch)
+            batch = []
+    Post.objects.bulk_create(batch)
+    return author
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from blog import search
+    from blog.models import Post
+
+    author = seed(args.posts)
+    queries = {
+        'rare word': 'word12345',
+        'two words': 'template word42',
+        'common word': 'django',
+        'phrase': '"python sqlite"',
+    }
+
+    print(f'{args.posts} posts')
+    for label, query in queries.items():
+        expression = search.match_expression(query)
+        report(f'fts   {label}', measure(lambda: search.search(query), repeat=args.repeat))
+        report(f'fts   {label}, page 20',
+               measure(lambda: search.search(query, page=20), repeat=args.repeat))
+        report(f'scan  {label}', measure(
+            lambda: search.scan(query.strip('"'), 10, 0), repeat=max(3, args.repeat // 10)))
+        assert search.fts_ids(expression, 10, 0) is not None
+
+    post = Post.objects.first()
+
+    def update():
+        post.content = post.content[::-1]
+        post.save(update_fields=['content'])
+
+    report('write  create post', measure(
+        lambda: Post.objects.create(title='t', content='fresh words', author=author),
+        repeat=args.repeat))
+    report('write  update post', measure(update, repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
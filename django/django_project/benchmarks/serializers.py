@@ -0,0 +1,72 @@
+"""Serialization throughput of blog.api against Django's serializers.
+
+    python -m benchmarks.serializers [--posts 1000]
+
+Times encoding one API page worth of posts (``--posts``) already loaded
+from the database, so only the serializer is measured, and prints the
+body size before and after gzip.
+"""
+import argparse
+import gzip
+import json
+from datetime import timedelta
+
+from benchmarks import measure, setup
+
+
+def seed(count):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import Post
+
+    author = User.objects.create_user('bench', password='bench-pass')
+    now = timezone.now()
+    posts = []
+    for i in range(count):
+        post = Post(title=f'Post {i}', content=' '.join(['lorem ipsum dolor sit amet'] * 40),
+                    author=author, date_posted=now - timedelta(seconds=i))
+        post.summarize()
+        posts.append(post)
+    Post.objects.bulk_create(posts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.core import serializers
+    from blog import api
+    from blog.models import Post
+
+    seed(args.posts)
+    # every field, content included, as Django's serializers write them all
+    fields = list(api.FIELDS)
+    posts = list(api.select(Post.objects.order_by('-date_posted', '-id'), fields))
+
+    def api_body(dumps):
+        return lambda: dumps({'results': [api.serialize(post, fields) for post in posts]})
+
+    candidates = {
+        'django serializers json': lambda: serializers.serialize('json', posts).encode(),
+        'django serializers python + json': lambda: json.dumps(
+            serializers.serialize('python', posts), default=str).encode(),
+        'blog.api stdlib json': api_body(api.json_dumps),
+    }
+    if api.orjson:
+        candidates['blog.api orjson'] = api_body(api.orjson.dumps)
+    else:
+        print('orjson is not installed; pip install orjson to compare it')
+
+    print(f'{args.posts} posts')
+    for name, encode in candidates.items():
+        stats = measure(encode, repeat=args.repeat)
+        body = encode()
+        print(f"{name:<36} p50 {stats['p50']:8.3f} ms  {args.posts / stats['p50'] * 1000:10.0f} posts/s"
+              f"  {len(body):9} bytes  {len(gzip.compress(body)):8} gzipped")
+
+
+if __name__ == '__main__':
+    main()
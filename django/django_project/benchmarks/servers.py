@@ -0,0 +1,156 @@
+"""Requests/sec and latency of the read pages, WSGI vs ASGI.
+
+    python -m benchmarks.servers [--connections 16] [--seconds 10]
+
+Serves a seeded scratch database with gunicorn (gthread workers, sync
+views) and with uvicorn (async views, BLOG_ASYNC_VIEWS=1), and drives both
+with the same keep-alive HTTP clients. Servers whose package isn't
+installed are skipped.
+"""
+import argparse
+import http.client
+import importlib.util
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks import percentile
+
+
+PORT = 8765
+
+SERVERS = {
+    'wsgi (gunicorn)': {
+        'module': 'gunicorn',
+        'command': ['-m', 'gunicorn', '--workers', '1', '--worker-class', 'gthread',
+                    '--threads', '8', '--bind', f'127.0.0.1:{PORT}', 'django_project.wsgi'],
+        'env': {'BLOG_ASYNC_VIEWS': '0'},
+    },
+    'asgi (uvicorn)': {
+        'module': 'uvicorn',
+        'command': ['-m', 'uvicorn', '--workers', '1', '--port', str(PORT),
+                    '--log-level', 'warning', 'django_project.asgi:application'],
+        'env': {'BLOG_ASYNC_VIEWS': '1'},
+    },
+}
+
+
+def seed(path, posts):
+    """Create and fill the scratch database without running model signals,
+    so no profile images are processed"""
+    os.environ['DJANGO_DATABASE_PATH'] = path
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import Post
+    from users.models import Profile
+
+    call_command('migrate', verbosity=0)
+    authors = User.objects.bulk_create([User(username=f'bench{i}') for i in range(10)])
+    Profile.objects.bulk_create([Profile(user=author) for author in authors])
+    now = timezone.now()
+    Post.objects.bulk_create([
+        Post(title=f'Post {i}', content='Lorem ipsum ' * 20, author=authors[i % 10],
+             date_posted=now - timedelta(seconds=i))
+        for i in range(posts)
+    ], batch_size=5000)
+    return [f'/user/bench{i}/' for i in range(10)] + \
+        [f'/post/{pk}/' for pk in Post.objects.values_list('pk', flat=True)[:50]] + ['/', '/about/']
+
+
+def wait_for_server(process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('server exited')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            connection.request('GET', '/about/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def drive(urls, connections, seconds):
+    """Hit ``urls`` round-robin from ``connections`` keep-alive clients"""
+    stop = threading.Event()
+    timings, errors = [], []
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+        for url in itertools.islice(itertools.cycle(urls), offset, None):
+            if stop.is_set():
+                break
+            start = time.perf_counter()
+            try:
+                connection.request('GET', url)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                errors.append(url)
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+                continue
+            if response.status != 200:
+                errors.append(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i * 7,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    timings.sort()
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench-servers-')
+    try:
+        path = os.path.join(directory, 'bench.sqlite3')
+        urls = seed(path, args.posts)
+        print(f'{args.connections} connections, {args.seconds:g}s per server, '
+              f'{len(urls)} pages round-robin')
+        for name, server in SERVERS.items():
+            if importlib.util.find_spec(server['module']) is None:
+                print(f'{name:<16} skipped, {server["module"]} is not installed')
+                continue
+            env = {**os.environ, 'DJANGO_DATABASE_PATH': path, **server['env']}
+            process = subprocess.Popen([sys.executable, *server['command']], env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_server(process)
+                drive(urls, args.connections, 1)  # warm up
+                timings, errors = drive(urls, args.connections, args.seconds)
+            finally:
+                process.terminate()
+                process.wait()
+            print(f'{name:<16} {len(timings) / args.seconds:8.0f} req/s   '
+                  f'p50 {percentile(timings, 50):7.2f} ms   p99 {percentile(timings, 99):7.2f} ms   '
+                  f'errors {len(errors)}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Authenticated requests per session engine, and purging expired sessions.
+
+    python -m benchmarks.sessions [--requests 200] [--sessions 100000]
+
+Logs a user in under each SESSION_PROFILES engine and times their requests
+for /profile/, which reads the session and the user, and for the home page.
+Then seeds ``--sessions`` expired sessions and times
+django_project.sessions' batched purge against a single DELETE. Runs
+against a temporary database file in the 'production' profile (WAL), or
+``--profile``.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from benchmarks import measure, report, setup
+
+
+def seed_sessions(model, count):
+    from django.utils import timezone
+
+    expired = timezone.now() - timedelta(days=1)
+    model.objects.bulk_create([
+        model(session_key=f'bench{i:027d}', session_data='', expire_date=expired)
+        for i in range(count)
+    ], batch_size=5000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', default='production')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--sessions', type=int, default=100000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PROFILE'] = args.profile
+    with tempfile.TemporaryDirectory() as directory:
+        setup(os.path.join(directory, 'bench.sqlite3'))
+        from django.conf import settings
+        from django.contrib.auth.models import User
+        from django.contrib.sessions.models import Session
+        from django.test import Client
+        from django.test.utils import override_settings
+        from django.utils import timezone
+        from django_project import sessions
+
+        user = User.objects.create(username='bench')
+        print(f'{args.requests} requests per page, {args.profile} profile')
+        for name, engine in settings.SESSION_ENGINES.items():
+            with override_settings(SESSION_ENGINE=engine):
+                # DEBUG allows localhost, but not the test client's 'testserver'
+                client = Client(HTTP_HOST='localhost')
+                client.force_login(user)
+                for path in ('/profile/', '/'):
+                    report(f'{name} GET {path}',
+                           measure(lambda: client.get(path), repeat=args.requests))
+
+        seed_sessions(Session, args.sessions)
+        start = time.perf_counter()
+        purged = sessions.purge_expired()
+        print(f'batched purge: {purged} sessions in {(time.perf_counter() - start) * 1000:.1f} ms')
+        seed_sessions(Session, args.sessions)
+        start = time.perf_counter()
+        purged = Session.objects.filter(expire_date__lt=timezone.now()).delete()[0]
+        print(f'single DELETE: {purged} sessions in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
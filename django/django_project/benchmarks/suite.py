@@ -0,0 +1,260 @@
+"""Load and regression benchmark of the main pages.
+
+    python -m benchmarks.suite [--users 50] [--posts 5000] [--requests 200]
+                               [--server] [--output results.json]
+                               [--baseline results.json] [--tolerance 0.2]
+
+Seeds ``--users`` users and ``--posts`` posts cycled from posts.json, then
+requests every scenario ``--requests`` times through the test client and,
+with ``--server``, through a local WSGI server over HTTP. Logins and new
+posts run a tenth as often, they hash a password or write. Reports
+requests/sec, p50/p95/p99 latency and queries per request, counted by
+django_project.metrics and read from the Server-Timing header.
+
+``--output`` saves the results as JSON along with the commit they ran on;
+``--baseline`` compares them with an earlier file and exits with status 1
+when a scenario's p95 grew by more than ``--tolerance`` or it runs more
+queries than before.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from benchmarks import percentile, setup
+
+
+PASSWORD = 'bench-pass'
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def seed(users, posts, batch_size=5000):
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import AuthorStats, Post
+
+    with open(os.path.join(settings.BASE_DIR, 'posts.json')) as fp:
+        records = json.load(fp)
+    password = make_password(PASSWORD)
+    # one by one, so each gets its Profile
+    authors = [User.objects.create(username=f'bench{i}', password=password) for i in range(users)]
+    now = timezone.now()
+    batch = []
+    for i in range(posts):
+        record = records[i % len(records)]
+        post = Post(title=f"{record['title'][:90]} #{i}", content=record['content'],
+                    author=authors[i % users], date_posted=now - timedelta(minutes=i))
+        post.summarize()
+        batch.append(post)
+        if len(batch) == batch_size:
+            Post.objects.bulk_create(batch)
+            batch = []
+    Post.objects.bulk_create(batch)
+    AuthorStats.objects.rebuild()
+    return [author.username for author in authors], list(Post.objects.values_list('pk', flat=True))
+
+
+def scenarios(usernames, post_ids):
+    """name: (share of --requests, signed in, request maker)"""
+    from django.urls import reverse
+
+    rng = random.Random(0)
+    return {
+        'blog-home': (1, False, lambda: ('GET', reverse('blog-home'), None)),
+        'post-detail': (1, False, lambda: ('GET', reverse('post-detail', args=[rng.choice(post_ids)]), None)),
+        'user-posts': (1, False, lambda: ('GET', reverse('user-posts', args=[rng.choice(usernames)]), None)),
+        'api-posts': (1, False, lambda: ('GET', reverse('api-posts'), None)),
+        'login': (0.1, False, lambda: ('POST', reverse('login'),
+                                       {'username': rng.choice(usernames), 'password': PASSWORD})),
+        'post-create': (0.1, True, lambda: ('POST', reverse('post-create'),
+                                            {'title': 'Benchmark post', 'content': 'Lorem ipsum ' * 50})),
+    }
+
+
+class TestClientDriver:
+    name = 'client'
+
+    def __init__(self, username=None):
+        from django.test import Client
+
+        self.client = Client(HTTP_HOST='localhost')
+        if username:
+            self.client.login(username=username, password=PASSWORD)
+
+    def request(self, method, path, data):
+        if method == 'POST':
+            response = self.client.post(path, data)
+        else:
+            response = self.client.get(path)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPDriver:
+    """Requests over HTTP, with cookies and Django's CSRF token"""
+    name = 'server'
+
+    def __init__(self, base_url, username=None):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies),
+                                                  NoRedirect)
+        self.request('GET', '/login/', None)  # sets the csrftoken cookie
+        if username:
+            self.request('POST', '/login/', {'username': username, 'password': PASSWORD})
+
+    def request(self, method, path, data):
+        body = None
+        if method == 'POST':
+            token = next(cookie.value for cookie in self.cookies if cookie.name == 'csrftoken')
+            body = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': token}).encode()
+        try:
+            with self.opener.open(self.base_url + path, body) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code, error.headers.get('Server-Timing', '')
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    """Start the project's WSGI app on a free local port, return its URL"""
+    from django.core.wsgi import get_wsgi_application
+
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def run(driver_factory, scenarios, requests, usernames):
+    results = {}
+    for name, (share, signed_in, make_request) in scenarios.items():
+        driver = driver_factory(usernames[0] if signed_in else None)
+        count = max(1, int(requests * share))
+        timings, queries, errors = [], [], 0
+        start = time.perf_counter()
+        for _ in range(count):
+            method, path, data = make_request()
+            request_start = time.perf_counter()
+            status, timing = driver.request(method, path, data)
+            timings.append((time.perf_counter() - request_start) * 1000)
+            errors += status >= 400
+            match = QUERY_COUNT.search(timing)
+            if match:
+                queries.append(int(match.group(1)))
+        seconds = time.perf_counter() - start
+        timings.sort()
+        results[name] = {
+            'requests': count,
+            'errors': errors,
+            'throughput': count / seconds,
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+            'queries': max(queries) if queries else None,
+        }
+        print(f"{driver.name:<7} {name:<12} {results[name]['throughput']:8.1f} req/s   "
+              f"p50 {results[name]['p50']:8.3f} ms   p95 {results[name]['p95']:8.3f} ms   "
+              f"p99 {results[name]['p99']:8.3f} ms   queries {results[name]['queries']}   "
+              f"errors {errors}")
+    return results
+
+
+def compare(results, settings, baseline, tolerance):
+    """Print how ``results`` moved from ``baseline``; return the regressions"""
+    regressions = []
+    print(f"\nagainst {baseline.get('commit') or 'baseline'}:")
+    if baseline.get('settings') != settings:
+        print(f"note: the baseline ran with {baseline.get('settings')}")
+    for mode, scenarios in results.items():
+        for name, new in scenarios.items():
+            old = baseline['results'].get(mode, {}).get(name)
+            if old is None:
+                continue
+            change = (new['p95'] - old['p95']) / old['p95'] if old['p95'] else 0.0
+            slower = change > tolerance
+            more_queries = None not in (new['queries'], old['queries']) and new['queries'] > old['queries']
+            if slower or more_queries:
+                regressions.append(f'{mode} {name}')
+            print(f"{mode:<7} {name:<12} p95 {change:+7.1%}   queries {old['queries']} -> {new['queries']}"
+                  f"{'   REGRESSION' if slower or more_queries else ''}")
+    return regressions
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--server', action='store_true', help='also drive a local WSGI server')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with results written by an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='p95 growth counted as a regression, 0.2 is 20%%')
+    args = parser.parse_args()
+
+    # logins would otherwise time the production password hash cost
+    os.environ.setdefault('PASSWORD_HASH_PROFILE', 'fast')
+    setup()
+    from django.conf import settings
+    settings.DEBUG = False  # DEBUG keeps every query's SQL
+    settings.ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+
+    usernames, post_ids = seed(args.users, args.posts)
+    print(f'{args.users} users, {args.posts} posts, {args.requests} requests per page')
+    results = {'client': run(TestClientDriver, scenarios(usernames, post_ids), args.requests, usernames)}
+    if args.server:
+        url = serve()
+        results['server'] = run(lambda username: HTTPDriver(url, username),
+                                scenarios(usernames, post_ids), args.requests, usernames)
+
+    config = {'users': args.users, 'posts': args.posts, 'requests': args.requests}
+    report = {
+        'app': 'django',
+        'commit': current_commit(),
+        'date': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'settings': config,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        if compare(results, config, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
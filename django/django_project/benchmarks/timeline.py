@@ -0,0 +1,114 @@
+"""Personal timelines: fan-out cost and read latency at 10,000 followers.
+
+    python -m benchmarks.timeline [--followers 10000] [--authors 100]
+                                  [--posts 50]
+
+``--followers`` users follow one author; the reader also follows
+``--authors`` others with ``--posts`` posts each. Times fanning a new post
+out to every follower, then reads the reader's first and a deep timeline
+page three ways: materialized (blog.timeline), with the popular author read
+on demand and merged in, and as the naive ``author__in`` query over posts.
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from benchmarks import measure, report, setup
+
+
+def seed(followers, authors, posts):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from blog.models import Post
+    from users.models import Follow, Profile
+
+    # one by one, so each gets its Profile
+    popular = User.objects.create(username='popular')
+    others = [User.objects.create(username=f'author{i}') for i in range(authors)]
+    reader = User.objects.create(username='reader')
+    fans = User.objects.bulk_create([User(username=f'fan{i}') for i in range(followers)])
+
+    # bulk_create sends no signals: no fan-out yet, counts set by hand
+    Follow.objects.bulk_create([Follow(follower=fan, author=popular) for fan in fans + [reader]],
+                               batch_size=5000)
+    Follow.objects.bulk_create([Follow(follower=reader, author=author) for author in others])
+    Profile.objects.filter(user=popular).update(follower_count=followers + 1)
+    Profile.objects.filter(user__in=others).update(follower_count=1)
+
+    now = timezone.now()
+    everyone = [popular] + others
+    batch = [Post(title=f'Post {i}', content='Lorem ipsum ' * 20, author=author,
+                  date_posted=now - timedelta(seconds=i * len(everyone) + j))
+             for i in range(posts) for j, author in enumerate(everyone)]
+    for post in batch:
+        post.summarize()
+    Post.objects.bulk_create(batch, batch_size=5000)
+    return popular, reader
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--followers', type=int, default=10000)
+    parser.add_argument('--authors', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=50)
+    parser.add_argument('--per-page', type=int, default=5)
+    parser.add_argument('--page', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from blog import timeline
+    from blog.models import Post, TimelineEntry
+    from blog.pagination import CursorPaginator
+    from users.models import Follow
+
+    popular, reader = seed(args.followers, args.authors, args.posts)
+    print(f'{args.followers} followers, {args.authors} more authors followed by the reader, '
+          f'{args.posts} posts each')
+
+    # everyone is fanned out to
+    settings.BLOG_TIMELINE_FANOUT_LIMIT = args.followers + 1
+    post = Post(title='New', content='Lorem ipsum', author=popular)
+    post.summarize()
+    Post.objects.bulk_create([post])  # without the signal that would fan it out in the background
+    start = time.perf_counter()
+    timeline.fan_out(post.pk)
+    print(f'fan-out to {args.followers + 1} followers: {(time.perf_counter() - start) * 1000:.1f} ms, '
+          f'{TimelineEntry.objects.filter(post=post).count()} entries')
+    timeline.rebuild(reader.pk)
+
+    def walk(read_page):
+        """The cursor a reader would follow to page --page"""
+        cursor = None
+        for _ in range(args.page - 1):
+            cursor = read_page(cursor).next_cursor
+        return cursor
+
+    def materialized(cursor):
+        return timeline.page(reader, cursor, args.per_page)
+
+    followed = Follow.objects.filter(follower=reader).values('author_id')
+    naive_paginator = CursorPaginator(Post.objects.filter(author_id__in=followed).listing(),
+                                      args.per_page)
+
+    def naive(cursor):
+        return naive_paginator.page(cursor)
+
+    deep = walk(materialized)
+    assert [p.pk for p in materialized(deep)] == [p.pk for p in naive(deep)]
+    report('materialized  page 1', measure(lambda: list(materialized(None))))
+    report(f'materialized  page {args.page}', measure(lambda: list(materialized(deep))))
+
+    # the popular author is read on demand from here on
+    settings.BLOG_TIMELINE_FANOUT_LIMIT = args.followers
+    timeline.rebuild(reader.pk)
+    assert [p.pk for p in materialized(deep)] == [p.pk for p in naive(deep)]
+    report('merged        page 1', measure(lambda: list(materialized(None))))
+    report(f'merged        page {args.page}', measure(lambda: list(materialized(deep))))
+
+    report('author__in    page 1', measure(lambda: list(naive(None))))
+    report(f'author__in    page {args.page}', measure(lambda: list(naive(deep))))
+
+
+if __name__ == '__main__':
+    main()
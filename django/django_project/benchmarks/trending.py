@@ -0,0 +1,59 @@
+"""Trending posts: the cost of a ranking run and of reading the top K.
+
+    python -m benchmarks.trending [--posts 100000] [--top 20]
+
+Seeds ``--posts`` posts with random view counts and times blog.trending's
+ranking run, first from empty and then again an hour on with a tenth of the
+posts viewed since. Then reads the top ``--top`` from the scores, and for
+comparison the naive query ranking the past week's posts by views on every
+request.
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from benchmarks import measure, report, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from django.db.models import F
+    from django.utils import timezone
+    from blog import trending
+    from blog.models import Post
+
+    author = User.objects.create(username='bench')
+    now = timezone.now()
+    Post.objects.bulk_create([
+        Post(title=f'Post {i}', content='Lorem ipsum', author=author,
+             date_posted=now - timedelta(minutes=i), views=random.randint(0, 1000))
+        for i in range(args.posts)
+    ], batch_size=5000)
+    print(f'{args.posts} posts')
+
+    start = time.perf_counter()
+    written = trending.rank(now)
+    print(f'first run: {written} scores in {(time.perf_counter() - start) * 1000:.1f} ms')
+    pks = list(Post.objects.values_list('pk', flat=True))
+    viewed = random.sample(pks, len(pks) // 10)
+    for i in range(0, len(viewed), 900):
+        Post.objects.filter(pk__in=viewed[i:i + 900]).update(views=F('views') + 10)
+    start = time.perf_counter()
+    written = trending.rank(now + timedelta(hours=1))
+    print(f'an hour on: {written} scores in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    report(f'top {args.top} from the scores', measure(lambda: trending.top(args.top)))
+    week = Post.objects.listing().filter(date_posted__gte=now - timedelta(days=7))
+    report(f"top {args.top} of the week's posts by views",
+           measure(lambda: list(week.order_by('-views', '-id')[:args.top])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Counting post views: an UPDATE per view against blog.counters' buffer.
+
+    python -m benchmarks.views [--threads 8] [--seconds 5] [--posts 1000]
+
+Each thread counts views of random posts for ``--seconds``, first with
+``UPDATE ... SET views = views + 1`` per view, then through the buffer
+flushed every ``--flush-hits`` views. Reports views counted per second and
+the latency of counting one. Runs against a temporary database file in the
+'production' profile (WAL), or ``--profile``.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks import percentile, setup
+
+
+def run(args, count):
+    from django.db import OperationalError, connection
+
+    stop = threading.Event()
+    timings, errors = [], []
+
+    def worker():
+        while not stop.is_set():
+            post_id = random.choice(args.post_ids)
+            start = time.perf_counter()
+            try:
+                count(post_id)
+            except OperationalError as error:
+                errors.append(str(error))
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    timings.sort()
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', default='production')
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--flush-hits', type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_PROFILE'] = args.profile
+    with tempfile.TemporaryDirectory() as directory:
+        setup(os.path.join(directory, 'bench.sqlite3'))
+        from django.conf import settings
+        from django.contrib.auth.models import User
+        from django.db.models import F, Sum
+        from blog import counters
+        from blog.models import Post
+        from django_project.tasks import tasks
+
+        author = User.objects.create(username='bench')
+        posts = Post.objects.bulk_create([Post(title=f'Post {i}', content='Lorem ipsum',
+                                               author=author) for i in range(args.posts)])
+        args.post_ids = [post.pk for post in posts]
+        settings.BLOG_VIEW_FLUSH_HITS = args.flush_hits
+        print(f'{args.threads} threads, {args.posts} posts, {args.seconds:g}s each, '
+              f'{args.profile} profile')
+
+        def per_view(post_id):
+            Post.objects.filter(pk=post_id).update(views=F('views') + 1)
+
+        for name, count in (('UPDATE per view', per_view),
+                            ('buffered', counters.view_counts.hit)):
+            Post.objects.update(views=0)
+            timings, errors = run(args, count)
+            counters.view_counts.flush()
+            tasks.join()
+            written = Post.objects.aggregate(total=Sum('views'))['total']
+            print(f'{name:<16} {len(timings) / args.seconds:9.0f} views/s   '
+                  f'p50 {percentile(timings, 50):7.3f} ms   p95 {percentile(timings, 95):7.3f} ms   '
+                  f'p99 {percentile(timings, 99):7.3f} ms   written {written}   '
+                  f'errors {len(errors)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""JSON API over Post.
+
+    GET  /api/posts/              newest first, ``?limit=`` posts a page,
+                                  ``?cursor=`` from the last page's ``next``
+    GET  /api/posts/?ids=3,1,2    those posts, in that order
+    GET  /api/posts/<pk>/
+    POST /api/posts/              a post object, or an array of them created
+                                  with one bulk INSERT; signed-in users only,
+                                  who post as themselves and as of now
+
+``?fields=id,title`` limits each post to those fields, and the query to the
+columns they need. Bodies are encoded with orjson when it is installed and
+gzipped for clients that accept it.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_http_methods
+
+from django_project.db import read_replica
+from . import bulk
+from . import cache as feed_cache
+from . import timeline
+from .models import Post
+from .signals import in_background
+from .pagination import CursorPaginator, InvalidCursor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# field: (the columns it reads, how it is read)
+FIELDS = {
+    'id': (('id',), lambda post: post.pk),
+    'title': (('title',), lambda post: post.title),
+    'content': (('content',), lambda post: post.content),
+    'excerpt': (('excerpt',), lambda post: post.excerpt),
+    'word_count': (('word_count',), lambda post: post.word_count),
+    'reading_time': (('reading_time',), lambda post: post.reading_time),
+    'date_posted': (('date_posted',), lambda post: post.date_posted.isoformat()),
+    'updated_at': (('updated_at',), lambda post: post.updated_at.isoformat()),
+    'author': (('author', 'author__username'), lambda post: post.author.username),
+    'url': (('id',), lambda post: post.get_absolute_url()),
+}
+# lists leave out the content, like the feeds; ask for it with ?fields=
+LIST_FIELDS = [name for name in FIELDS if name != 'content']
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def json_dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+dumps = orjson.dumps if orjson else json_dumps
+loads = orjson.loads if orjson else json.loads
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name][1](post) for name in fields}
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def error(message, status=400):
+    return json_response({'error': message}, status)
+
+
+def requested_fields(request, default):
+    fields = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise BadRequest(f"unknown fields {', '.join(unknown)}")
+    return fields or default
+
+
+def select(queryset, fields):
+    """``queryset`` reading only the columns ``fields`` need"""
+    # the cursor is built from these
+    columns = {'id', 'date_posted'}.union(*(FIELDS[name][0] for name in fields))
+    if 'author' in fields:
+        queryset = queryset.select_related('author')
+    return queryset.only(*columns)
+
+
+def positive_int(value, name, maximum):
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} must be a number')
+    if not 1 <= value <= maximum:
+        raise BadRequest(f'{name} must be between 1 and {maximum}')
+    return value
+
+
+@gzip_page
+@require_http_methods(['GET', 'HEAD', 'POST'])
+def posts(request):
+    try:
+        if request.method == 'POST':
+            return create_posts(request)
+        return list_posts(request)
+    except BadRequest as bad:
+        return error(str(bad))
+
+
+@read_replica
+def list_posts(request):
+    fields = requested_fields(request, LIST_FIELDS)
+    queryset = select(Post.objects.all(), fields)
+    max_size = settings.BLOG_API_MAX_PAGE_SIZE
+
+    if 'ids' in request.GET:
+        try:
+            ids = [int(pk) for pk in request.GET['ids'].split(',')]
+        except ValueError:
+            raise BadRequest('ids must be numbers')
+        if len(ids) > max_size:
+            raise BadRequest(f'at most {max_size} ids')
+        found = queryset.in_bulk(ids)
+        return json_response({'results': [serialize(found[pk], fields) for pk in ids if pk in found]})
+
+    limit = positive_int(request.GET.get('limit', settings.BLOG_API_PAGE_SIZE), 'limit', max_size)
+    try:
+        page = CursorPaginator(queryset, limit).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise BadRequest('invalid cursor')
+    return json_response({
+        'results': [serialize(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def create_posts(request):
+    if not request.user.is_authenticated:
+        return error('sign in to create posts', 401)
+    fields = requested_fields(request, list(FIELDS))
+    try:
+        body = loads(request.body)
+    except ValueError:
+        raise BadRequest('body is not JSON')
+    records = body if isinstance(body, list) else [body]
+    if len(records) > settings.BLOG_API_MAX_CREATE:
+        raise BadRequest(f'at most {settings.BLOG_API_MAX_CREATE} posts at a time')
+
+    # everything is validated before anything is written
+    now = timezone.now()
+    created, errors = [], []
+    for index, record in enumerate(records):
+        if isinstance(record, dict):
+            # posted now, by the signed-in user; a client-chosen date could
+            # backdate a post, or pin it to the top of the feeds
+            record = dict(record, user_id=request.user.pk, date_posted=None)
+        try:
+            post = bulk.clean(record, {request.user.pk}, now)
+        except bulk.InvalidRecord as invalid:
+            errors.append({'index': index, 'error': str(invalid)})
+            continue
+        post.author = request.user
+        created.append(post)
+    if errors:
+        return json_response({'error': 'invalid posts', 'posts': errors}, 400)
+
+    with transaction.atomic():
+        bulk.insert_posts(created)
+        # bulk_create sends no post_save signals
+        transaction.on_commit(feed_cache.invalidate)
+        for post in created:
+            in_background(timeline.fan_out, post.pk)
+    if isinstance(body, list):
+        return json_response({'results': [serialize(post, fields) for post in created]}, 201)
+    return json_response(serialize(created[0], fields), 201)
+
+
+@gzip_page
+@require_GET
+@read_replica
+def post_detail(request, pk):
+    try:
+        fields = requested_fields(request, list(FIELDS))
+    except BadRequest as bad:
+        return error(str(bad))
+    post = select(Post.objects.filter(pk=pk), fields).first()
+    if post is None:
+        return error('no such post', 404)
+    return json_response(serialize(post, fields))
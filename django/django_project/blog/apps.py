@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        import blog.signals
+        from django.conf import settings
+        if settings.BLOG_TRENDING_SCHEDULE_SECONDS:
+            from blog import trending
+            from django_project.tasks import tasks
+            tasks.schedule(settings.BLOG_TRENDING_SCHEDULE_SECONDS, trending.rank)
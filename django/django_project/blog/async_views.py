@@ -0,0 +1,135 @@
+"""Async versions of the read-only blog views, for serving under ASGI.
+
+Enabled with ``settings.BLOG_ASYNC_VIEWS`` (see blog.urls); the sync views
+in blog.views remain the reference behaviour. Queries use the async ORM,
+so a request waiting on the database doesn't hold a thread. Django's
+templates only render synchronously, but with the rows and the user loaded
+up front they do no I/O and run straight on the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from django_project.db import read_replica
+from . import cache as feed_cache
+from . import conditional
+from . import streaming
+from . import trending
+from .counters import view_counts
+from .models import Post
+from .pagination import CursorPaginator, InvalidCursor
+from .views import author_post_count, is_following
+
+
+PER_PAGE = 5
+
+
+async def _user(request):
+    """Load the lazy ``request.user`` in a worker thread and return it;
+    ``request.auser()`` only exists from Django 5.0"""
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+async def _render(request, template_name, context):
+    # base.html reads request.user; load it here rather than lazily
+    # (and synchronously) from inside the template
+    await _user(request)
+    return render(request, template_name, context)
+
+
+async def _paginate(request, queryset, count_key=None, count=None):
+    """Return the list view context for the requested page of ``queryset``"""
+    if getattr(settings, 'BLOG_PAGINATION', 'cursor') == 'cursor':
+        paginator = CursorPaginator(queryset, PER_PAGE, count_key=count_key, count=count)
+        try:
+            page = await paginator.apage(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+    else:
+        # Paginator has no async API; count and slice in a worker thread
+        paginator = Paginator(queryset.order_by('-date_posted', '-id'), PER_PAGE)
+        if count is not None:
+            paginator.count = count
+
+        def load_page():
+            try:
+                page = paginator.page(request.GET.get('page') or 1)
+            except InvalidPage:
+                raise Http404('Invalid page')
+            page.object_list = list(page.object_list)
+            return page
+
+        page = await sync_to_async(load_page)()
+    return {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'posts': page.object_list,
+    }
+
+
+@read_replica
+@conditional.conditional(conditional.feed)
+async def home(request):
+    # same fragment cache as PostListView, read in a worker thread: its
+    # generation is a query, and with BLOG_CACHE_DIR set the fragment a file
+    key = await sync_to_async(feed_cache.page_key)(request)
+    feed = await sync_to_async(feed_cache.get)(key)
+    if feed is None:
+        context = await _paginate(request, Post.objects.listing(),
+                                  count_key='blog:post-count')
+        feed = render_to_string('blog/feed.html', context, request)
+        await sync_to_async(feed_cache.set)(key, feed)
+    return await _render(request, 'blog/home.html', {'feed': mark_safe(feed),
+                                                      'trending': await trending.asidebar()})
+
+
+@read_replica
+@conditional.conditional(conditional.user_feed)
+async def user_posts(request, username):
+    try:
+        author = await User.objects.select_related('author_stats', 'profile').aget(username=username)
+    except User.DoesNotExist:
+        raise Http404('No such user')
+    context = await _paginate(
+        request,
+        Post.objects.filter(author=author).listing(),
+        count_key=f'blog:post-count:{author.pk}',
+        count=author_post_count(author),
+    )
+    if isinstance(context['paginator'], CursorPaginator):
+        await context['paginator'].acount()  # the heading shows the total
+    context['author'] = author
+    user = await _user(request)
+    context['following'] = await sync_to_async(is_following)(user, author)
+    return await _render(request, 'blog/user_posts.html', context)
+
+
+@read_replica
+@conditional.conditional(conditional.post)
+async def post_detail(request, pk):
+    try:
+        post = await Post.objects.select_related('author__profile').aget(pk=pk)
+    except Post.DoesNotExist:
+        raise Http404('No such post')
+    # a flush may write inline when tasks do
+    await sync_to_async(view_counts.hit)(post.pk)
+    return await _render(request, 'blog/post_detail.html', {'object': post, 'post': post})
+
+
+@read_replica
+@conditional.conditional(conditional.feed)
+async def archive(request):
+    posts = Post.objects.listing().order_by('-date_posted', '-id')
+    return await streaming.astream_page(request, 'blog/archive.html', {'title': 'Archive'},
+                                        posts, 'blog/posts.html')
+
+
+async def about(request):
+    return await _render(request, 'blog/about.html', {'title': 'About'})
@@ -0,0 +1,169 @@
+"""Streaming bulk import and export of posts.
+
+Files are JSON arrays (like ``posts.json``) or JSON Lines, read and written
+one record at a time so memory use is flat whatever the file size.
+"""
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache as feed_cache
+from .models import AuthorStats, Post
+
+
+CHUNK_SIZE = 64 * 1024
+TITLE_LENGTH = Post._meta.get_field('title').max_length
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def iter_records(fp, chunk_size=CHUNK_SIZE):
+    """Yield the values of a JSON array or a JSON Lines stream one at a time.
+
+    Reads ``fp`` in chunks and decodes each value as soon as it is complete,
+    so the whole document is never held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof = '', False
+    while not buffer and not eof:
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer = chunk.lstrip()
+    array = buffer.startswith('[')
+    if array:
+        buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if array and buffer[:1] == ',':
+            buffer = buffer[1:].lstrip()
+        if array and buffer[:1] == ']':
+            return
+        if buffer:
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a number ending exactly at the chunk edge may continue
+                if end < len(buffer) or eof or not isinstance(value, (int, float)):
+                    yield value
+                    buffer = buffer[end:]
+                    continue
+        elif eof:
+            if array:
+                raise json.JSONDecodeError('Unterminated array', '', 0)
+            return
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def clean(record, user_ids, now):
+    """Return the Post for ``record`` or raise InvalidRecord"""
+    if not isinstance(record, dict):
+        raise InvalidRecord('not an object')
+    title, content, user_id = record.get('title'), record.get('content'), record.get('user_id')
+    if not isinstance(title, str) or not title.strip():
+        raise InvalidRecord('missing title')
+    if len(title) > TITLE_LENGTH:
+        raise InvalidRecord(f'title longer than {TITLE_LENGTH} characters')
+    if not isinstance(content, str):
+        raise InvalidRecord('missing content')
+    if user_id not in user_ids or isinstance(user_id, bool):
+        raise InvalidRecord(f'unknown user_id {user_id!r}')
+    date_posted = now
+    if record.get('date_posted') is not None:
+        date_posted = parse_datetime(str(record['date_posted']))
+        if date_posted is None:
+            raise InvalidRecord(f"bad date_posted {record['date_posted']!r}")
+        if timezone.is_naive(date_posted):
+            date_posted = timezone.make_aware(date_posted)
+    post = Post(title=title, content=content, author_id=user_id, date_posted=date_posted)
+    # bulk_create skips save(), which fills these in
+    post.summarize()
+    return post
+
+
+def insert_posts(posts):
+    """Insert the ``clean``ed ``posts`` with one bulk INSERT and count them
+    in AuthorStats; call inside a transaction. The posts get their pks."""
+    # bulk_create sends no post_save signals, so AuthorStats is updated here
+    totals = {}
+    for post in posts:
+        count, length, latest = totals.get(post.author_id, (0, 0, post.date_posted))
+        totals[post.author_id] = (count + 1, length + len(post.content),
+                                  max(latest, post.date_posted))
+    Post.objects.bulk_create(posts)
+    for author_id, (count, length, latest) in totals.items():
+        AuthorStats.objects.posts_added(author_id, count, length, latest)
+    return posts
+
+
+def import_posts(records, batch_size=1000, on_error=None):
+    """Insert ``records`` with one bulk INSERT per batch, each in its own
+    transaction, and return ``(imported, skipped, seconds)``.
+
+    Invalid records are skipped and passed to ``on_error(index, error)``.
+    """
+    user_ids = set(User.objects.values_list('pk', flat=True))
+    now = timezone.now()
+    imported = skipped = 0
+    start = time.perf_counter()
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            insert_posts(batch)
+        return len(batch)
+
+    for index, record in enumerate(records):
+        try:
+            batch.append(clean(record, user_ids, now))
+        except InvalidRecord as error:
+            skipped += 1
+            if on_error:
+                on_error(index, error)
+            continue
+        if len(batch) >= batch_size:
+            imported += flush()
+            batch = []
+    if batch:
+        imported += flush()
+    if imported:
+        # bulk_create sends no post_save signals
+        transaction.on_commit(feed_cache.invalidate)
+    return imported, skipped, time.perf_counter() - start
+
+
+def export_posts(fp, fmt='jsonl', batch_size=1000):
+    """Write every post to ``fp`` oldest first and return
+    ``(exported, seconds)``."""
+    fields = ('id', 'title', 'content', 'author_id', 'date_posted')
+    rows = Post.objects.order_by('pk').values_list(*fields).iterator(chunk_size=batch_size)
+    start = time.perf_counter()
+    exported = 0
+    if fmt == 'json':
+        fp.write('[')
+    for pk, title, content, user_id, date_posted in rows:
+        line = json.dumps({'id': pk, 'title': title, 'content': content, 'user_id': user_id,
+                           'date_posted': date_posted.isoformat()})
+        if fmt == 'json':
+            fp.write(',\n' if exported else '\n')
+            fp.write(line)
+        else:
+            fp.write(line + '\n')
+        exported += 1
+    if fmt == 'json':
+        fp.write('\n]\n')
+    return exported, time.perf_counter() - start
+
+
+def rate(rows, seconds):
+    return rows / seconds if seconds else 0.0
@@ -0,0 +1,66 @@
+"""Rendered fragment cache for the home feed.
+
+Fragments are stored under a generation number; any write that can change
+what the feed shows bumps the generation (see blog.signals), which orphans
+every cached page at once. Orphans simply expire. The generation is a
+database row (blog.models.Generation), so a write served by one worker
+process moves every worker's feed, and its ETag, on.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Generation
+
+
+GENERATION = 'feed'
+HITS_KEY = 'blog:feed:hits'
+MISSES_KEY = 'blog:feed:misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # add() won't clobber a concurrent first increment
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def generation():
+    return Generation.objects.current(GENERATION)
+
+
+def page_key(request):
+    """Cache key for the feed page ``request`` asks for"""
+    # the conditional GET check and the view both need it; read it once
+    if not hasattr(request, '_feed_generation'):
+        request._feed_generation = generation()
+    digest = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    return f'blog:feed:{request._feed_generation}:{digest}'
+
+
+def get(key):
+    html = cache.get(key)
+    _incr(MISSES_KEY if html is None else HITS_KEY)
+    return html
+
+
+def set(key, html):
+    cache.set(key, html, settings.BLOG_FEED_CACHE_TIMEOUT)
+
+
+def invalidate():
+    Generation.objects.bump(GENERATION)
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+        'generation': generation(),
+    }
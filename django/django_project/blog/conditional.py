@@ -0,0 +1,107 @@
+"""Conditional GET for the post pages and feeds.
+
+Each validator returns ``(etag, last_modified)`` for a page from at most
+one small query, or ``None`` when the page can't be validated, so a client
+that already has the page gets a 304 without the view rendering anything.
+Pages differ for signed-in users (navigation, edit buttons), so the
+signed-in user's id is part of every ETag, and responses are marked
+private.
+"""
+import functools
+import hashlib
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.contrib.auth.models import User
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import cache as feed_cache
+from .models import Post
+
+
+def _etag(request, *parts):
+    # the session holds the user id; no need to load the user
+    viewer = request.session.get(SESSION_KEY, '')
+    state = ':'.join(str(part) for part in (viewer, settings.BLOG_PAGINATION) + parts)
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def feed(request):
+    # the feed cache generation moves on every change the feed can show
+    return _etag(request, feed_cache.page_key(request)), None
+
+
+def user_feed(request, username):
+    # every follow and unfollow changes the follower count, and with it the
+    # follow button
+    row = User.objects.filter(username=username).values(
+        'pk', 'profile__image', 'profile__follower_count',
+    ).annotate(latest=Max('post__updated_at'), posts=Count('post')).values_list(
+        'pk', 'profile__image', 'profile__follower_count', 'latest', 'posts',
+    ).first()
+    if row is None:
+        return None
+    pk, image, followers, latest, posts = row
+    return _etag(request, pk, image, followers, latest, posts, request.GET.urlencode()), latest
+
+
+def post(request, pk):
+    # the view count moves only when buffered views are written
+    row = Post.objects.filter(pk=pk).values_list(
+        'updated_at', 'views', 'author__username', 'author__profile__image').first()
+    if row is None:
+        return None
+    updated_at, views, username, image = row
+    return _etag(request, pk, updated_at, views, username, image), updated_at
+
+
+def _conditional_response(request, validators, args, kwargs):
+    """Return ``(response or None, etag, last_modified)``"""
+    # one-time messages would be lost on a 304
+    if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+        return None, None, None
+    validated = validators(request, *args, **kwargs)
+    if validated is None:
+        return None, None, None
+    etag, last_modified = validated
+    etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp), etag, timestamp
+
+
+def _finish(response, etag, timestamp):
+    if etag and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if timestamp:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+        # always revalidate; the answer depends on who is signed in
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(validators):
+    """Answer conditional GETs for the decorated view with ``validators``"""
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response, etag, timestamp = await sync_to_async(_conditional_response)(
+                    request, validators, args, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, etag, timestamp)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response, etag, timestamp = _conditional_response(request, validators, args, kwargs)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(response, etag, timestamp)
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+"""Buffered post view counts and the most viewed ranking.
+
+Counting each view with ``UPDATE ... SET views = views + 1`` would queue
+every reader of a post page behind SQLite's single writer. ``hit()`` only
+adds to a buffer in the worker process; the buffer is written in one
+transaction, one UPDATE per distinct count, in a background task once
+BLOG_VIEW_FLUSH_HITS views are buffered or BLOG_VIEW_FLUSH_SECONDS after the
+first, and in the process itself when it exits.
+
+Each write ranks the most viewed posts again and caches the ranking, so
+``most_viewed()`` is a cache read and a primary key lookup. Views buffered
+by a process that is killed are lost; the counts are a popularity signal,
+not a ledger.
+"""
+import atexit
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from django_project.tasks import tasks
+from .models import Post
+
+
+RANKING_KEY = 'blog:most-viewed'
+
+
+def write(counts):
+    """Add ``{post_id: views}`` to the posts' counts and rank them again"""
+    by_count = defaultdict(list)
+    for post_id, views in counts.items():
+        by_count[views].append(post_id)
+    # update() leaves updated_at alone: a view doesn't change the post
+    with transaction.atomic():
+        for views, post_ids in by_count.items():
+            Post.objects.filter(pk__in=post_ids).update(views=F('views') + views)
+    rank()
+
+
+def rank():
+    """Cache and return the ids of the most viewed posts"""
+    ranking = list(Post.objects.filter(views__gt=0).order_by('-views', '-id')
+                   .values_list('pk', flat=True)[:settings.BLOG_MOST_VIEWED_COUNT])
+    cache.set(RANKING_KEY, ranking, settings.BLOG_MOST_VIEWED_TIMEOUT)
+    return ranking
+
+
+def most_viewed():
+    """The most viewed posts, as the feeds show them"""
+    ranking = cache.get(RANKING_KEY)
+    if ranking is None:
+        ranking = rank()
+    posts = Post.objects.listing().in_bulk(ranking)
+    # a ranked post may have been deleted since
+    return [posts[pk] for pk in ranking if pk in posts]
+
+
+class ViewCounter:
+    """Thread-safe per-process buffer of post views"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._hits = 0
+        self._timer = None
+
+    def hit(self, post_id):
+        with self._lock:
+            self._counts[post_id] += 1
+            self._hits += 1
+            if self._hits >= settings.BLOG_VIEW_FLUSH_HITS:
+                counts = self._take()
+            else:
+                counts = None
+                if self._timer is None and settings.BLOG_VIEW_FLUSH_SECONDS:
+                    self._timer = threading.Timer(settings.BLOG_VIEW_FLUSH_SECONDS,
+                                                  self._flush_in_background)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if counts:
+            tasks.submit(write, counts)
+
+    def flush(self):
+        """Write the buffered views now, in this thread"""
+        with self._lock:
+            counts = self._take()
+        if counts:
+            write(counts)
+
+    def clear(self):
+        """Drop the buffered views"""
+        with self._lock:
+            self._take()
+
+    def _flush_in_background(self):
+        with self._lock:
+            counts = self._take()
+        if counts:
+            tasks.submit(write, counts)
+
+    def _take(self):
+        # called with the lock held
+        counts, self._counts, self._hits = self._counts, Counter(), 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return counts
+
+
+view_counts = ViewCounter()
+# exit handlers run newest first: this flush, then tasks.join waiting for
+# the writes already queued
+atexit.register(view_counts.flush)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = "Fill in the stored excerpt, word count and reading time of posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Posts read and updated per query')
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every post, not only those never summarized')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        start = time.perf_counter()
+        posts = Post.objects.only('content').order_by('pk')
+        if not options['all']:
+            posts = posts.filter(word_count=0)
+        updated, last_pk = 0, 0
+        while True:
+            # seek on pk rather than OFFSET, the updated rows may leave the filter
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                post.summarize()
+            Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(
+            f'Summarized {updated} posts in {time.perf_counter() - start:.2f}s'))
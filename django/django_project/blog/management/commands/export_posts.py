@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blog import bulk
+
+
+class Command(BaseCommand):
+    help = 'Write every post to a JSON Lines (or JSON array) file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or '-' for stdout")
+        parser.add_argument('--format', choices=('jsonl', 'json'), default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            self.stdout.ending = ''
+            exported, seconds = bulk.export_posts(self.stdout, options['format'],
+                                                  options['batch_size'])
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as fp:
+                exported, seconds = bulk.export_posts(fp, options['format'],
+                                                      options['batch_size'])
+        # stdout may be the export itself
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {exported} posts in {seconds:.2f}s '
+            f'({bulk.rate(exported, seconds):.0f} rows/sec)'))
@@ -0,0 +1,38 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import bulk
+
+
+class Command(BaseCommand):
+    help = 'Load posts from a JSON array or JSON Lines file, e.g. posts.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or '-' for stdin")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per INSERT and per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        def report(index, error):
+            self.stderr.write(f'Skipped record {index}: {error}')
+
+        try:
+            if options['path'] == '-':
+                result = bulk.import_posts(bulk.iter_records(sys.stdin),
+                                           options['batch_size'], report)
+            else:
+                with open(options['path'], encoding='utf-8') as fp:
+                    result = bulk.import_posts(bulk.iter_records(fp),
+                                               options['batch_size'], report)
+        except (OSError, json.JSONDecodeError) as error:
+            raise CommandError(error)
+
+        imported, skipped, seconds = result
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} posts, skipped {skipped} in {seconds:.2f}s '
+            f'({bulk.rate(imported, seconds):.0f} rows/sec)'))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import trending
+
+
+class Command(BaseCommand):
+    help = 'Score the viewed posts for /trending/; run it on a schedule'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = trending.rank()
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {written} posts in {time.perf_counter() - start:.2f}s'))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import timeline
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Rewrite every timeline from the follow graph, or with --trim only trim them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trim', action='store_true',
+                            help='Only drop entries beyond BLOG_TIMELINE_LENGTH')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['trim']:
+            dropped = timeline.trim()
+            self.stdout.write(self.style.SUCCESS(
+                f'Dropped {dropped} entries in {time.perf_counter() - start:.2f}s'))
+            return
+        followers = list(Follow.objects.order_by('follower_id')
+                         .values_list('follower_id', flat=True).distinct())
+        for user_id in followers:
+            timeline.rebuild(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(followers)} timelines in {time.perf_counter() - start:.2f}s'))
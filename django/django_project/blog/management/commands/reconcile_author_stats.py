@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute every AuthorStats row from the posts table in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report authors whose stats are out of date')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per INSERT when rebuilding')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        start = time.perf_counter()
+
+        def totals(rows):
+            return {row.author_id: (row.post_count, row.last_posted_at, row.content_length)
+                    for row in rows}
+
+        stored = totals(AuthorStats.objects.iterator())
+        computed = totals(AuthorStats.objects.computed())
+        stale = sorted(author_id for author_id in stored.keys() | computed.keys()
+                       if stored.get(author_id) != computed.get(author_id))
+        for author_id in stale:
+            self.stdout.write(f'Author {author_id}: stored {stored.get(author_id)}, '
+                              f'expected {computed.get(author_id)}')
+        if stale and not options['dry_run']:
+            AuthorStats.objects.rebuild(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(computed)} authors, {len(stale)} out of date'
+            f'{"" if options["dry_run"] or not stale else ", rebuilt"} '
+            f'in {time.perf_counter() - start:.2f}s'))
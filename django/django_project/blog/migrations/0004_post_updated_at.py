@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-17 16:07
+
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    # date_posted is the best estimate of when an existing post last changed
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.using(schema_editor.connection.alias).update(updated_at=models.F('date_posted'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
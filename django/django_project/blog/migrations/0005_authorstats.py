@@ -0,0 +1,43 @@
+# Generated by Django 5.0.6 on 2026-10-17 16:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Length
+
+
+def build_author_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+    db = schema_editor.connection.alias
+    rows = Post.objects.using(db).order_by().values('author_id').annotate(
+        post_count=models.Count('id'),
+        last_posted_at=models.Max('date_posted'),
+        content_length=Coalesce(models.Sum(Length('content')), 0),
+    )
+    AuthorStats.objects.using(db).bulk_create((AuthorStats(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0004_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.IntegerField(default=0)),
+                ('last_posted_at', models.DateTimeField(blank=True, null=True)),
+                ('content_length', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'author stats',
+                'indexes': [models.Index(fields=['-post_count', '-last_posted_at'], name='blog_authorstats_top_idx')],
+            },
+        ),
+        migrations.RunPython(build_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-17 16:21
+
+from django.db import migrations, models
+
+from blog.text import summarize
+
+
+def backfill_summaries(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias).only('content')
+    batch = []
+    for post in posts.iterator(chunk_size=1000):
+        post.excerpt, post.word_count, post.reading_time = summarize(post.content)
+        batch.append(post)
+        if len(batch) == 1000:
+            Post.objects.using(schema_editor.connection.alias).bulk_update(
+                batch, ['excerpt', 'word_count', 'reading_time'])
+            batch = []
+    Post.objects.using(schema_editor.connection.alias).bulk_update(
+        batch, ['excerpt', 'word_count', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,232 @@
-from django.db import models
+import time
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Length
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import User
+from . import text
+
+
+class PostQuerySet(models.QuerySet):
+    def listing(self):
+        """Posts as the feeds show them: with their author and profile,
+        and without the full content (the feeds show the excerpt)"""
+        return self.select_related('author__profile').defer('content')
 
 
 class Post(models.Model):
     title = models.CharField(max_length=100)
     content = models.TextField()
+    # derived from content on save, see blog.text
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=0, editable=False)
     date_posted = models.DateTimeField(default=timezone.now)
+    # conditional GETs compare against this, see blog.conditional
+    updated_at = models.DateTimeField(auto_now=True)
+    # written in batches from a per-process buffer, see blog.counters
+    views = models.PositiveIntegerField(default=0, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     
+    objects = PostQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # keyset pagination seeks on (date_posted, id), see blog.pagination
+            models.Index(fields=['-date_posted', '-id'], name='blog_post_date_id_idx'),
+            models.Index(fields=['author', '-date_posted', '-id'], name='blog_post_author_date_idx'),
+            models.Index(fields=['-views', '-id'], name='blog_post_views_idx'),
+        ]
+    
     def __str__(self):
         return self.title
     
     def get_absolute_url(self):
         return reverse('post-detail', kwargs={'pk': self.pk})
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'author_id', 'content', 'date_posted'}.issubset(field_names):
+            instance.remember_stats()
+        return instance
+    
+    def remember_stats(self):
+        """Note what this post adds to its author's AuthorStats, so a later
+        save or delete can apply the difference"""
+        self._loaded_stats = (self.author_id, len(self.content), self.date_posted)
+    
+    @property
+    def is_truncated(self):
+        return self.word_count > text.EXCERPT_WORDS
+    
+    @property
+    def rendered_content(self):
+        return text.rendered_body(self)
+    
+    def summarize(self):
+        self.excerpt, self.word_count, self.reading_time = text.summarize(self.content)
+    
+    def save(self, *args, **kwargs):
+        if 'content' not in self.get_deferred_fields():
+            self.summarize()
+        # AuthorStats changes in the same transaction, see blog.signals
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class AuthorStatsManager(models.Manager):
+    def _latest_post(self):
+        return Subquery(Post.objects.filter(author_id=OuterRef('pk'))
+                        .order_by('-date_posted').values('date_posted')[:1])
+    
+    def posts_added(self, author_id, count, content_length, latest):
+        changes = {
+            'post_count': F('post_count') + count,
+            'content_length': F('content_length') + content_length,
+            'last_posted_at': Greatest(Coalesce('last_posted_at', Value(latest)), Value(latest)),
+        }
+        if self.filter(pk=author_id).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                self.create(author_id=author_id, post_count=count,
+                            content_length=content_length, last_posted_at=latest)
+        except IntegrityError:
+            # created by a concurrent first post
+            self.filter(pk=author_id).update(**changes)
+    
+    def post_removed(self, author_id, content_length, date_posted):
+        self.filter(pk=author_id).update(post_count=F('post_count') - 1,
+                                         content_length=F('content_length') - content_length)
+        # only deleting the newest post moves last_posted_at back
+        self.filter(pk=author_id, last_posted_at__lte=date_posted)\
+            .update(last_posted_at=self._latest_post())
+    
+    def post_changed(self, author_id, content_delta, date_changed):
+        changes = {'content_length': F('content_length') + content_delta}
+        if date_changed:
+            changes['last_posted_at'] = self._latest_post()
+        self.filter(pk=author_id).update(**changes)
+    
+    def computed(self, author_ids=None):
+        """AuthorStats rows as the posts table says they should be"""
+        posts = Post.objects.order_by()
+        if author_ids is not None:
+            posts = posts.filter(author_id__in=author_ids)
+        rows = posts.values('author_id').annotate(
+            post_count=Count('id'),
+            last_posted_at=Max('date_posted'),
+            content_length=Coalesce(Sum(Length('content')), 0),
+        )
+        return (AuthorStats(**row) for row in rows.iterator())
+    
+    def rebuild(self, author_ids=None, batch_size=1000):
+        """Replace the stats of ``author_ids`` (default all) with ``computed()``"""
+        stats = self.all() if author_ids is None else self.filter(pk__in=author_ids)
+        with transaction.atomic():
+            stats.delete()
+            self.bulk_create(self.computed(author_ids), batch_size=batch_size)
+    
+    def top(self, limit=10):
+        """The authors with the most posts, newest activity first on ties"""
+        return self.select_related('author').order_by('-post_count', '-last_posted_at')[:limit]
+
+
+class AuthorStats(models.Model):
+    """Per-author totals over Post, kept current by blog.signals and
+    rebuilt by ``manage.py reconcile_author_stats``"""
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='author_stats')
+    post_count = models.IntegerField(default=0)
+    last_posted_at = models.DateTimeField(null=True, blank=True)
+    content_length = models.BigIntegerField(default=0)
+    
+    objects = AuthorStatsManager()
     
+    class Meta:
+        verbose_name_plural = 'author stats'
+        indexes = [
+            models.Index(fields=['-post_count', '-last_posted_at'], name='blog_authorstats_top_idx'),
+        ]
     
-    
\ No newline at end of file
+    def __str__(self):
+        return f'{self.author_id}: {self.post_count} posts'
+
+
+class TimelineEntry(models.Model):
+    """A post in the timeline of one of its author's followers, written by
+    blog.timeline"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    # copies of the post's, so unfollowing and paging need no join
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    date_posted = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = 'timeline entries'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='blog_timeline_user_post_uniq'),
+        ]
+        indexes = [
+            # pages seek on (date_posted, post_id) like the feeds, see blog.timeline
+            models.Index(fields=['user', '-date_posted', '-post'], name='blog_timeline_user_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class TrendingScore(models.Model):
+    """A post's views decayed by age, written by blog.trending"""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True,
+                                related_name='trending')
+    score = models.FloatField(default=0)
+    # the post's view count when the score was computed; views past it are new
+    views_seen = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            # top() reads the scores in this order and stops after K
+            models.Index(fields=['-score', '-post'], name='blog_trending_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.2f}'
+
+
+class GenerationManager(models.Manager):
+    def current(self, name):
+        """The value of ``name``, 0 until it is first bumped"""
+        return self.filter(pk=name).values_list('value', flat=True).first() or 0
+    
+    def bump(self, name):
+        """Move ``name`` on"""
+        if self.filter(pk=name).update(value=F('value') + 1):
+            return
+        try:
+            with transaction.atomic():
+                # the first value comes from the clock, so a recreated row
+                # never repeats one that went out in an ETag
+                self.create(name=name, value=time.time_ns())
+        except IntegrityError:
+            # created by a concurrent first bump
+            self.filter(pk=name).update(value=F('value') + 1)
+
+
+class Generation(models.Model):
+    """A named number bumped to drop cached state, see blog.cache.
+    
+    Kept in the database rather than the cache, which is per process unless
+    BLOG_CACHE_DIR is set, so a bump made by one worker moves every worker on.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField()
+    
+    objects = GenerationManager()
+    
+    def __str__(self):
+        return f'{self.name}: {self.value}'
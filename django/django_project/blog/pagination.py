@@ -0,0 +1,203 @@
+"""Keyset (cursor) pagination for the post feeds.
+
+Pages are addressed by the ``(date_posted, id)`` of the row at their edge
+instead of an OFFSET, so page 10,000 costs the same index seek as page 1.
+Cursor tokens are opaque, URL-safe strings.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+NEXT = 'n'
+PREVIOUS = 'p'
+LAST = 'last'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(obj, direction):
+    payload = json.dumps([direction, obj.date_posted.isoformat(), obj.pk],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, date_posted, pk = json.loads(payload)
+        date_posted = parse_datetime(date_posted)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if direction not in (NEXT, PREVIOUS) or date_posted is None or not isinstance(pk, int):
+        raise InvalidCursor('Invalid cursor')
+    return direction, date_posted, pk
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return encode_cursor(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return encode_cursor(self.object_list[0], PREVIOUS)
+
+
+class CursorPaginator:
+    """Paginate a Post queryset newest first on ``(date_posted, id)``.
+
+    ``count`` is only computed when asked for; with a ``count_key`` it is
+    served from the cache for ``count_timeout`` seconds, so it is an
+    approximate total rather than a ``COUNT(*)`` per request. A ``count``
+    known up front, e.g. from AuthorStats, is used as is.
+    """
+    ordering = ('-date_posted', '-id')
+    reverse_ordering = ('date_posted', 'id')
+    # breaks ties on date_posted; a subclass paging another model names its own
+    id_field = 'id'
+
+    def __init__(self, queryset, per_page, count_key=None, count_timeout=None, count=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.count_key = count_key
+        if count_timeout is None:
+            count_timeout = getattr(settings, 'BLOG_PAGINATION_COUNT_TIMEOUT', 60)
+        self.count_timeout = count_timeout
+        self._count = count
+
+    @property
+    def count(self):
+        if self._count is None:
+            if self.count_key is None:
+                self._count = self.queryset.count()
+            else:
+                self._count = cache.get_or_set(self.count_key, self.queryset.count,
+                                               self.count_timeout)
+        return self._count
+
+    async def acount(self):
+        """Async ``count``; afterwards ``count`` needs no query"""
+        if self._count is None:
+            count = None if self.count_key is None else await cache.aget(self.count_key)
+            if count is None:
+                count = await self.queryset.acount()
+                if self.count_key is not None:
+                    await cache.aset(self.count_key, count, self.count_timeout)
+            self._count = count
+        return self._count
+
+    def page(self, cursor=None):
+        rows, direction = self._page_query(cursor)
+        return self._make_page(list(rows), direction)
+
+    async def apage(self, cursor=None):
+        rows, direction = self._page_query(cursor)
+        return self._make_page([row async for row in rows], direction)
+
+    def _page_query(self, cursor):
+        """Return the unevaluated rows for ``cursor`` and the direction read"""
+        limit = self.per_page + 1
+        if not cursor:
+            return self.queryset.order_by(*self.ordering)[:limit], None
+        if cursor == LAST:
+            return self.queryset.order_by(*self.reverse_ordering)[:limit], LAST
+
+        direction, date_posted, pk = decode_cursor(cursor)
+        if direction == NEXT:
+            # date_posted <= d narrows the index range; the OR breaks ties on id
+            return self.queryset.filter(
+                Q(date_posted__lte=date_posted),
+                Q(date_posted__lt=date_posted) | Q(**{f'{self.id_field}__lt': pk}),
+            ).order_by(*self.ordering)[:limit], NEXT
+        return self.queryset.filter(
+            Q(date_posted__gte=date_posted),
+            Q(date_posted__gt=date_posted) | Q(**{f'{self.id_field}__gt': pk}),
+        ).order_by(*self.reverse_ordering)[:limit], PREVIOUS
+
+    def _make_page(self, rows, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction is None:
+            return CursorPage(rows, self, more, False)
+        if direction == NEXT:
+            return CursorPage(rows, self, more, True)
+        # LAST and PREVIOUS read backwards from their edge
+        return CursorPage(rows[::-1], self, direction == PREVIOUS, more)
+
+
+class CursorPaginationMixin:
+    """ListView mixin switching ``paginate_by`` to cursor pagination.
+
+    Enabled by ``settings.BLOG_PAGINATION = 'cursor'``, the default; any other
+    value keeps Django's OFFSET paginator.
+    """
+    cursor_param = 'cursor'
+
+    def get_pagination_mode(self):
+        return getattr(settings, 'BLOG_PAGINATION', 'cursor')
+
+    def get_count_cache_key(self):
+        return None
+
+    def get_known_count(self):
+        """The total number of rows if known without counting them"""
+        return None
+
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        count = self.get_known_count()
+        if count is not None:
+            paginator.count = count  # a cached_property
+        return paginator
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != 'cursor':
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size, count_key=self.get_count_cache_key(),
+                                    count=self.get_known_count())
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,154 @@
+"""Full-text search over posts with SQLite FTS5.
+
+``blog_post_fts`` is an external-content FTS5 index over the title and
+content of ``blog_post``. Triggers keep it in step with every insert,
+update and delete, bulk ones included, so it never needs a full rebuild.
+On other databases, or an SQLite built without FTS5, search falls back to
+a (slow) ``icontains`` scan.
+"""
+import re
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, router
+from django.db.models import Q
+
+from .models import Post
+
+
+FTS_TABLE = 'blog_post_fts'
+
+CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, content, content='blog_post', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+"""
+
+# Dropped whenever Django rebuilds blog_post to alter it, hence IF NOT
+# EXISTS: install_triggers() runs again after every migrate (blog.signals).
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_post_fts_insert AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS blog_post_fts_update AFTER UPDATE OF title, content ON blog_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+# bm25 column weights: a hit in the title counts ten times one in the body
+RANK = f'bm25({FTS_TABLE}, 10.0, 1.0)'
+
+# Scoring every match of a word found in most posts is a full index walk,
+# so only the newest this many matches are ranked (FTS5 yields them in
+# rowid order without scoring the rest).
+CANDIDATES = 1000
+
+TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def install(conn):
+    """Create the index and its triggers on ``conn`` if they are missing"""
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        created = FTS_TABLE not in conn.introspection.table_names(cursor)
+        if created:
+            try:
+                cursor.execute(CREATE_TABLE)
+            except OperationalError:
+                return  # SQLite without FTS5; search falls back to icontains
+    install_triggers(conn)
+    if created:
+        rebuild(conn)
+
+
+def install_triggers(conn):
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        if FTS_TABLE in conn.introspection.table_names(cursor):
+            for sql in TRIGGERS:
+                cursor.execute(sql)
+
+
+def uninstall(conn):
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for name in ('insert', 'delete', 'update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS blog_post_fts_{name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild(conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(text):
+    """Turn user input into a safe FTS5 query.
+
+    Words must all match; "quoted words" must match as a phrase. Every term
+    is quoted, so FTS5 operators in the input are searched for literally.
+    """
+    terms = []
+    for phrase, word in TOKEN.findall(text):
+        words = re.findall(r'\w+', phrase or word)
+        if words:
+            terms.append('"%s"' % ' '.join(words))
+    return ' '.join(terms)
+
+
+def search(text, page=1, per_page=10, candidates=None):
+    """Return ``(posts, has_next)`` for one page of matches, best first"""
+    expression = match_expression(text)
+    if not expression:
+        return [], False
+    offset = (page - 1) * per_page
+    try:
+        ids = fts_ids(expression, per_page + 1, offset,
+                      candidates or getattr(settings, 'BLOG_SEARCH_CANDIDATES', CANDIDATES))
+    except OperationalError:
+        ids = None
+    if ids is None:
+        return scan(text, per_page, offset)
+
+    posts = Post.objects.listing().in_bulk(ids[:per_page])
+    return [posts[pk] for pk in ids[:per_page] if pk in posts], len(ids) > per_page
+
+
+def fts_ids(expression, limit, offset, candidates=CANDIDATES):
+    conn = connections[router.db_for_read(Post)]
+    if conn.vendor != 'sqlite':
+        return None
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM ('
+            f'  SELECT rowid AS id, {RANK} AS score FROM {FTS_TABLE}'
+            f'  WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s'
+            f') ORDER BY score, id DESC LIMIT %s OFFSET %s',
+            [expression, candidates, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def scan(text, per_page, offset):
+    condition = Q()
+    for phrase, word in TOKEN.findall(text):
+        term = phrase or word
+        condition &= Q(title__icontains=term) | Q(content__icontains=term)
+    posts = list(Post.objects.filter(condition).listing()
+                 .order_by('-date_posted', '-id')[offset:offset + per_page + 1])
+    return posts[:per_page], len(posts) > per_page
@@ -0,0 +1,106 @@
+import functools
+
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from django_project.tasks import tasks
+from users.models import Follow, Profile
+from .models import AuthorStats, Post, TimelineEntry
+from . import cache as feed_cache
+from . import search
+from . import timeline
+
+
+def invalidate_feed():
+    # after commit, so a concurrent request can't re-cache the old rows
+    transaction.on_commit(feed_cache.invalidate)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    invalidate_feed()
+
+
+@receiver(post_save, sender=Post)
+def post_saved_stats(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # runs inside Post.save's transaction
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_stats', None)
+    if created:
+        AuthorStats.objects.posts_added(instance.author_id, 1, len(instance.content),
+                                        instance.date_posted)
+    elif loaded is None:
+        # loaded without the fields the stats need; recount this author
+        if update_fields is None or {'author', 'content', 'date_posted'} & set(update_fields):
+            AuthorStats.objects.rebuild([instance.author_id])
+        return
+    else:
+        author_id, length, date_posted = loaded
+        if author_id != instance.author_id:
+            AuthorStats.objects.post_removed(author_id, length, date_posted)
+            AuthorStats.objects.posts_added(instance.author_id, 1, len(instance.content),
+                                            instance.date_posted)
+        elif (len(instance.content), instance.date_posted) != (length, date_posted):
+            AuthorStats.objects.post_changed(author_id, len(instance.content) - length,
+                                             instance.date_posted != date_posted)
+    instance.remember_stats()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_stats(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_stats', None)
+    if loaded is None:
+        AuthorStats.objects.rebuild([instance.author_id])
+    else:
+        AuthorStats.objects.post_removed(*loaded)
+
+
+def in_background(func, *args):
+    # after commit, so the task sees the rows that triggered it
+    transaction.on_commit(functools.partial(tasks.submit, func, *args))
+
+
+@receiver(post_save, sender=Post)
+def post_saved_timelines(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        in_background(timeline.fan_out, instance.pk)
+    elif update_fields is None or 'date_posted' in update_fields:
+        # timelines order on their own copy of date_posted
+        TimelineEntry.objects.filter(post=instance).exclude(date_posted=instance.date_posted)\
+            .update(date_posted=instance.date_posted)
+
+
+@receiver(post_save, sender=Follow)
+def followed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        in_background(timeline.backfill, instance.follower_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollowed(sender, instance, **kwargs):
+    in_background(timeline.forget, instance.follower_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    # the feed shows usernames; logins only touch last_login
+    if not created and (update_fields is None or 'username' in update_fields):
+        invalidate_feed()
+
+
+@receiver(post_save, sender=Profile)
+def profile_changed(sender, instance, created, **kwargs):
+    if not created and instance.image_changed:
+        invalidate_feed()
+
+
+@receiver(post_migrate)
+def reinstall_search_triggers(sender, using, **kwargs):
+    # rebuilding blog_post to alter it drops its triggers
+    if sender.name == 'blog':
+        search.install_triggers(connections[using])
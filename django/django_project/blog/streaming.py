@@ -0,0 +1,69 @@
+"""Streamed HTML pages for lists too long to build in memory.
+
+The page template is rendered once around a placeholder; everything before
+it (head, navbar, messages) is sent straight away, then the rows of an
+iterator queryset are rendered and sent ``BLOG_STREAM_CHUNK_SIZE`` at a
+time, then the rest of the page. Memory use stays at one chunk of rows
+however long the list is.
+"""
+import secrets
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+
+def _frame(request, template_name, context):
+    """Render ``template_name`` split at ``{{ stream }}`` into (head, tail)"""
+    marker = f'<!--stream:{secrets.token_hex(8)}-->'
+    page = render_to_string(template_name, {**context, 'stream': mark_safe(marker)}, request)
+    head, tail = page.split(marker, 1)
+    return head, tail
+
+
+def _chunk_size():
+    return getattr(settings, 'BLOG_STREAM_CHUNK_SIZE', 100)
+
+
+def stream_page(request, template_name, context, rows, rows_template):
+    """Stream ``template_name`` with ``rows`` rendered by ``rows_template``
+    (given ``posts``, a chunk of rows) in place of ``{{ stream }}``"""
+    head, tail = _frame(request, template_name, context)
+    rows_template = get_template(rows_template)
+    # route the query now; blog.views' read_replica only holds during the view
+    rows = rows.using(rows.db).iterator(chunk_size=_chunk_size())
+
+    def chunks():
+        yield head
+        while True:
+            chunk = list(islice(rows, _chunk_size()))
+            if not chunk:
+                break
+            yield rows_template.render({'posts': chunk})
+        yield tail
+    return StreamingHttpResponse(chunks(), content_type='text/html; charset=utf-8')
+
+
+async def astream_page(request, template_name, context, rows, rows_template):
+    """``stream_page`` for async views; rows come from the async ORM, so
+    ASGI servers can stream without buffering the response"""
+    # rendered in a worker thread, where the template may load request.user
+    head, tail = await sync_to_async(_frame)(request, template_name, context)
+    rows_template = get_template(rows_template)
+    rows = rows.using(rows.db)
+
+    async def chunks():
+        yield head
+        chunk = []
+        async for row in rows.aiterator(chunk_size=_chunk_size()):
+            chunk.append(row)
+            if len(chunk) >= _chunk_size():
+                yield rows_template.render({'posts': chunk})
+                chunk = []
+        if chunk:
+            yield rows_template.render({'posts': chunk})
+        yield tail
+    return StreamingHttpResponse(chunks(), content_type='text/html; charset=utf-8')
@@ -0,0 +1,212 @@
+"""Sitemaps and Atom/RSS feeds, for crawlers and feed readers.
+
+Crawling the home feed costs a request per five posts; /sitemap.xml
+instead indexes shards listing every post and author page, split by
+primary key range at BLOG_SITEMAP_SHARD_SIZE URLs each (50,000 is the
+protocol's limit). The feeds carry the newest BLOG_SYNDICATION_ITEMS posts,
+of everyone or of one author.
+
+Each document has a version computed from one small query over the rows it
+lists: their count and newest change for a sitemap shard, the ids and
+updated_at of its items for a feed. It is written to BLOG_SYNDICATION_ROOT
+under that version from an iterator query, so memory stays flat however
+big the shard, and served from disk as long as the version holds. Only the
+shards and feeds whose posts changed are written again. The version is the
+response's ETag and the newest change its Last-Modified.
+
+A renamed author's sitemap entry changes with their next post.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Max
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date, quote_etag
+
+from django_project.db import read_replica
+from .models import AuthorStats, Post
+
+
+FEEDS = {
+    'atom': Atom1Feed,
+    'rss': Rss201rev2Feed,
+}
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+# rows fetched at a time while a document is written
+CHUNK_SIZE = 2000
+
+
+def _version(request, *parts):
+    # absolute URLs go into the documents; each host gets its own
+    state = ':'.join(str(part) for part in (request.scheme, request.get_host()) + parts)
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def _path(name, version):
+    return os.path.join(settings.BLOG_SYNDICATION_ROOT, f'{name}.{version}.xml')
+
+
+def _open(name, version, write):
+    """The document ``name`` at ``version``, written by ``write(fp)`` unless
+    it is on disk already"""
+    path = _path(name, version)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    os.makedirs(settings.BLOG_SYNDICATION_ROOT, exist_ok=True)
+    # written aside and renamed into place, so no reader sees half a file
+    fd, temporary = tempfile.mkstemp(dir=settings.BLOG_SYNDICATION_ROOT, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            write(fp)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    document = open(path, 'rb')
+    for old in glob.glob(_path(glob.escape(name), '*')):
+        if old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass  # removed by another process
+    return document
+
+
+def _respond(request, name, version, last_modified, content_type, write):
+    etag = quote_etag(version)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = FileResponse(_open(name, version, write), content_type=content_type)
+    response.headers['ETag'] = etag
+    if timestamp:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, public=True, max_age=settings.BLOG_SYNDICATION_MAX_AGE)
+    return response
+
+
+def _lastmod(value):
+    return value.replace(microsecond=0).isoformat()
+
+
+def _urlset(request, urls):
+    """A ``write`` for the sitemap of ``(path, lastmod)`` pairs"""
+    def write(fp):
+        fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        for path, lastmod in urls:
+            fp.write(f'<url><loc>{escape(request.build_absolute_uri(path))}</loc>')
+            if lastmod:
+                fp.write(f'<lastmod>{_lastmod(lastmod)}</lastmod>')
+            fp.write('</url>\n')
+        fp.write('</urlset>\n')
+    return write
+
+
+def _shards(rows, key, lastmod):
+    """``(shard, lastmod)`` of the non-empty shards of ``rows`` by ``key``"""
+    size = settings.BLOG_SITEMAP_SHARD_SIZE
+    return list(rows.order_by().annotate(shard=(F(key) - 1) / size + 1).values('shard')
+                .annotate(lastmod=Max(lastmod)).order_by('shard').values_list('shard', 'lastmod'))
+
+
+def _shard_range(shard):
+    size = settings.BLOG_SITEMAP_SHARD_SIZE
+    return (shard - 1) * size, shard * size
+
+
+@read_replica
+def sitemap_index(request):
+    posts = _shards(Post.objects.all(), 'pk', 'updated_at')
+    authors = _shards(AuthorStats.objects.filter(post_count__gt=0), 'author_id', 'last_posted_at')
+    sitemaps = [(reverse('sitemap-posts', args=[shard]), lastmod) for shard, lastmod in posts]
+    sitemaps += [(reverse('sitemap-users', args=[shard]), lastmod) for shard, lastmod in authors]
+    last_modified = max((lastmod for _, lastmod in sitemaps if lastmod), default=None)
+
+    def write(fp):
+        fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        for path, lastmod in sitemaps:
+            fp.write(f'<sitemap><loc>{escape(request.build_absolute_uri(path))}</loc>')
+            if lastmod:
+                fp.write(f'<lastmod>{_lastmod(lastmod)}</lastmod>')
+            fp.write('</sitemap>\n')
+        fp.write('</sitemapindex>\n')
+    return _respond(request, 'sitemap', _version(request, *sitemaps), last_modified,
+                    'application/xml', write)
+
+
+@read_replica
+def sitemap_posts(request, shard):
+    low, high = _shard_range(shard)
+    posts = Post.objects.filter(pk__gt=low, pk__lte=high)
+    stats = posts.aggregate(count=Count('pk'), lastmod=Max('updated_at'))
+    if not stats['count']:
+        raise Http404('No such sitemap')
+    posts = posts.only('pk', 'updated_at').order_by('pk')
+    urls = ((post.get_absolute_url(), post.updated_at)
+            for post in posts.iterator(chunk_size=CHUNK_SIZE))
+    return _respond(request, f'sitemap-posts-{shard}',
+                    _version(request, shard, stats['count'], stats['lastmod']),
+                    stats['lastmod'], 'application/xml', _urlset(request, urls))
+
+
+@read_replica
+def sitemap_users(request, shard):
+    low, high = _shard_range(shard)
+    authors = AuthorStats.objects.filter(author_id__gt=low, author_id__lte=high,
+                                         post_count__gt=0)
+    stats = authors.aggregate(count=Count('pk'), lastmod=Max('last_posted_at'))
+    if not stats['count']:
+        raise Http404('No such sitemap')
+    rows = authors.order_by('author_id').values_list('author__username', 'last_posted_at')
+    urls = ((reverse('user-posts', args=[username]), lastmod)
+            for username, lastmod in rows.iterator(chunk_size=CHUNK_SIZE))
+    return _respond(request, f'sitemap-users-{shard}',
+                    _version(request, shard, stats['count'], stats['lastmod']),
+                    stats['lastmod'], 'application/xml', _urlset(request, urls))
+
+
+def _feed(request, kind, name, posts, title, link, description):
+    if kind not in FEEDS:
+        raise Http404('No such feed')
+    items = posts.order_by('-date_posted', '-id')[:settings.BLOG_SYNDICATION_ITEMS]
+    rows = list(items.values_list('pk', 'updated_at'))
+    last_modified = max((updated_at for _, updated_at in rows), default=None)
+    items = items.select_related('author').defer('content')
+
+    def write(fp):
+        feed = FEEDS[kind](title=title, link=request.build_absolute_uri(link),
+                           description=description, feed_url=request.build_absolute_uri(),
+                           language=settings.LANGUAGE_CODE)
+        for post in items.iterator(chunk_size=CHUNK_SIZE):
+            url = request.build_absolute_uri(post.get_absolute_url())
+            feed.add_item(title=post.title, link=url, unique_id=url, description=post.excerpt,
+                          author_name=post.author.username, pubdate=post.date_posted,
+                          updateddate=post.updated_at)
+        feed.write(fp, 'utf-8')
+    return _respond(request, f'{name}-{kind}', _version(request, title, *rows), last_modified,
+                    FEEDS[kind].content_type, write)
+
+
+@read_replica
+def posts_feed(request, kind):
+    return _feed(request, kind, 'feed', Post.objects.all(), 'Django Blog',
+                 reverse('blog-home'), 'The newest posts on Django Blog')
+
+
+@read_replica
+def user_feed(request, username, kind):
+    author = get_object_or_404(User, username=username)
+    return _feed(request, kind, f'feed-user-{author.pk}', Post.objects.filter(author=author),
+                 f'Django Blog - {author.username}', reverse('user-posts', args=[username]),
+                 f'The newest posts by {author.username}')
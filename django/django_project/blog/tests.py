@@ -1,3 +1,1179 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+import django_project.urls
+from django_project import assets, metrics
+from django_project.db import ReadReplicaRouter, read_replica
+from django_project.sqlite.base import DatabaseWrapper
+from users.models import DEFAULT_IMAGE, Follow, Profile
+from . import bulk
+from . import urls as blog_urls
+from . import cache as feed_cache
+from . import counters
+from . import search
+from . import timeline
+from . import trending
+from .models import AuthorStats, Generation, Post, TimelineEntry, TrendingScore
+from .pagination import CursorPaginator, InvalidCursor, decode_cursor
+
+
+# Most queries a page may issue however many posts and authors it shows;
+# one of them on the post pages is the conditional GET check (blog.conditional),
+# one on the home page the feed generation (blog.cache), and one the trending
+# sidebar, cached between runs (blog.trending)
+QUERY_BUDGETS = {
+    'blog-home': 4,
+    'user-posts': 3,
+    'post-detail': 2,
+}
+
+
+class MediaTestCase(TestCase):
+    """Gives each test its own MEDIA_ROOT so uploads never touch media/"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='blog-test-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        shutil.copy(os.path.join(settings.MEDIA_ROOT, DEFAULT_IMAGE), media_root)
+        # views are written by the tests that count them, never by a timer
+        media_settings = self.settings(MEDIA_ROOT=media_root, BACKGROUND_TASK_WORKERS=0,
+                                       BLOG_VIEW_FLUSH_SECONDS=0)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.addCleanup(counters.view_counts.clear)
+
+
+def create_posts(author, count, same_time=False):
+    now = timezone.now()
+    posts = [
+        Post(title=f'Post {i}', content='content', author=author,
+             date_posted=now if same_time else now - timedelta(minutes=i))
+        for i in range(count)
+    ]
+    # bulk_create skips save() and the signals that maintain AuthorStats
+    for post in posts:
+        post.summarize()
+    posts = Post.objects.bulk_create(posts)
+    AuthorStats.objects.rebuild([author.pk])
+    return posts
+
+
+class CursorPaginatorTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+
+    def walk(self, per_page):
+        paginator = CursorPaginator(Post.objects.all(), per_page)
+        page = paginator.page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen.extend(page)
+        return seen
+
+    def test_walks_every_post_newest_first(self):
+        create_posts(self.user, 12)
+        expected = list(Post.objects.order_by('-date_posted', '-id'))
+        self.assertEqual(self.walk(5), expected)
+
+    def test_ties_on_date_posted_are_broken_by_id(self):
+        create_posts(self.user, 7, same_time=True)
+        self.assertEqual(self.walk(3), list(Post.objects.order_by('-id')))
+
+    def test_previous_cursor_returns_the_previous_page(self):
+        create_posts(self.user, 12)
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_last_page(self):
+        create_posts(self.user, 12)
+        page = CursorPaginator(Post.objects.all(), 5).page('last')
+        self.assertEqual(list(page), list(Post.objects.order_by('-date_posted', '-id')[7:]))
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_invalid_cursor(self):
+        for token in ('garbage', 'WyJ4IiwxXQ', ''.join(['!'] * 8)):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+    def test_count_is_cached(self):
+        create_posts(self.user, 3)
+        paginator = CursorPaginator(Post.objects.all(), 5, count_key='test-count')
+        self.assertEqual(paginator.count, 3)
+        create_posts(self.user, 1)
+        self.assertEqual(paginator.count, 3)
+
+
+@override_settings(BLOG_PAGINATION='cursor')
+class FeedPaginationViewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        create_posts(self.user, 7)
+
+    def test_home_cursor_links(self):
+        response = self.client.get(reverse('blog-home'))
+        self.assertEqual(len(response.context['posts']), 5)
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+
+        response = self.client.get(reverse('blog-home'), {'cursor': next_cursor})
+        self.assertEqual(len(response.context['posts']), 2)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('blog-home'), {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_posts_shows_total(self):
+        response = self.client.get(reverse('user-posts', args=['writer']))
+        self.assertContains(response, 'writer (7)')
+
+    @override_settings(BLOG_PAGINATION='offset')
+    def test_offset_mode(self):
+        response = self.client.get(reverse('blog-home'), {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['posts']), 2)
+
+
+class QueryBudgetTestCase(MediaTestCase):
+    def assertWithinQueryBudget(self, url_name, *args, **params):
+        budget = QUERY_BUDGETS[url_name]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url_name} ran {len(queries)} queries, budget is {budget}:\n' +
+            '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+        return response
+
+
+@override_settings(BLOG_PAGINATION='cursor')
+class FeedQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.authors = [User.objects.create(username=f'author{i}')
+                        for i in range(6)]
+        for author in self.authors:
+            create_posts(author, 3)
+
+    def test_home(self):
+        response = self.assertWithinQueryBudget('blog-home')
+        self.assertGreater(len({post.author_id for post in response.context['posts']}), 1)
+        cursor = response.context['page_obj'].next_cursor
+        self.assertWithinQueryBudget('blog-home', cursor=cursor)
+
+    @override_settings(BLOG_PAGINATION='offset')
+    def test_home_offset(self):
+        self.assertWithinQueryBudget('blog-home', page=2)
+
+    def test_user_posts(self):
+        self.assertWithinQueryBudget('user-posts', 'author0')
+
+    def test_post_detail(self):
+        post = Post.objects.first()
+        self.assertWithinQueryBudget('post-detail', post.pk)
+
+
+class FeedCacheTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        create_posts(self.user, 3)
+
+    def test_second_hit_is_served_from_cache(self):
+        self.client.get(reverse('blog-home'))
+        # only the generation is read
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('blog-home'))
+        self.assertContains(response, 'Post 0')
+        self.assertEqual(feed_cache.stats()['hits'], 1)
+        self.assertEqual(feed_cache.stats()['misses'], 1)
+
+    def test_pages_are_cached_separately(self):
+        self.client.get(reverse('blog-home'))
+        self.client.get(reverse('blog-home'), {'cursor': 'last'})
+        self.assertEqual(feed_cache.stats()['misses'], 2)
+
+    def test_new_post_invalidates(self):
+        self.client.get(reverse('blog-home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Fresh post', content='new', author=self.user)
+        self.assertContains(self.client.get(reverse('blog-home')), 'Fresh post')
+
+    def test_deleted_post_invalidates(self):
+        self.client.get(reverse('blog-home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(title='Post 0').delete()
+        self.assertNotContains(self.client.get(reverse('blog-home')), 'Post 0')
+
+    def test_profile_image_change_invalidates(self):
+        self.client.get(reverse('blog-home'))
+        generation = feed_cache.generation()
+        profile = Profile.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(feed_cache.generation(), generation)
+
+        with open(os.path.join(settings.MEDIA_ROOT, DEFAULT_IMAGE), 'rb') as f:
+            profile.image = SimpleUploadedFile('new.jpg', f.read())
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertNotEqual(feed_cache.generation(), generation)
+
+    def test_another_workers_change_moves_etag_and_fragment(self):
+        etag = self.client.get(reverse('blog-home'))['ETag']
+        # as another worker would, whose cache this process doesn't share:
+        # write a post and bump the generation, with no signals run here
+        Post.objects.bulk_create([Post(title='Fresh post', content='new', author=self.user)])
+        Generation.objects.bump(feed_cache.GENERATION)
+        response = self.client.get(reverse('blog-home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Fresh post')
+
+    def test_login_does_not_invalidate(self):
+        generation = feed_cache.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['last_login'])
+        self.assertEqual(feed_cache.generation(), generation)
+
+    def test_stats_endpoint(self):
+        self.client.get(reverse('blog-home'))
+        response = self.client.get(reverse('feed-cache-stats'))
+        self.assertEqual(response.json()['misses'], 1)
+
+
+class SearchTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='writer')
+        self.ranked = Post.objects.create(title='Sourdough starter', content='Flour and water.',
+                                          author=self.user)
+        self.mention = Post.objects.create(title='Weekend', content='Fed the sourdough starter.',
+                                           author=self.user)
+        Post.objects.create(title='Bread', content='A starter made of sourdough.', author=self.user)
+
+    def titles(self, query, **kwargs):
+        return [post.title for post in search.search(query, **kwargs)[0]]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles('sourdough')[0], 'Sourdough starter')
+
+    def test_phrase_query(self):
+        self.assertEqual(sorted(self.titles('"sourdough starter"')), ['Sourdough starter', 'Weekend'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.mention.content = 'Baked a baguette.'
+        self.mention.save()
+        self.assertEqual(self.titles('baguette'), ['Weekend'])
+        self.assertNotIn('Weekend', self.titles('fed'))
+        self.ranked.delete()
+        self.assertNotIn('Sourdough starter', self.titles('flour'))
+
+    def test_bulk_created_posts_are_indexed(self):
+        create_posts(self.user, 3)
+        self.assertEqual(len(self.titles('content')), 3)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search.match_expression('bread OR "rye NEAR" x* -y'),
+                         '"bread" "OR" "rye NEAR" "x" "y"')
+        self.assertEqual(self.titles('starter OR ('), [])
+        self.assertEqual(self.titles('"" *'), [])
+
+    def test_pagination(self):
+        posts, has_next = search.search('starter', page=1, per_page=2)
+        self.assertEqual(len(posts), 2)
+        self.assertTrue(has_next)
+        posts, has_next = search.search('starter', page=2, per_page=2)
+        self.assertEqual(len(posts), 1)
+        self.assertFalse(has_next)
+
+    def test_only_newest_candidates_are_ranked(self):
+        self.assertEqual(self.titles('sourdough', candidates=1), ['Bread'])
+
+    def test_view(self):
+        response = self.client.get(reverse('blog-search'), {'q': 'flour'})
+        self.assertContains(response, 'Sourdough starter')
+        self.assertNotContains(response, 'Weekend')
+        self.assertEqual(self.client.get(reverse('blog-search'), {'page': 'x'}).status_code, 404)
+
+
+class BulkImportExportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='writer')
+
+    def records(self, count):
+        return [{'title': f'Imported {i}', 'content': 'x' * i, 'user_id': self.user.pk}
+                for i in range(count)]
+
+    def test_parser_streams_arrays_and_json_lines(self):
+        records = self.records(20)
+        array = json.dumps(records, indent=2)
+        lines = ''.join(json.dumps(record) + '\n' for record in records)
+        for text, expected in ((array, records), (lines, records), (' ' * 10 + array, records),
+                               ('[]', []), ('', [])):
+            for chunk_size in (7, 64, bulk.CHUNK_SIZE):
+                parsed = list(bulk.iter_records(io.StringIO(text), chunk_size=chunk_size))
+                self.assertEqual(parsed, expected)
+
+    def test_parser_rejects_truncated_input(self):
+        for text in ('[{"title": "a"}', '{"title": "a"'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(bulk.iter_records(io.StringIO(text), chunk_size=4))
+
+    def test_import_batches_and_skips_invalid_records(self):
+        records = self.records(25) + [
+            {'title': 'Ghost', 'content': 'x', 'user_id': 999},
+            {'title': '', 'content': 'x', 'user_id': self.user.pk},
+            {'title': 'x' * 101, 'content': 'x', 'user_id': self.user.pk},
+            'not a record',
+        ]
+        errors = []
+        # user map; per batch a savepoint, the INSERT, an AuthorStats UPDATE and
+        # the release; the first batch also creates the AuthorStats row
+        with self.assertNumQueries(1 + 3 * 4 + 3):
+            imported, skipped, seconds = bulk.import_posts(
+                records, batch_size=10, on_error=lambda index, error: errors.append(index))
+        self.assertEqual((imported, skipped), (25, 4))
+        self.assertEqual(errors, [25, 26, 27, 28])
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 25)
+        self.assertEqual(AuthorStats.objects.get(author=self.user).post_count, 25)
+
+    def test_import_command_loads_seed_file(self):
+        User.objects.bulk_create([User(pk=pk, username=f'seed{pk}') for pk in (9, 10, 11)])
+        path = os.path.join(settings.BASE_DIR, 'posts.json')
+        with open(path) as fp:
+            expected = len(json.load(fp))
+        out = io.StringIO()
+        call_command('import_posts', path, batch_size=5, stdout=out)
+        self.assertIn(f'Imported {expected} posts, skipped 0', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertEqual(Post.objects.count(), expected)
+
+    def test_export_round_trip(self):
+        create_posts(self.user, 3)
+        for fmt in ('json', 'jsonl'):
+            out = io.StringIO()
+            call_command('export_posts', format=fmt, stdout=out, stderr=io.StringIO())
+            exported = list(bulk.iter_records(io.StringIO(out.getvalue())))
+            self.assertEqual([record['title'] for record in exported], ['Post 0', 'Post 1', 'Post 2'])
+            if fmt == 'json':
+                self.assertEqual(len(json.loads(out.getvalue())), 3)
+
+        Post.objects.all().delete()
+        bulk.import_posts(exported)
+        self.assertEqual(
+            sorted(Post.objects.values_list('title', 'date_posted')),
+            sorted((record['title'], parse_datetime(record['date_posted'])) for record in exported))
+
+    def test_import_invalidates_feed(self):
+        generation = feed_cache.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.import_posts(self.records(2))
+        self.assertNotEqual(feed_cache.generation(), generation)
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_pragmas_are_applied_on_connect(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory, 'profile.sqlite3'),
+            'OPTIONS': {'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+                                    'cache_size': -2000}},
+        }, alias='profile-test')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            values = [cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                      for name in ('journal_mode', 'synchronous', 'cache_size')]
+        self.assertEqual(values, ['wal', 1, -2000])
+
+    def test_router_uses_replica_only_in_marked_views(self):
+        router = ReadReplicaRouter()
+        replica = mock.Mock(in_atomic_block=False)
+        with mock.patch('django_project.db.connections', {'default': replica, 'replica': replica}):
+            self.assertEqual(router.db_for_read(Post), 'default')
+            self.assertEqual(read_replica(lambda: router.db_for_read(Post))(), 'replica')
+            self.assertEqual(read_replica(lambda: router.db_for_write(Post))(), 'default')
+            replica.in_atomic_block = True
+            self.assertEqual(read_replica(lambda: router.db_for_read(Post))(), 'default')
+
+
+
+class AuthorStatsTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='counted')
+        self.now = timezone.now()
+
+    def stats(self, user=None):
+        stats = AuthorStats.objects.get(author=user or self.user)
+        return stats.post_count, stats.last_posted_at, stats.content_length
+
+    def test_create_update_delete_keep_stats_current(self):
+        old = Post.objects.create(title='Old', content='abc', author=self.user,
+                                  date_posted=self.now - timedelta(days=1))
+        new = Post.objects.create(title='New', content='defgh', author=self.user, date_posted=self.now)
+        self.assertEqual(self.stats(), (2, self.now, 8))
+        new = Post.objects.get(pk=new.pk)
+        new.content = 'de'
+        new.save()
+        self.assertEqual(self.stats(), (2, self.now, 5))
+        new.delete()
+        self.assertEqual(self.stats(), (1, old.date_posted, 3))
+        Post.objects.all().delete()
+        self.assertEqual(self.stats(), (0, None, 0))
+
+    def test_moving_a_post_between_authors(self):
+        other = User.objects.create(username='other')
+        post = Post.objects.create(title='Mine', content='abcd', author=self.user, date_posted=self.now)
+        post.author = other
+        post.save()
+        self.assertEqual(self.stats(), (0, None, 0))
+        self.assertEqual(self.stats(other), (1, self.now, 4))
+
+    def test_reconcile_command_rebuilds_drifted_stats(self):
+        create_posts(self.user, 3)
+        AuthorStats.objects.filter(author=self.user).update(post_count=99)
+        out = io.StringIO()
+        call_command('reconcile_author_stats', dry_run=True, stdout=out)
+        self.assertIn('1 out of date', out.getvalue())
+        self.assertEqual(self.stats()[0], 99)
+        call_command('reconcile_author_stats', stdout=io.StringIO())
+        self.assertEqual(self.stats(), (3, Post.objects.latest('date_posted').date_posted, 21))
+
+    def test_user_page_counts_from_stats(self):
+        create_posts(self.user, 7)
+        AuthorStats.objects.filter(author=self.user).update(post_count=70)
+        for mode in ('cursor', 'offset'):
+            with self.settings(BLOG_PAGINATION=mode):
+                response = self.client.get(reverse('user-posts', args=['counted']))
+                self.assertContains(response, 'counted (70)')
+
+    def test_top_authors(self):
+        other = User.objects.create(username='prolific')
+        create_posts(self.user, 2)
+        create_posts(other, 5)
+        self.assertEqual([stats.author.username for stats in AuthorStats.objects.top()],
+                         ['prolific', 'counted'])
+
+
+class ConditionalGetTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        create_posts(self.user, 3)
+        self.post = Post.objects.get(title='Post 0')
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_post_detail(self):
+        url = reverse('post-detail', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(response['Last-Modified'], http_date(self.post.updated_at.timestamp()))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+        self.post.title = 'Edited'
+        self.post.save()
+        self.assertContains(self.revalidate(url, response), 'Edited')
+
+    def test_signed_in_users_get_their_own_etag(self):
+        url = reverse('post-detail', args=[self.post.pk])
+        anonymous = self.client.get(url)
+        self.client.force_login(self.user)
+        response = self.revalidate(url, anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Update')
+
+    def test_home_revalidates_with_one_query(self):
+        response = self.client.get(reverse('blog-home'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(reverse('blog-home'), response).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Fresh post', content='new', author=self.user)
+        self.assertContains(self.revalidate(reverse('blog-home'), response), 'Fresh post')
+
+    def test_user_feed_changes_when_a_post_goes(self):
+        url = reverse('user-posts', args=['writer'])
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        other_page = self.revalidate(url, response, cursor='last')
+        self.assertEqual(other_page.status_code, 200)
+        Post.objects.filter(title='Post 2').delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+
+class PostSummaryTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+
+    def test_save_stores_summary(self):
+        content = ' '.join(f'word{i}' for i in range(450))
+        post = Post.objects.create(title='Long', content=content, author=self.user)
+        post.refresh_from_db()
+        self.assertEqual(post.word_count, 450)
+        self.assertEqual(post.reading_time, 3)
+        self.assertTrue(post.excerpt.startswith('word0 word1'))
+        self.assertEqual(len(post.excerpt.split()), 50)
+        self.assertTrue(post.is_truncated)
+
+        post.content = 'now short'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count, post.reading_time), ('now short', 2, 1))
+        self.assertFalse(post.is_truncated)
+
+    def test_feeds_defer_content_and_show_excerpt(self):
+        content = ' '.join(['word'] * 60) + ' hidden-tail'
+        Post.objects.create(title='Long', content=content, author=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('blog-home'))
+        self.assertNotContains(response, 'hidden-tail')
+        self.assertContains(response, 'Read more')
+        self.assertContains(response, '1 min read')
+        post_query = next(query['sql'] for query in queries if 'FROM "blog_post"' in query['sql'])
+        self.assertNotIn('"blog_post"."content"', post_query)
+
+    def test_detail_renders_cached_body(self):
+        post = Post.objects.create(title='Body', content='first\n\n<b>second</b>', author=self.user)
+        response = self.client.get(reverse('post-detail', args=[post.pk]))
+        self.assertContains(response, '<p>first</p>')
+        self.assertContains(response, '&lt;b&gt;second&lt;/b&gt;')
+
+        # the cached body is keyed by updated_at, so an edit is shown at once
+        post.content = 'edited'
+        post.save()
+        response = self.client.get(reverse('post-detail', args=[post.pk]))
+        self.assertContains(response, '<p>edited</p>')
+
+    def test_backfill_command(self):
+        post = Post.objects.create(title='Old', content='one two three', author=self.user)
+        Post.objects.filter(pk=post.pk).update(excerpt='', word_count=0, reading_time=0)
+        out = io.StringIO()
+        call_command('backfill_post_summaries', batch_size=1, stdout=out)
+        self.assertIn('Summarized 1 posts', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count, post.reading_time), ('one two three', 3, 1))
+
+        call_command('backfill_post_summaries', stdout=out)
+        self.assertIn('Summarized 0 posts', out.getvalue())
+
+
+class ApiTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='writer', password='pass')
+        self.posts = create_posts(self.user, 5)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_cursor_pages(self):
+        url = reverse('api-posts')
+        status, page = self.get(url, limit=2)
+        self.assertEqual(status, 200)
+        self.assertEqual([post['title'] for post in page['results']], ['Post 0', 'Post 1'])
+        self.assertIsNone(page['previous'])
+        self.assertNotIn('content', page['results'][0])
+        self.assertEqual(page['results'][0]['author'], 'writer')
+
+        titles = []
+        with self.assertNumQueries(1):
+            status, page = self.get(url, limit=2, cursor=page['next'])
+        while True:
+            titles += [post['title'] for post in page['results']]
+            if not page['next']:
+                break
+            status, page = self.get(url, limit=2, cursor=page['next'])
+        self.assertEqual(titles, ['Post 2', 'Post 3', 'Post 4'])
+
+        self.assertEqual(self.get(url, cursor='junk')[0], 400)
+        self.assertEqual(self.get(url, limit=0)[0], 400)
+
+    def test_sparse_fields_read_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            status, page = self.get(reverse('api-posts'), fields='id,title')
+        self.assertEqual(set(page['results'][0]), {'id', 'title'})
+        self.assertNotIn('"blog_post"."excerpt"', queries[0]['sql'])
+        self.assertNotIn('auth_user', queries[0]['sql'])
+
+        status, body = self.get(reverse('api-posts'), fields='id,secret')
+        self.assertEqual((status, body['error']), (400, 'unknown fields secret'))
+
+    def test_batch_fetch_keeps_order(self):
+        ids = [self.posts[3].pk, 999, self.posts[0].pk]
+        status, page = self.get(reverse('api-posts'), ids=','.join(map(str, ids)), fields='id')
+        self.assertEqual(page['results'], [{'id': self.posts[3].pk}, {'id': self.posts[0].pk}])
+        self.assertEqual(self.get(reverse('api-posts'), ids='1,x')[0], 400)
+
+    def test_detail(self):
+        status, post = self.get(reverse('api-post-detail', args=[self.posts[0].pk]))
+        self.assertEqual((status, post['content']), (200, 'content'))
+        self.assertEqual(post['url'], reverse('post-detail', args=[self.posts[0].pk]))
+        self.assertEqual(self.get(reverse('api-post-detail', args=[999]))[0], 404)
+
+    def test_gzip(self):
+        # gzip_page leaves bodies under 200 bytes alone
+        Post.objects.update(content='Lorem ipsum dolor sit amet. ' * 20)
+        response = self.client.get(reverse('api-posts'), {'fields': 'content'},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+
+    def post(self, body):
+        response = self.client.post(reverse('api-posts'), json.dumps(body),
+                                    content_type='application/json')
+        return response.status_code, json.loads(response.content)
+
+    def test_create_needs_sign_in(self):
+        self.assertEqual(self.post({'title': 'New', 'content': 'text'})[0], 401)
+
+    def test_create_one_and_many(self):
+        self.client.login(username='writer', password='pass')
+        status, post = self.post({'title': 'New', 'content': 'text', 'user_id': 999})
+        self.assertEqual((status, post['author'], post['word_count']), (201, 'writer', 1))
+        self.assertTrue(Post.objects.filter(pk=post['id'], author=self.user).exists())
+
+        generation = feed_cache.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            status, body = self.post([{'title': f'Bulk {i}', 'content': 'text'} for i in range(3)])
+        self.assertEqual(status, 201)
+        self.assertEqual([post['title'] for post in body['results']], ['Bulk 0', 'Bulk 1', 'Bulk 2'])
+        self.assertTrue(all(post['id'] for post in body['results']))
+        self.assertNotEqual(feed_cache.generation(), generation)
+        self.assertEqual(AuthorStats.objects.get(author=self.user).post_count, 9)
+
+    def test_create_ignores_date_posted(self):
+        self.client.login(username='writer', password='pass')
+        before = timezone.now()
+        for date_posted in ('2999-01-01T00:00:00Z', '2000-01-01T00:00:00Z'):
+            status, post = self.post({'title': 'Dated', 'content': 'text',
+                                      'date_posted': date_posted})
+            self.assertEqual(status, 201)
+            self.assertGreaterEqual(parse_datetime(post['date_posted']), before)
+            self.assertLessEqual(Post.objects.get(pk=post['id']).date_posted, timezone.now())
+
+    def test_create_rejects_whole_batch_on_invalid_post(self):
+        self.client.login(username='writer', password='pass')
+        status, body = self.post([{'title': 'Fine', 'content': 'text'}, {'title': ''}])
+        self.assertEqual(status, 400)
+        self.assertEqual(body['posts'], [{'index': 1, 'error': 'missing title'}])
+        self.assertFalse(Post.objects.filter(title='Fine').exists())
+
+
+class MetricsTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        metrics.registry.clear()
+        self.user = User.objects.create(username='writer')
+        create_posts(self.user, 3)
+
+    def test_server_timing_counts_queries_and_templates(self):
+        url = reverse('post-detail', args=[Post.objects.first().pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        timing = response.headers['Server-Timing']
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertRegex(timing, r'tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('blog-home'))
+        self.client.get(reverse('blog-home'))
+        self.client.get('/no-such-page/')
+        response = self.client.get(reverse('metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",status="200",view="blog-home"} 2', body)
+        self.assertIn('http_requests_total{method="GET",status="404",view="<unmatched>"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="blog-home"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="blog-home",le="+Inf"} 2',
+                      body)
+        self.assertIn('# TYPE template_render_duration_seconds histogram', body)
+
+    def test_slow_requests_are_logged(self):
+        with self.settings(METRICS_SLOW_REQUEST_SECONDS=0), \
+                self.assertLogs('django_project.metrics', 'WARNING') as logs:
+            self.client.get(reverse('blog-about'))
+        self.assertIn('Slow request: GET /about/ (blog-about)', logs.output[0])
+
+
+class StaticAssetTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.settings = override_settings(STATIC_ROOT=root)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(root, 'staticfiles.json')) as fp:
+            self.hashed = json.load(fp)['paths']['blog/main.css']
+        self.middleware = assets.StaticFilesMiddleware(lambda request: None)
+
+    def test_minify_css(self):
+        css = '/* note */\n.a  .b > p {\n  color: red;\n  margin: 0 auto;\n}\n'
+        self.assertEqual(assets.minify_css(css), '.a .b>p{color:red;margin:0 auto}')
+
+    def test_minify_css_keeps_strings_and_urls(self):
+        css = ('p::after {\n  content: "a : b; /* c */ { d }";\n'
+               "  quotes: 'it\\'s ,  x';\n"
+               '  background: url(data:image/png;base64,AA==) , url( "x y.png" );\n}\n')
+        self.assertEqual(assets.minify_css(css),
+                         'p::after{content:"a : b; /* c */ { d }";'
+                         "quotes:'it\\'s ,  x';"
+                         'background:url(data:image/png;base64,AA==),url( "x y.png" )}')
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        self.assertNotEqual(self.hashed, 'blog/main.css')
+        self.assertTrue(os.path.exists(os.path.join(settings.STATIC_ROOT, self.hashed + '.gz')))
+
+    def test_serves_hashed_file_compressed_and_immutable(self):
+        url = settings.STATIC_URL + self.hashed
+        request = RequestFactory().get('/' + url.lstrip('/'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], assets.IMMUTABLE)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        response.close()
+
+        request = RequestFactory().get('/' + url.lstrip('/'), HTTP_IF_NONE_MATCH=response.headers['ETag'],
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(self.middleware(request).status_code, 304)
+
+    def test_plain_name_is_revalidated(self):
+        request = RequestFactory().get('/' + settings.STATIC_URL.lstrip('/') + 'blog/main.css')
+        response = self.middleware(request)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.headers['Cache-Control'], assets.MUTABLE)
+        response.close()
+
+
+class TimelineTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = User.objects.create(username='reader')
+        self.author = User.objects.create(username='writer')
+        self.other = User.objects.create(username='other')
+
+    def follow(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.follow(self.reader, author)
+
+    def post(self, author, title, minutes_ago=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(title=title, content='content', author=author,
+                                       date_posted=timezone.now() - timedelta(minutes=minutes_ago))
+
+    def titles(self, cursor=None, per_page=5):
+        return [post.title for post in timeline.page(self.reader, cursor, per_page)]
+
+    def test_follow_counts_and_backfills(self):
+        self.post(self.author, 'Before')
+        self.follow(self.author)
+        self.assertEqual(Profile.objects.get(user=self.author).follower_count, 1)
+        self.assertEqual(self.titles(), ['Before'])
+        self.assertFalse(Follow.objects.follow(self.reader, self.author))
+
+    def test_new_posts_fan_out_and_leave_with_their_post(self):
+        self.follow(self.author)
+        post = self.post(self.author, 'Fresh')
+        self.post(self.other, 'Unfollowed')
+        self.assertEqual(self.titles(), ['Fresh'])
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_unfollow_forgets_the_author(self):
+        self.follow(self.author)
+        self.follow(self.other)
+        self.post(self.author, 'Kept')
+        self.post(self.other, 'Gone')
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.unfollow(self.reader, self.other)
+        self.assertEqual(self.titles(), ['Kept'])
+        self.assertEqual(Profile.objects.get(user=self.other).follower_count, 0)
+
+    def test_popular_authors_are_merged_in_on_read(self):
+        self.follow(self.author)
+        self.follow(self.other)
+        with self.settings(BLOG_TIMELINE_FANOUT_LIMIT=0):
+            for i in range(4):
+                self.post(self.author, f'Popular {i}', minutes_ago=2 * i)
+            self.assertFalse(TimelineEntry.objects.filter(author=self.author).exists())
+        for i in range(4):
+            self.post(self.other, f'Fanned {i}', minutes_ago=2 * i + 1)
+        with self.settings(BLOG_TIMELINE_FANOUT_LIMIT=0):
+            expected = ['Popular 0', 'Fanned 0', 'Popular 1', 'Fanned 1', 'Popular 2',
+                        'Fanned 2', 'Popular 3', 'Fanned 3']
+            first = timeline.page(self.reader, None, 3)
+            self.assertEqual([post.title for post in first], expected[:3])
+            second = timeline.page(self.reader, first.next_cursor, 3)
+            self.assertEqual([post.title for post in second], expected[3:6])
+            back = timeline.page(self.reader, second.previous_cursor, 3)
+            self.assertEqual([post.title for post in back], expected[:3])
+            self.assertFalse(back.has_previous())
+            self.assertEqual(self.titles('last', 3), expected[-3:])
+
+    def test_trim_keeps_the_newest(self):
+        self.follow(self.author)
+        for i in range(5):
+            self.post(self.author, f'Post {i}', minutes_ago=i)
+        with self.settings(BLOG_TIMELINE_LENGTH=3):
+            self.assertEqual(timeline.trim(), 2)
+        self.assertEqual(self.titles(), ['Post 0', 'Post 1', 'Post 2'])
+
+    def test_views(self):
+        self.client.force_login(self.reader)
+        response = self.client.post(reverse('user-follow', args=['writer']))
+        self.assertRedirects(response, reverse('user-posts', args=['writer']))
+        page = self.client.get(reverse('user-posts', args=['writer']))
+        self.assertContains(page, 'Unfollow')
+        self.assertContains(page, '1 follower')
+
+        self.post(self.author, 'In the timeline')
+        self.assertContains(self.client.get(reverse('blog-timeline')), 'In the timeline')
+        self.client.post(reverse('user-unfollow', args=['writer']))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.client.get(reverse('user-follow', args=['writer'])).status_code, 405)
+
+
+class ViewCounterTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        self.posts = create_posts(self.user, 3)
+
+    def view(self, post, times=1):
+        for _ in range(times):
+            self.assertEqual(self.client.get(reverse('post-detail', args=[post.pk])).status_code,
+                             200)
+
+    def test_views_are_buffered_and_written_in_one_transaction(self):
+        self.view(self.posts[0], 3)
+        self.view(self.posts[1], 3)
+        self.view(self.posts[2])
+        self.assertFalse(Post.objects.filter(views__gt=0).exists())
+        # one UPDATE per distinct count, in a transaction, then the ranking
+        with CaptureQueriesContext(connection) as queries:
+            counters.view_counts.flush()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(dict(Post.objects.values_list('title', 'views')),
+                         {'Post 0': 3, 'Post 1': 3, 'Post 2': 1})
+        with self.assertNumQueries(0):
+            counters.view_counts.flush()
+
+    def test_flushes_after_enough_hits(self):
+        updated_at = Post.objects.get(pk=self.posts[0].pk).updated_at
+        with self.settings(BLOG_VIEW_FLUSH_HITS=2):
+            self.view(self.posts[0], 2)
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(post.views, 2)
+        self.assertEqual(post.updated_at, updated_at)
+
+    def test_most_viewed_is_served_from_the_ranking(self):
+        self.view(self.posts[2], 2)
+        self.view(self.posts[0])
+        counters.view_counts.flush()
+        # the ranking was cached by the flush: only the posts are loaded
+        with self.assertNumQueries(1):
+            self.assertEqual([post.title for post in counters.most_viewed()],
+                             ['Post 2', 'Post 0'])
+        self.posts[2].delete()
+        self.assertEqual([post.title for post in counters.most_viewed()], ['Post 0'])
+        response = self.client.get(reverse('blog-most-viewed'))
+        self.assertContains(response, 'Post 0')
+
+    def test_written_views_change_the_etag(self):
+        url = reverse('post-detail', args=[self.posts[0].pk])
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         304)
+        counters.view_counts.flush()
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(fresh, '1 view')
+
+
+@override_settings(BLOG_TRENDING_HALF_LIFE_HOURS=1)
+class TrendingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        self.posts = create_posts(self.user, 3)
+        self.now = timezone.now()
+
+    def views(self, post, views):
+        Post.objects.filter(pk=post.pk).update(views=views)
+
+    def scores(self):
+        return dict(TrendingScore.objects.values_list('post__title', 'score'))
+
+    def test_new_views_add_to_the_decayed_score(self):
+        self.views(self.posts[0], 8)
+        self.assertEqual(trending.rank(self.now), 1)
+        self.assertEqual(self.scores(), {'Post 0': 8})
+        # two half-lives on, with 2 more views
+        self.views(self.posts[0], 10)
+        trending.rank(self.now + timedelta(hours=2))
+        self.assertEqual(self.scores(), {'Post 0': 8 / 4 + 2})
+
+    def test_recent_views_outrank_old_ones(self):
+        self.views(self.posts[0], 100)
+        trending.rank(self.now)
+        self.views(self.posts[1], 10)
+        trending.rank(self.now + timedelta(hours=5))
+        self.assertEqual([post.title for post in trending.top()], ['Post 1', 'Post 0'])
+
+    def test_cold_posts_drop_out(self):
+        self.views(self.posts[0], 1)
+        trending.rank(self.now)
+        trending.rank(self.now + timedelta(hours=10))
+        self.assertEqual(self.scores(), {'Post 0': 0})
+        self.assertEqual(trending.top(), [])
+        # nothing left to decay or add
+        self.assertEqual(trending.rank(self.now + timedelta(hours=11)), 0)
+
+    def test_pages_read_the_stored_ranking(self):
+        self.views(self.posts[2], 5)
+        self.views(self.posts[1], 3)
+        call_command('rank_trending', stdout=io.StringIO())
+        with self.assertNumQueries(1):
+            self.assertEqual([post.title for post in trending.top()], ['Post 2', 'Post 1'])
+        response = self.client.get(reverse('blog-trending'))
+        self.assertContains(response, 'Post 2')
+        home = self.client.get(reverse('blog-home'))
+        self.assertEqual(home.context['trending'], [(self.posts[2].pk, 'Post 2'),
+                                                    (self.posts[1].pk, 'Post 1')])
+        with self.assertNumQueries(0):
+            trending.sidebar()
+
+    def test_ranking_moves_the_home_etag(self):
+        response = self.client.get(reverse('blog-home'))
+        self.views(self.posts[0], 1)
+        trending.rank()
+        fresh = self.client.get(reverse('blog-home'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.context['trending'], [(self.posts[0].pk, 'Post 0')])
+
+
+@override_settings(BLOG_SITEMAP_SHARD_SIZE=2)
+class SyndicationTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp(prefix='blog-test-syndication-')
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        syndication_settings = self.settings(BLOG_SYNDICATION_ROOT=root)
+        syndication_settings.enable()
+        self.addCleanup(syndication_settings.disable)
+        self.root = root
+        self.user = User.objects.create(username='writer')
+        self.posts = create_posts(self.user, 3)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_index_lists_the_shards(self):
+        shards = {(post.pk - 1) // 2 + 1 for post in self.posts}
+        index = self.content(self.client.get(reverse('sitemap')))
+        self.assertEqual(index.count('<sitemap>'), len(shards) + 1)
+        for shard in shards:
+            self.assertIn('http://testserver' + reverse('sitemap-posts', args=[shard]), index)
+        user_shard = (self.user.pk - 1) // 2 + 1
+        users = self.client.get(reverse('sitemap-users', args=[user_shard]))
+        self.assertIn('http://testserver' + reverse('user-posts', args=['writer']),
+                      self.content(users))
+        missing = self.client.get(reverse('sitemap-posts', args=[max(shards) + 1]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_shard_lists_posts_and_is_kept_on_disk(self):
+        shards = {}
+        for post in self.posts:
+            shards.setdefault((post.pk - 1) // 2 + 1, []).append(post)
+        for shard, posts in shards.items():
+            response = self.client.get(reverse('sitemap-posts', args=[shard]))
+            self.assertEqual(response['Content-Type'], 'application/xml')
+            sitemap = self.content(response)
+            for post in self.posts:
+                url = 'http://testserver' + post.get_absolute_url()
+                if post in posts:
+                    self.assertIn(url, sitemap)
+                else:
+                    self.assertNotIn(url, sitemap)
+
+        first = min(post.pk for post in self.posts)
+        url = reverse('sitemap-posts', args=[(first - 1) // 2 + 1])
+        written = sorted(os.listdir(self.root))
+        with self.assertNumQueries(1):
+            self.content(self.client.get(url))
+        self.assertEqual(sorted(os.listdir(self.root)), written)
+
+        # only the changed shard is written again, in place of the old one
+        post = Post.objects.get(pk=first)
+        post.title = 'Edited'
+        post.save()
+        self.content(self.client.get(url))
+        rewritten = sorted(os.listdir(self.root))
+        self.assertEqual(len(rewritten), len(written))
+        self.assertEqual(len(set(rewritten) - set(written)), 1)
+
+    def test_revalidation(self):
+        url = reverse('posts-feed', args=['atom'])
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_feeds(self):
+        atom = self.client.get(reverse('posts-feed', args=['atom']))
+        self.assertTrue(atom['Content-Type'].startswith('application/atom+xml'))
+        self.assertIn('<title>Post 0</title>', self.content(atom))
+        rss = self.client.get(reverse('user-feed', args=['writer', 'rss']))
+        self.assertIn('<title>Post 2</title>', self.content(rss))
+        User.objects.create(username='other')
+        empty = self.client.get(reverse('user-feed', args=['other', 'atom']))
+        self.assertNotIn('<entry>', self.content(empty))
+        self.assertEqual(self.client.get(reverse('user-feed', args=['nobody', 'atom'])).status_code,
+                         404)
+        self.assertEqual(self.client.get(reverse('posts-feed', args=['json'])).status_code, 404)
+
+
+class SyncURLConf:
+    # the sync views whatever BLOG_ASYNC_VIEWS says
+    urlpatterns = blog_urls.read_urlpatterns + django_project.urls.urlpatterns
+
+
+@override_settings(BLOG_STREAM_CHUNK_SIZE=3, ROOT_URLCONF=SyncURLConf)
+class StreamingArchiveTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        create_posts(self.user, 7)
+
+    def test_archive_streams_every_post_in_chunks(self):
+        response = self.client.get(reverse('blog-archive'))
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn('<nav', chunks[0])
+        self.assertNotIn('Post 0', chunks[0])
+        # head, ceil(7 / 3) chunks of posts, tail
+        self.assertEqual(len(chunks), 1 + 3 + 1)
+        self.assertIn('Post 0', chunks[1])
+        self.assertIn('Post 6', chunks[3])
+        self.assertIn('</html>', chunks[-1])
+
+    def test_archive_rows_are_read_lazily(self):
+        response = self.client.get(reverse('blog-archive'))
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(response.streaming_content)
+        self.assertEqual(len(queries), 1)
+
+    def test_archive_answers_conditional_get(self):
+        etag = self.client.get(reverse('blog-archive'))['ETag']
+        response = self.client.get(reverse('blog-archive'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class AsyncURLConf:
+    urlpatterns = blog_urls.async_read_urlpatterns + django_project.urls.urlpatterns
+
+
+@override_settings(ROOT_URLCONF=AsyncURLConf, BLOG_PAGINATION='cursor')
+class AsyncViewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        create_posts(self.user, 7)
+
+    async def test_home_pages(self):
+        response = await self.async_client.get(reverse('blog-home'))
+        self.assertContains(response, 'Post 0')
+        self.assertNotContains(response, 'Post 5')
+        self.assertEqual(response.resolver_match.func, blog_urls.async_views.home)
+
+        page = await self.async_client.get(reverse('blog-home'), {'cursor': 'last'})
+        self.assertContains(page, 'Post 6')
+        missing = await self.async_client.get(reverse('blog-home'), {'cursor': 'nope'})
+        self.assertEqual(missing.status_code, 404)
+
+    @override_settings(BLOG_PAGINATION='offset')
+    async def test_home_offset_mode(self):
+        response = await self.async_client.get(reverse('blog-home'), {'page': 2})
+        self.assertContains(response, 'Post 6')
+        missing = await self.async_client.get(reverse('blog-home'), {'page': 9})
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_user_posts(self):
+        response = await self.async_client.get(reverse('user-posts', args=['writer']))
+        self.assertContains(response, 'writer (7)')
+        missing = await self.async_client.get(reverse('user-posts', args=['nobody']))
+        self.assertEqual(missing.status_code, 404)
+
+    async def test_post_detail_for_author(self):
+        post = await Post.objects.aget(title='Post 0')
+        # AsyncClient.aforce_login is Django 5.0+
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('post-detail', args=[post.pk]))
+        self.assertContains(response, reverse('post-update', args=[post.pk]))
+        missing = await self.async_client.get(reverse('post-detail', args=[0]))
+        self.assertEqual(missing.status_code, 404)
+
+    @override_settings(BLOG_STREAM_CHUNK_SIZE=3)
+    async def test_archive_streams(self):
+        response = await self.async_client.get(reverse('blog-archive'))
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 1 + 3 + 1)
+        self.assertIn('Post 6', chunks[3])
+
+    async def test_about(self):
+        response = await self.async_client.get(reverse('blog-about'))
+        self.assertContains(response, 'Login')
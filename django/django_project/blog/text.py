@@ -0,0 +1,34 @@
+"""Derived forms of a post's content: the feed excerpt, word count and
+reading time stored on Post, and the rendered HTML body."""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.defaultfilters import linebreaks_filter
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+
+EXCERPT_WORDS = 50
+WORDS_PER_MINUTE = 200
+
+
+def summarize(content):
+    """Return ``(excerpt, word_count, reading_time)`` for ``content``"""
+    word_count = len(content.split())
+    return (
+        Truncator(content).words(EXCERPT_WORDS),
+        word_count,
+        max(1, math.ceil(word_count / WORDS_PER_MINUTE)),
+    )
+
+
+def rendered_body(post):
+    """``post.content`` as HTML paragraphs, cached per post version"""
+    # updated_at moves on every save, so edits never see a stale body
+    key = f'blog:post-body:{post.pk}:{post.updated_at.timestamp()}'
+    html = cache.get(key)
+    if html is None:
+        html = linebreaks_filter(post.content, autoescape=True)
+        cache.set(key, html, settings.BLOG_POST_BODY_CACHE_TIMEOUT)
+    return mark_safe(html)
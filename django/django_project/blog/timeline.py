@@ -0,0 +1,133 @@
+"""Personal timelines: the newest posts of the authors a user follows.
+
+A timeline is materialized as TimelineEntry rows, one per post, written by
+``fan_out`` in a background task when a followed author posts (fan-out on
+write), so a page is one index seek however many authors the reader
+follows. Authors with more than BLOG_TIMELINE_FANOUT_LIMIT followers are
+not fanned out, each post would write that many rows; ``page`` reads their
+posts from the posts table and merges them in (fan-out on read).
+
+Entries go with their post. ``trim`` keeps each timeline to its newest
+BLOG_TIMELINE_LENGTH entries; it runs after every backfill and from
+``manage.py rebuild_timelines --trim``, as trimming on every fan-out would
+cost more than the write. Pages never read past what they show, so a
+timeline waiting to be trimmed is no slower to read. Background tasks are
+lost if the process dies; ``manage.py rebuild_timelines`` rewrites every
+timeline from the follow graph.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from users.models import Follow, Profile
+from .models import Post, TimelineEntry
+from .pagination import LAST, PREVIOUS, CursorPage, CursorPaginator, decode_cursor
+
+
+def is_popular(follower_count):
+    return follower_count > settings.BLOG_TIMELINE_FANOUT_LIMIT
+
+
+def _entries(user_id, posts):
+    return [TimelineEntry(user_id=user_id, post_id=pk, author_id=author_id, date_posted=date_posted)
+            for pk, author_id, date_posted in posts]
+
+
+def fan_out(post_id):
+    """Add a new post to the timelines of its author's followers"""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'date_posted', 'author__profile__follower_count').first()
+    if row is None or is_popular(row[2]):
+        return  # deleted before the task ran, or read on demand
+    author_id, date_posted, _ = row
+    followers = Follow.objects.filter(author_id=author_id).order_by('follower_id')\
+        .values_list('follower_id', flat=True)
+    batch_size = settings.BLOG_TIMELINE_BATCH_SIZE
+    last = 0
+    while True:
+        batch = list(followers.filter(follower_id__gt=last)[:batch_size])
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                           date_posted=date_posted) for user_id in batch],
+            ignore_conflicts=True)
+        last = batch[-1]
+
+
+def backfill(user_id, author_id):
+    """Add the newest posts of a newly followed author to ``user_id``'s timeline"""
+    followers = Profile.objects.filter(user_id=author_id).values_list('follower_count', flat=True)
+    if is_popular(followers.first() or 0):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by('-date_posted', '-id')\
+        .values_list('pk', 'author_id', 'date_posted')[:settings.BLOG_TIMELINE_LENGTH]
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create(_entries(user_id, posts), ignore_conflicts=True)
+        trim([user_id])
+
+
+def forget(user_id, author_id):
+    """Take an unfollowed author's posts out of ``user_id``'s timeline"""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def trim(user_ids=None):
+    """Drop all but the newest BLOG_TIMELINE_LENGTH entries of the timelines
+    of ``user_ids`` (default all); return how many were dropped"""
+    length = settings.BLOG_TIMELINE_LENGTH
+    oldest_kept = TimelineEntry.objects.filter(user_id=OuterRef('user_id'))\
+        .order_by('-date_posted', '-post_id').values('date_posted')[length - 1:length]
+    entries = TimelineEntry.objects.all() if user_ids is None \
+        else TimelineEntry.objects.filter(user_id__in=user_ids)
+    deleted, _ = entries.filter(date_posted__lt=Subquery(oldest_kept)).delete()
+    return deleted
+
+
+def rebuild(user_id):
+    """Rewrite ``user_id``'s timeline from the authors they follow"""
+    authors = Follow.objects.filter(follower_id=user_id)\
+        .exclude(author__profile__follower_count__gt=settings.BLOG_TIMELINE_FANOUT_LIMIT)\
+        .values('author_id')
+    posts = Post.objects.filter(author_id__in=authors).order_by('-date_posted', '-id')\
+        .values_list('pk', 'author_id', 'date_posted')[:settings.BLOG_TIMELINE_LENGTH]
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        TimelineEntry.objects.bulk_create(_entries(user_id, posts))
+
+
+class TimelinePaginator(CursorPaginator):
+    """Pages a user's TimelineEntry rows, returning their posts"""
+    ordering = ('-date_posted', '-post_id')
+    reverse_ordering = ('date_posted', 'post_id')
+    id_field = 'post_id'
+
+    def _make_page(self, rows, direction):
+        return super()._make_page([entry.post for entry in rows], direction)
+
+
+def page(user, cursor=None, per_page=5):
+    """The timeline page at ``cursor``, as the feeds' CursorPage"""
+    entries = TimelineEntry.objects.filter(user=user)\
+        .select_related('post__author__profile').defer('post__content')
+    pages = [TimelinePaginator(entries, per_page).page(cursor)]
+    popular = list(Follow.objects.filter(
+        follower=user, author__profile__follower_count__gt=settings.BLOG_TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    if popular:
+        posts = Post.objects.filter(author_id__in=popular).listing()
+        pages.append(CursorPaginator(posts, per_page).page(cursor))
+    if len(pages) == 1:
+        return pages[0]
+    direction = LAST if cursor == LAST else decode_cursor(cursor)[0] if cursor else None
+
+    # each source read per_page rows from the cursor; the merged page is
+    # the per_page of them nearest to it
+    rows = sorted({post.pk: post for source in pages for post in source}.values(),
+                  key=lambda post: (post.date_posted, post.pk), reverse=True)
+    more = len(rows) > per_page
+    if direction in (LAST, PREVIOUS):
+        return CursorPage(rows[-per_page:], None, direction == PREVIOUS,
+                          more or any(source.has_previous() for source in pages))
+    return CursorPage(rows[:per_page], None, more or any(source.has_next() for source in pages),
+                      direction is not None)
@@ -0,0 +1,93 @@
+"""Trending posts: view counts decayed by age, ranked ahead of time.
+
+``rank()`` walks the viewed posts in one pass and writes each a
+TrendingScore: its previous score, halved every
+BLOG_TRENDING_HALF_LIFE_HOURS, plus the views counted since (see
+blog.counters). A post read a lot this morning outranks one read more last
+month. ``top()`` reads the scores off their index and stops after K, so no
+page aggregates anything per request.
+
+Run it on a schedule with ``manage.py rank_trending``, or set
+BLOG_TRENDING_SCHEDULE_SECONDS to run it from the web process; one process
+is enough. Scores are written as values, not increments, so a run that
+overlaps another doesn't count views twice.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache as feed_cache
+from .models import Post, TrendingScore
+
+
+SIDEBAR_KEY = 'blog:trending:sidebar'
+# below this a score is as good as 0; it is stored as 0 and skipped after
+MIN_SCORE = 0.01
+
+
+def decayed(score, since, now):
+    half_lives = (now - since).total_seconds() / (settings.BLOG_TRENDING_HALF_LIFE_HOURS * 3600)
+    return score * 0.5 ** half_lives
+
+
+def _scores(rows, now):
+    for pk, views, score, seen, computed_at in rows:
+        if score is None:
+            score, seen, computed_at = 0.0, 0, now
+        if views == seen and not score:
+            continue  # nothing to decay, nothing new
+        score = decayed(score, computed_at, now) + views - seen
+        yield TrendingScore(post_id=pk, score=score if score >= MIN_SCORE else 0.0,
+                            views_seen=views, computed_at=now)
+
+
+def rank(now=None):
+    """Score every viewed post as of ``now``; return how many were written"""
+    now = now or timezone.now()
+    # in batches of posts walked in id order, one transaction each
+    rows = Post.objects.filter(views__gt=0).order_by('pk').values_list(
+        'pk', 'views', 'trending__score', 'trending__views_seen', 'trending__computed_at')
+    batch_size = settings.BLOG_TRENDING_BATCH_SIZE
+    written = last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            break
+        scores = list(_scores(batch, now))
+        with transaction.atomic():
+            TrendingScore.objects.bulk_create(
+                scores, update_conflicts=True, unique_fields=['post'],
+                update_fields=['score', 'views_seen', 'computed_at'])
+        written += len(scores)
+        last = batch[-1][0]
+    cache.delete(SIDEBAR_KEY)
+    # the home page shows the sidebar; move its ETag on
+    feed_cache.invalidate()
+    return written
+
+
+def top(limit=None):
+    """The trending posts, highest score first, as the feeds show them"""
+    scores = TrendingScore.objects.filter(score__gt=0).order_by('-score', '-post')\
+        .select_related('post__author__profile').defer('post__content')
+    return [score.post for score in scores[:limit or settings.BLOG_TRENDING_COUNT]]
+
+
+def _sidebar_rows():
+    return TrendingScore.objects.filter(score__gt=0).order_by('-score', '-post')\
+        .values_list('post_id', 'post__title')[:settings.BLOG_TRENDING_SIDEBAR_COUNT]
+
+
+def sidebar():
+    """``(post id, title)`` of the top few trending posts, cached between runs"""
+    return cache.get_or_set(SIDEBAR_KEY, lambda: list(_sidebar_rows()),
+                            settings.BLOG_TRENDING_CACHE_TIMEOUT)
+
+
+async def asidebar():
+    rows = await cache.aget(SIDEBAR_KEY)
+    if rows is None:
+        rows = [row async for row in _sidebar_rows()]
+        await cache.aset(SIDEBAR_KEY, rows, settings.BLOG_TRENDING_CACHE_TIMEOUT)
+    return rows
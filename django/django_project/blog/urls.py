@@ -1,13 +1,39 @@
-from . import views
+from . import api, async_views, syndication, views
+from django.conf import settings
 from django.urls import path
 from .views import (PostListView, PostDetailView, PostCreateView, PostUpdateView, PostDeleteView, UserPostListView)
 
-urlpatterns = [
+# the read-only pages, served by blog.async_views when BLOG_ASYNC_VIEWS is on
+read_urlpatterns = [
     path('about/', views.about, name='blog-about'),
     path('', PostListView.as_view(), name='blog-home'),
-    path('post/new/', PostCreateView.as_view(), name='post-create'),
+    path('archive/', views.archive, name='blog-archive'),
     path('post/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
-    path('post/<int:pk>/update/', PostUpdateView.as_view(), name='post-update'),
     path('user/<str:username>/', UserPostListView.as_view(), name='user-posts'),
+]
+
+async_read_urlpatterns = [
+    path('about/', async_views.about, name='blog-about'),
+    path('', async_views.home, name='blog-home'),
+    path('archive/', async_views.archive, name='blog-archive'),
+    path('post/<int:pk>/', async_views.post_detail, name='post-detail'),
+    path('user/<str:username>/', async_views.user_posts, name='user-posts'),
+]
+
+urlpatterns = (async_read_urlpatterns if settings.BLOG_ASYNC_VIEWS else read_urlpatterns) + [
+    path('post/new/', PostCreateView.as_view(), name='post-create'),
+    path('post/<int:pk>/update/', PostUpdateView.as_view(), name='post-update'),
     path('post/<int:pk>/delete/', PostDeleteView.as_view(), name='post-delete'),
-]
\ No newline at end of file
+    path('most-viewed/', views.most_viewed, name='blog-most-viewed'),
+    path('trending/', views.trending_posts, name='blog-trending'),
+    path('timeline/', views.timeline, name='blog-timeline'),
+    path('search/', views.search, name='blog-search'),
+    path('stats/feed-cache/', views.feed_cache_stats, name='feed-cache-stats'),
+    path('sitemap.xml', syndication.sitemap_index, name='sitemap'),
+    path('sitemap-posts-<int:shard>.xml', syndication.sitemap_posts, name='sitemap-posts'),
+    path('sitemap-users-<int:shard>.xml', syndication.sitemap_users, name='sitemap-users'),
+    path('feeds/posts.<str:kind>', syndication.posts_feed, name='posts-feed'),
+    path('feeds/user/<str:username>.<str:kind>', syndication.user_feed, name='user-feed'),
+    path('api/posts/', api.posts, name='api-posts'),
+    path('api/posts/<int:pk>/', api.post_detail, name='api-post-detail'),
+]
@@ -1,7 +1,21 @@
-from .models import Post
-from django.http import HttpResponse
+from .models import AuthorStats, Post
+from .pagination import CursorPaginationMixin, InvalidCursor
+from . import cache as feed_cache
+from . import conditional
+from . import counters
+from . import search as post_search
+from . import streaming
+from . import timeline as timelines
+from . import trending
+from users.models import Follow
+from django.http import Http404, JsonResponse
 from django.contrib.auth.models import User
 from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
+from django_project.db import read_replica
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import (
     ListView,
@@ -12,28 +26,87 @@ from django.views.generic import (
 )
 
 
-class PostListView(ListView):
+def author_post_count(author):
+    """``author``'s post count from AuthorStats, loaded with select_related"""
+    try:
+        return author.author_stats.post_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def is_following(user, author):
+    # no query for visitors, who see no follow button
+    if not user.is_authenticated or user.pk == author.pk:
+        return None
+    return Follow.objects.is_following(user, author)
+
+
+@method_decorator(read_replica, name='dispatch')
+@method_decorator(conditional.conditional(conditional.feed), name='dispatch')
+class PostListView(CursorPaginationMixin, ListView):
     model = Post
     template_name = 'blog/home.html'  # <app>/<model>_<viewtype>.html
     context_object_name = 'posts'
-    ordering = ['-date_posted']
+    ordering = ['-date_posted', '-id']
     paginate_by = 5
     
+    def get_queryset(self):
+        return super().get_queryset().listing()
+    
+    def get_count_cache_key(self):
+        return 'blog:post-count'
     
-class UserPostListView(ListView):
+    def get(self, request, *args, **kwargs):
+        # the feed fragment is the same for every visitor, see blog.cache
+        self.object_list = self.get_queryset()  # lazy, no query yet
+        key = feed_cache.page_key(request)
+        feed = feed_cache.get(key)
+        if feed is None:
+            context = self.get_context_data()
+            feed = render_to_string('blog/feed.html', context, request)
+            feed_cache.set(key, feed)
+        # ranked ahead of time, see blog.trending
+        return self.render_to_response({'feed': mark_safe(feed), 'trending': trending.sidebar()})
+    
+    
+@method_decorator(read_replica, name='dispatch')
+@method_decorator(conditional.conditional(conditional.user_feed), name='dispatch')
+class UserPostListView(CursorPaginationMixin, ListView):
     model = Post
     template_name = 'blog/user_posts.html'  # <app>/<model>_<viewtype>.html
     context_object_name = 'posts'
-    ordering = ['-date_posted']
+    ordering = ['-date_posted', '-id']
     paginate_by = 5
     
     def get_queryset(self):
-        user = get_object_or_404(User, username=self.kwargs.get('username'))
-        return Post.objects.filter(author=user).order_by('-date_posted')
+        self.author = get_object_or_404(User.objects.select_related('author_stats', 'profile'),
+                                        username=self.kwargs.get('username'))
+        return Post.objects.filter(author=self.author).listing()\
+            .order_by('-date_posted', '-id')
+    
+    def get_count_cache_key(self):
+        return f'blog:post-count:{self.author.pk}'
     
+    def get_known_count(self):
+        return author_post_count(self.author)
     
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(author=self.author,
+                                        following=is_following(self.request.user, self.author),
+                                        **kwargs)
+    
+    
+@method_decorator(read_replica, name='dispatch')
+@method_decorator(conditional.conditional(conditional.post), name='dispatch')
 class PostDetailView(DetailView):
     model = Post
+    queryset = Post.objects.select_related('author__profile')
+    
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # buffered, see blog.counters; a 304 isn't counted
+        counters.view_counts.hit(self.object.pk)
+        return response
     
 class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
@@ -71,4 +144,60 @@ def about(request):
     return render(request, 'blog/about.html', {'title': 'About'})
 
 
+@read_replica
+@conditional.conditional(conditional.feed)
+def archive(request):
+    # every post, streamed a chunk at a time; see blog.streaming
+    posts = Post.objects.listing().order_by('-date_posted', '-id')
+    return streaming.stream_page(request, 'blog/archive.html', {'title': 'Archive'},
+                                 posts, 'blog/posts.html')
+
+
+@read_replica
+def most_viewed(request):
+    # ranked whenever buffered views are written, see blog.counters
+    return render(request, 'blog/most_viewed.html', {
+        'title': 'Most Viewed', 'posts': counters.most_viewed(),
+    })
+
+
+@read_replica
+def trending_posts(request):
+    # scored by manage.py rank_trending, see blog.trending
+    return render(request, 'blog/trending.html', {
+        'title': 'Trending', 'posts': trending.top(),
+    })
+
+
+@login_required
+@read_replica
+def timeline(request):
+    # newest posts of the authors the user follows, see blog.timeline
+    try:
+        page = timelines.page(request.user, request.GET.get('cursor'), per_page=5)
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+    return render(request, 'blog/timeline.html', {
+        'title': 'Timeline', 'posts': page.object_list,
+        'page_obj': page, 'is_paginated': page.has_other_pages(),
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        raise Http404('Invalid page')
+    posts, has_next = post_search.search(query, page, per_page=10)
+    return render(request, 'blog/search.html', {
+        'title': 'Search', 'query': query, 'posts': posts,
+        'page': page, 'has_next': has_next,
+    })
+
+
+def feed_cache_stats(request):
+    return JsonResponse(feed_cache.stats())
+
+
  
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
 
 application = get_asgi_application()
+
+# only the web server runs the jobs apps schedule, see django_project.tasks
+from django_project.tasks import tasks
+tasks.start_schedules()
@@ -0,0 +1,162 @@
+"""Static files built once by collectstatic and served from the process.
+
+``CompressedManifestStorage`` is ManifestStaticFilesStorage (fingerprinted
+names, ``{% static %}`` resolving to them) that also minifies CSS and
+writes a ``.gz``, and a ``.br`` when brotli is installed, next to each
+text file. ``StaticFilesMiddleware`` serves STATIC_ROOT at STATIC_URL,
+picking the smallest encoding the client accepts; fingerprinted names are
+cached for a year as ``immutable``, so the app needs no web server in
+front of it for static files.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import HashedFilesMixin, ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.map')
+# smaller gains are not worth a second file
+MIN_SAVING = 0.05
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# names that are not fingerprinted may change at the next deploy
+MUTABLE = 'public, max-age=60'
+
+# a comment, or a string or unquoted url() that must be kept as written
+CSS_TOKEN = re.compile(r'(/\*.*?\*/)|("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|url\([^)"\']*\))',
+                       re.S | re.I)
+CSS_KEPT = re.compile(r'\0(\d+)\0')
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css):
+    """Drop comments and the whitespace CSS doesn't need, leaving strings
+    and url()s as written"""
+    kept = []
+
+    def set_aside(match):
+        if match.group(1):
+            return ''
+        kept.append(match.group(2))
+        return f'\0{len(kept) - 1}\0'
+    css = CSS_TOKEN.sub(set_aside, css)
+    css = CSS_SPACE.sub(' ', css)
+    css = CSS_PUNCTUATION.sub(r'\1', css)
+    # a space before ':' can be a descendant selector, only the one after goes
+    css = css.replace(': ', ':').replace(';}', '}')
+    return CSS_KEPT.sub(lambda match: kept[int(match.group(1))], css.strip())
+
+
+def compressed_variants(data):
+    """``{extension: bytes}`` of the encodings worth keeping for ``data``"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {extension: encoded for extension, encoded in variants.items()
+            if len(encoded) <= len(data) * (1 - MIN_SAVING)}
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def _save(self, name, content):
+        if name.endswith('.css'):
+            # chunks() rewinds first; hashing the name has read the file to its end
+            css = b''.join(content.chunks()).decode()
+            content = ContentFile(minify_css(css).encode())
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not dry_run and not isinstance(processed, Exception) \
+                    and hashed_name.endswith(COMPRESSIBLE):
+                with self.open(hashed_name) as fp:
+                    data = fp.read()
+                for extension, encoded in compressed_variants(data).items():
+                    self.delete(hashed_name + extension)
+                    super()._save(hashed_name + extension, ContentFile(encoded))
+            yield name, hashed_name, processed
+
+    def url(self, name, force=False):
+        # before collectstatic has run (development, tests) there is no
+        # manifest to look names up in; use them as they are
+        if not self.hashed_files and not force:
+            return super(HashedFilesMixin, self).url(name)
+        return super().url(name, force)
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.last_modified = http_date(stat.st_mtime)
+        self.cache_control = IMMUTABLE if immutable else MUTABLE
+        version = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        # (encoding, path, etag), best first; each encoding is its own entity
+        self.variants = [(encoding, path + extension, f'"{version}-{encoding}"')
+                         for encoding, extension in (('br', '.br'), ('gzip', '.gz'))
+                         if os.path.exists(path + extension)]
+        self.variants.append((None, path, f'"{version}"'))
+
+    def variant(self, accept_encoding):
+        for encoding, path, etag in self.variants:
+            if encoding is None or encoding in accept_encoding:
+                return encoding, path, etag
+
+
+class StaticFilesMiddleware:
+    """Serve the collected STATIC_ROOT, indexed once at startup"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        root = settings.STATIC_ROOT
+        if not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.files = self.index(root)
+
+    def index(self, root):
+        manifest = os.path.join(root, 'staticfiles.json')
+        fingerprinted = set()
+        if os.path.exists(manifest):
+            with open(manifest) as fp:
+                fingerprinted = set(json.load(fp)['paths'].values())
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                files[self.prefix + relative] = StaticFile(path, relative in fingerprinted)
+        return files
+
+    def __call__(self, request):
+        static = self.files.get(request.path_info)
+        if static is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        encoding, path, etag = static.variant(request.headers.get('Accept-Encoding', ''))
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=static.content_type)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            response.headers['Last-Modified'] = static.last_modified
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = static.cache_control
+        if len(static.variants) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
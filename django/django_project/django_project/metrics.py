@@ -0,0 +1,240 @@
+"""Request timing: latency, queries, template rendering and response size.
+
+``MetricsMiddleware`` times each request and, through a wrapper on every
+database connection and the ``Templates`` backend, the queries it runs and
+the templates it renders. The totals go out on the response as a
+``Server-Timing`` header, into per-view histograms served in Prometheus
+text format by ``/metrics``, and to the log when a request takes longer
+than ``METRICS_SLOW_REQUEST_SECONDS``.
+
+The histograms live in the worker process; each worker reports its own.
+Rows a streamed page renders after its response starts are not counted.
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+
+logger = logging.getLogger(__name__)
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576)
+QUERIES = (1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Time to the response, by view', SECONDS),
+    'http_requests_total': ('counter', 'Requests answered, by view and status', None),
+    'http_response_size_bytes': ('histogram', 'Size of non-streamed response bodies', BYTES),
+    'db_queries_per_request': ('histogram', 'Queries run by a request', QUERIES),
+    'db_query_duration_seconds': ('histogram', 'Time spent in queries by a request', SECONDS),
+    'template_render_duration_seconds': ('histogram', 'Time spent rendering templates by a request',
+                                         SECONDS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Counters and histograms keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = Histogram(METRICS[name][2])
+            self._values[key].observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """The metrics in Prometheus text exposition format"""
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: item[0])
+            lines = []
+            for name, (kind, help_text, buckets) in METRICS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for (metric, labels), value in values:
+                    if metric != name:
+                        continue
+                    if kind == 'counter':
+                        lines.append(f'{name}{_labels(labels)} {value}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), value.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {value.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+registry = Registry()
+
+
+class RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+# set by the middleware; sync_to_async copies it to the threads async
+# views run their queries in
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # the same wrapper object reconnects after every CONN_MAX_AGE
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_open_connections():
+    """Instrument this thread's connections opened before this module was
+    imported; later ones are instrumented as they connect"""
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(None, connection)
+
+
+class Templates(DjangoTemplates):
+    """The Django template backend, timing each top-level render"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        instrument_open_connections()
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return finish(request, response, stats)
+
+
+def finish(request, response, stats):
+    duration = time.perf_counter() - stats.start
+    match = request.resolver_match
+    view = match.view_name if match else '<unmatched>'
+    labels = {'view': view, 'method': request.method}
+    registry.inc('http_requests_total', {**labels, 'status': response.status_code})
+    registry.observe('http_request_duration_seconds', labels, duration)
+    registry.observe('db_queries_per_request', labels, stats.queries)
+    registry.observe('db_query_duration_seconds', labels, stats.db_time)
+    registry.observe('template_render_duration_seconds', labels, stats.template_time)
+    if not response.streaming:
+        registry.observe('http_response_size_bytes', labels, len(response.content))
+
+    response.headers['Server-Timing'] = ', '.join((
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+        f'tpl;dur={stats.template_time * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ))
+    if duration >= settings.METRICS_SLOW_REQUEST_SECONDS:
+        logger.warning('Slow request: %s %s (%s) took %.0f ms, %d queries in %.0f ms, '
+                       'templates %.0f ms', request.method, request.get_full_path(), view,
+                       duration * 1000, stats.queries, stats.db_time * 1000,
+                       stats.template_time * 1000)
+    return response
+
+
+def metrics(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
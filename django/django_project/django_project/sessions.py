@@ -0,0 +1,48 @@
+"""Where sessions live, and clearing out the expired ones.
+
+SESSION_PROFILE picks the engine. 'db' is Django as shipped: every request
+carrying a session cookie reads a django_session row. 'cached_db' reads
+through the default cache and only falls back to the table on a miss;
+writes go to both. 'signed_cookies' keeps the session in the cookie itself
+and stores nothing. Whatever the engine, a session is written back only by
+a request that changed it, Django's default.
+
+Sessions that expire are never read again, but their rows stay until
+something deletes them. ``purge_expired()`` does, SESSION_PURGE_BATCH_SIZE
+rows per transaction so logins waiting on the SQLite write lock aren't held
+up behind one big DELETE. Run it with ``manage.py purge_sessions``, or set
+SESSION_PURGE_SCHEDULE_SECONDS to run it from the web server process.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+def session_model():
+    """The model sessions are stored in, None when the engine stores none"""
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not hasattr(store, 'get_model_class'):
+        return None
+    return store.get_model_class()
+
+
+def purge_expired(now=None):
+    """Delete the sessions expired by ``now``; return how many"""
+    model = session_model()
+    if model is None:
+        return 0
+    # expire_date is indexed; each batch is found from it and deleted by key
+    expired = model.objects.filter(expire_date__lt=now or timezone.now())\
+        .order_by().values_list('pk', flat=True)
+    batch_size = settings.SESSION_PURGE_BATCH_SIZE
+    purged = 0
+    while True:
+        keys = list(expired[:batch_size])
+        if not keys:
+            break
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(pk__in=keys).delete()
+        purged += deleted
+    return purged
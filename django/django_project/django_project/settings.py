@@ -44,7 +44,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so it times everything below; see django_project.metrics
+    'django_project.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # serves the collected STATIC_ROOT, see django_project.assets
+    'django_project.assets.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,7 +61,8 @@ ROOT_URLCONF = 'django_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed per request; see django_project.metrics
+        'BACKEND': 'django_project.metrics.Templates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,13 +82,51 @@ WSGI_APPLICATION = 'django_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# 'production' runs SQLite in WAL mode with tuned pragmas, keeps connections
+# open between requests and reads feeds through a separate query-only
+# connection; 'default' is SQLite as shipped
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'default')
+
+SQLITE_PROFILES = {
+    'default': {
+        'pragmas': {},
+        'conn_max_age': 0,
+        'replica': False,
+    },
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -64000,  # KiB
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+        'conn_max_age': 600,
+        'replica': True,
+    },
+}
+SQLITE_PROFILE = SQLITE_PROFILES[DATABASE_PROFILE]
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'django_project.sqlite',
+        'NAME': os.environ.get('DJANGO_DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {'pragmas': SQLITE_PROFILE['pragmas']},
+        'CONN_MAX_AGE': SQLITE_PROFILE['conn_max_age'],
+        'CONN_HEALTH_CHECKS': SQLITE_PROFILE['conn_max_age'] > 0,
     }
 }
 
+if SQLITE_PROFILE['replica']:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': {'pragmas': {**SQLITE_PROFILE['pragmas'], 'query_only': 'ON'}},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['django_project.db.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -104,6 +147,47 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/
+# PASSWORD_HASH_PROFILE picks the algorithm and cost new hashes use, see
+# users.hashers; stored hashes are upgraded on the next successful login.
+# 'cost' is PBKDF2 iterations, bcrypt rounds, the scrypt work factor or
+# the argon2 time cost, None keeps Django's default. argon2 needs
+# argon2-cffi installed.
+
+PASSWORD_HASH_PROFILE = os.environ.get('PASSWORD_HASH_PROFILE', 'default')
+
+PASSWORD_HASH_PROFILES = {
+    'default': {'algorithm': 'pbkdf2_sha256', 'cost': None},
+    # cheaper logins for development and load tests, not for production
+    'fast': {'algorithm': 'pbkdf2_sha256', 'cost': 100000},
+    'bcrypt': {'algorithm': 'bcrypt_sha256', 'cost': 12},
+    'scrypt': {'algorithm': 'scrypt', 'cost': 2 ** 14},
+    'argon2': {'algorithm': 'argon2', 'cost': 2},
+}
+
+PASSWORD_HASHERS_BY_ALGORITHM = {
+    'pbkdf2_sha256': 'users.hashers.PBKDF2PasswordHasher',
+    'bcrypt_sha256': 'users.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+}
+
+PASSWORD_HASH_ALGORITHM = PASSWORD_HASH_PROFILES[PASSWORD_HASH_PROFILE]['algorithm']
+
+PASSWORD_HASH_COSTS = {PASSWORD_HASH_ALGORITHM: PASSWORD_HASH_PROFILES[PASSWORD_HASH_PROFILE]['cost']}
+
+# the preferred hasher first, the rest still verify older hashes
+PASSWORD_HASHERS = [PASSWORD_HASHERS_BY_ALGORITHM[PASSWORD_HASH_ALGORITHM]] + [
+    hasher for algorithm, hasher in PASSWORD_HASHERS_BY_ALGORITHM.items()
+    if algorithm != PASSWORD_HASH_ALGORITHM
+]
+
+# Threads verifying passwords at once per process, None for one per core
+PASSWORD_HASH_WORKERS = None
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -116,15 +200,89 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# In-process by default; set BLOG_CACHE_DIR to share entries between worker
+# processes through the filesystem.
+
+if os.environ.get('BLOG_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['BLOG_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'blog',
+        }
+    }
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.0/topics/http/sessions/
+# SESSION_PROFILE picks where sessions live, see django_project.sessions:
+# 'db' reads django_session on every request with a session cookie;
+# 'cached_db' reads through the cache above and writes through to the
+# table, and needs BLOG_CACHE_DIR when several processes serve requests, or
+# a logout in one goes unseen by the others' caches; 'signed_cookies'
+# stores nothing, but a logout can't revoke a copy of the cookie before
+# SESSION_COOKIE_AGE runs out.
+
+SESSION_PROFILE = os.environ.get('SESSION_PROFILE', 'db')
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+
+# expired sessions are deleted SESSION_PURGE_BATCH_SIZE rows per transaction
+# by `manage.py purge_sessions` and, when set, every
+# SESSION_PURGE_SCHEDULE_SECONDS by the web server (not by other manage.py
+# commands)
+SESSION_PURGE_SCHEDULE_SECONDS = int(os.environ.get('SESSION_PURGE_SCHEDULE_SECONDS', 0))
+
+SESSION_PURGE_BATCH_SIZE = 500
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = 'static/'
 
+# collectstatic writes fingerprinted, minified and precompressed files here,
+# served by django_project.assets.StaticFilesMiddleware
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MEDIA_URL = '/media/'
 
+# Uploads are stored once under the hash of their content, see users.storage
+STORAGES = {
+    'default': {
+        'BACKEND': 'users.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django_project.assets.CompressedManifestStorage',
+    },
+}
+
+# Serve MEDIA_URL from Django (with immutable caching for content-addressed
+# files) even when DEBUG is off
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA') == '1'
+
+# Threads running off-request work such as image resizing, see
+# django_project.tasks; 0 runs tasks inline
+BACKGROUND_TASK_WORKERS = 2
+
+PROFILE_IMAGE_QUALITY = 85
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -134,4 +292,84 @@ CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 LOGIN_REDIRECT_URL = 'blog-home'
 
-LOGIN_URL ='login'
\ No newline at end of file
+LOGIN_URL ='login'
+
+# drops the views buffered by the tests before their databases go, see
+# django_project.test
+TEST_RUNNER = 'django_project.test.TestRunner'
+
+# 'cursor' pages the post feeds on (date_posted, id), see blog.pagination;
+# 'offset' restores numbered pages
+BLOG_PAGINATION = os.environ.get('BLOG_PAGINATION', 'cursor')
+
+# Serve the feeds, post pages and about page from blog.async_views; only
+# worth it under ASGI (django_project.asgi), WSGI has to run them in a loop
+BLOG_ASYNC_VIEWS = os.environ.get('BLOG_ASYNC_VIEWS', '') == '1'
+
+# Seconds a feed's total post count is cached for in cursor mode
+BLOG_PAGINATION_COUNT_TIMEOUT = 60
+
+# Seconds a rendered home feed page is cached for, see blog.cache
+BLOG_FEED_CACHE_TIMEOUT = 300
+
+# Search ranks only the newest this many matches of a query, see blog.search
+BLOG_SEARCH_CANDIDATES = 1000
+
+# Posts rendered per chunk of a streamed page such as the archive, see
+# blog.streaming
+BLOG_STREAM_CHUNK_SIZE = 100
+
+# Seconds a post's rendered body is cached for; the key changes whenever the
+# post does, see blog.text
+BLOG_POST_BODY_CACHE_TIMEOUT = 3600
+
+# Posts per page of /api/posts/ unless ?limit= asks otherwise, the most one
+# page or ?ids= may ask for, and the most one POST may create; see blog.api
+BLOG_API_PAGE_SIZE = 20
+BLOG_API_MAX_PAGE_SIZE = 100
+BLOG_API_MAX_CREATE = 1000
+
+# Entries kept per personal timeline, authors whose posts reach followers
+# through reads rather than writes once they have more followers than this,
+# and followers written per INSERT when a post is fanned out; see
+# blog.timeline
+BLOG_TIMELINE_LENGTH = 500
+BLOG_TIMELINE_FANOUT_LIMIT = 5000
+BLOG_TIMELINE_BATCH_SIZE = 1000
+
+# Post views are buffered in each process and written once this many have
+# been counted or this many seconds after the first, see blog.counters
+BLOG_VIEW_FLUSH_HITS = 1000
+BLOG_VIEW_FLUSH_SECONDS = 10
+
+# Posts on /most-viewed/, and seconds the ranking is cached for when no
+# views are written to rank them again
+BLOG_MOST_VIEWED_COUNT = 10
+BLOG_MOST_VIEWED_TIMEOUT = 300
+
+# Trending scores are post views halved every this many hours, see
+# blog.trending; they are ranked by `manage.py rank_trending`, and every
+# this many seconds by the web server when set (in one process is enough)
+BLOG_TRENDING_HALF_LIFE_HOURS = 24
+BLOG_TRENDING_SCHEDULE_SECONDS = int(os.environ.get('BLOG_TRENDING_SCHEDULE_SECONDS', 0))
+BLOG_TRENDING_BATCH_SIZE = 1000
+
+# Posts on /trending/ and in the home page's sidebar, and seconds the
+# sidebar is cached for when no ranking run replaces it
+BLOG_TRENDING_COUNT = 20
+BLOG_TRENDING_SIDEBAR_COUNT = 5
+BLOG_TRENDING_CACHE_TIMEOUT = 600
+
+# Sitemaps and Atom/RSS feeds are written here and served from disk until
+# the posts they list change, see blog.syndication
+BLOG_SYNDICATION_ROOT = os.path.join(BASE_DIR, 'syndication')
+
+# URLs per sitemap file (the protocol allows 50,000), posts per feed, and
+# seconds clients and proxies may use either before revalidating
+BLOG_SITEMAP_SHARD_SIZE = 50000
+BLOG_SYNDICATION_ITEMS = 50
+BLOG_SYNDICATION_MAX_AGE = 300
+
+# Requests taking longer than this many seconds are logged with their query
+# and template times, see django_project.metrics
+METRICS_SLOW_REQUEST_SECONDS = 1.0
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""SQLite backend that applies per-connection PRAGMAs.
+
+Set ``DATABASES[alias]['OPTIONS']['pragmas']`` to a dict such as
+``{'journal_mode': 'WAL', 'synchronous': 'NORMAL'}``; each is run on every
+new connection, before Django uses it.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            # PRAGMA takes no bound parameters, so only plain words and numbers
+            if not (PRAGMA_VALUE.match(name) and PRAGMA_VALUE.match(str(value))):
+                raise ImproperlyConfigured(f'Invalid SQLite pragma {name} = {value!r}')
+            conn.execute(f'PRAGMA {name} = {value}').fetchall()
+        return conn
@@ -0,0 +1,96 @@
+"""In-process background task queue.
+
+Work is handed to a few daemon threads through a local queue so the request
+that produced it can return straight away. With
+``BACKGROUND_TASK_WORKERS = 0`` tasks run inline, which is what the tests
+use. Tasks must be idempotent: queued work is lost if the process dies.
+``every()`` submits a task on a schedule, for jobs such as ranking
+trending posts that can run from the web process. Apps declare those with
+``schedule()`` in their ``ready()``; only the web server entry points
+(django_project.wsgi and asgi) call ``start_schedules()``, so `manage.py`
+commands such as migrate, test or shell never run them.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._schedules = []
+
+    def submit(self, func, *args, **kwargs):
+        workers = getattr(settings, 'BACKGROUND_TASK_WORKERS', 2)
+        if not workers:
+            self._call(func, args, kwargs)
+            return
+        self._start(workers)
+        self._queue.put((func, args, kwargs))
+
+    def every(self, seconds, func, *args, **kwargs):
+        """Submit ``func`` every ``seconds``, the first time ``seconds`` from now"""
+        def schedule():
+            while True:
+                time.sleep(seconds)
+                self.submit(func, *args, **kwargs)
+
+        thread = threading.Thread(target=schedule, daemon=True,
+                                  name=f"schedule-{getattr(func, '__name__', func)}")
+        thread.start()
+        return thread
+
+    def schedule(self, seconds, func, *args, **kwargs):
+        """Run ``func`` ``every()`` ``seconds`` once ``start_schedules()`` is called"""
+        self._schedules.append((seconds, func, args, kwargs))
+
+    def start_schedules(self):
+        """Start the scheduled jobs, once per process"""
+        with self._lock:
+            schedules, self._schedules = self._schedules, []
+        for seconds, func, args, kwargs in schedules:
+            self.every(seconds, func, *args, **kwargs)
+
+    def join(self):
+        """Block until every queued task has run"""
+        self._queue.join()
+
+    def _start(self, workers):
+        if len(self._threads) >= workers:
+            return
+        with self._lock:
+            while len(self._threads) < workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'task-worker-{len(self._threads)}')
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                self._call(func, args, kwargs)
+            finally:
+                # worker threads keep their own connections; don't leak them
+                connections.close_all()
+                self._queue.task_done()
+
+    def _call(self, func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task %s failed', getattr(func, '__name__', func))
+
+
+tasks = TaskQueue()
+atexit.register(tasks.join)
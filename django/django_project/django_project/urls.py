@@ -16,19 +16,25 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
-from django.urls import path, include
+import re
+from django.urls import path, include, re_path
 from users import views as user_views
+from django_project import metrics
 from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics.metrics, name='metrics'),
     path('register/', user_views.register, name='register'),
     path('login/', auth_views.LoginView.as_view(template_name='users/login.html'), name='login'),
     path('logout/', user_views.logout_view, name='logout'),
     path('profile/', user_views.profile, name='profile'),
+    path('user/<str:username>/follow/', user_views.follow, name='user-follow'),
+    path('user/<str:username>/unfollow/', user_views.unfollow, name='user-unfollow'),
     path('', include('blog.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.DEBUG or settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), user_views.serve_media),
+    ]
\ No newline at end of file
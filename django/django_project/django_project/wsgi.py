@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
 
 application = get_wsgi_application()
+
+# only the web server runs the jobs apps schedule, see django_project.tasks
+from django_project.tasks import tasks
+tasks.start_schedules()
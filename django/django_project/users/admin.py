@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Profile
+from .models import Follow, MediaBlob, Profile
 
 
 admin.site.register(Profile)
+admin.site.register(MediaBlob)
+admin.site.register(Follow)
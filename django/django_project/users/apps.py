@@ -7,3 +7,8 @@ class UsersConfig(AppConfig):
     
     def ready(self):
         import users.signals
+        from django.conf import settings
+        if settings.SESSION_PURGE_SCHEDULE_SECONDS:
+            from django_project import sessions
+            from django_project.tasks import tasks
+            tasks.schedule(settings.SESSION_PURGE_SCHEDULE_SECONDS, sessions.purge_expired)
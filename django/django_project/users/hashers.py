@@ -0,0 +1,72 @@
+"""Password hashers with a cost set per environment.
+
+``settings.PASSWORD_HASH_PROFILE`` picks the preferred algorithm and its
+cost (PBKDF2 iterations, bcrypt rounds, scrypt work factor or argon2 time
+cost). Django re-hashes a stored password on the next successful login
+whenever its algorithm or cost differs from the preferred one, so changing
+the profile upgrades (or downgrades) hashes as users sign in.
+
+Verification runs on a small shared thread pool of
+``PASSWORD_HASH_WORKERS`` threads, which bounds concurrent verifications:
+a burst of logins keeps at most that many cores busy hashing, leaving CPU
+for the requests serving pages. It frees no request workers; each login
+still blocks its own until its hash is checked.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _pool
+
+
+def cost(algorithm, default):
+    """The configured cost for ``algorithm``, if it is the preferred one"""
+    value = getattr(settings, 'PASSWORD_HASH_COSTS', {}).get(algorithm)
+    return default if value is None else value
+
+
+class PooledVerifyMixin:
+    """Verifies on the shared pool, waiting for the result; this bounds
+    concurrent verifications, the caller's thread is blocked all the same"""
+
+    def verify(self, password, encoded):
+        return get_pool().submit(super().verify, password, encoded).result()
+
+
+class PBKDF2PasswordHasher(PooledVerifyMixin, hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return cost(self.algorithm, hashers.PBKDF2PasswordHasher.iterations)
+
+
+class BCryptSHA256PasswordHasher(PooledVerifyMixin, hashers.BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return cost(self.algorithm, hashers.BCryptSHA256PasswordHasher.rounds)
+
+
+class ScryptPasswordHasher(PooledVerifyMixin, hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return cost(self.algorithm, hashers.ScryptPasswordHasher.work_factor)
+
+
+class Argon2PasswordHasher(PooledVerifyMixin, hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return cost(self.algorithm, hashers.Argon2PasswordHasher.time_cost)
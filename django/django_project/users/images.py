@@ -0,0 +1,75 @@
+"""Profile image variants, produced off the request path.
+
+The upload is stored as-is; ``process`` then writes one file per size and
+format next to it, named after the hash of the original's content, so an
+unchanged image is never reprocessed and the same picture uploaded twice
+shares its variants.
+"""
+import hashlib
+import logging
+import os
+import secrets
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from django_project.tasks import tasks
+
+
+logger = logging.getLogger(__name__)
+
+SIZES = (64, 125, 300)
+FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+
+
+def content_hash(field_file):
+    digest = hashlib.sha256()
+    try:
+        field_file.open('rb')
+    except FileNotFoundError:
+        logger.warning('Profile image %s is missing', field_file.name)
+        return ''
+    for chunk in field_file.chunks():
+        digest.update(chunk)
+    field_file.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def variant_name(image_hash, size, fmt):
+    return f'profile_pics/variants/{image_hash}_{size}.{fmt}'
+
+
+def variant_names(image_hash):
+    return [variant_name(image_hash, size, fmt) for size in SIZES for fmt in FORMATS]
+
+
+def delete_variants(image_hash):
+    for name in variant_names(image_hash):
+        default_storage.delete(name)
+
+
+def process(path, image_hash):
+    """Write every missing variant of the image at ``path``"""
+    missing = [name for name in variant_names(image_hash) if not default_storage.exists(name)]
+    if not missing:
+        return
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for size in SIZES:
+            img = original.copy()
+            img.thumbnail((size, size))
+            for fmt, pil_format in FORMATS.items():
+                name = variant_name(image_hash, size, fmt)
+                if name not in missing:
+                    continue
+                target = default_storage.path(name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # write then rename so readers never see a half-written file
+                partial = f'{target}.{secrets.token_hex(4)}.part'
+                img.save(partial, pil_format, quality=settings.PROFILE_IMAGE_QUALITY)
+                os.replace(partial, target)
+
+
+def process_in_background(path, image_hash):
+    tasks.submit(process, path, image_hash)
@@ -0,0 +1,81 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users import images
+from users.models import DEFAULT_IMAGE, MediaBlob, Profile
+from users.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = 'Delete stored profile images that nothing references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=3600,
+                            help='Only collect files unreferenced for this many seconds')
+        parser.add_argument('--adopt', action='store_true',
+                            help='First move legacy uploads to content-addressed names')
+        parser.add_argument('--scan', action='store_true',
+                            help='Also sweep untracked files out of the upload directory')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        if options['adopt']:
+            self.adopt()
+
+        collected = 0
+        for blob in MediaBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff).iterator():
+            # refcounts are the fast path; the profile table has the final say
+            if not Profile.objects.filter(image=blob.name).exists():
+                self.remove(blob.name)
+                collected += 1
+            if not self.dry_run:
+                blob.delete()
+
+        if options['scan']:
+            collected += self.sweep(cutoff)
+        self.stdout.write(self.style.SUCCESS(f'Collected {collected} files'))
+
+    def adopt(self):
+        for profile in Profile.objects.exclude(image=DEFAULT_IMAGE).iterator():
+            name = profile.image.name
+            if is_content_addressed(name) or not default_storage.exists(name):
+                continue
+            self.stdout.write(f'Adopting {name}')
+            if self.dry_run:
+                continue
+            with default_storage.open(name) as f:
+                profile.image.name = default_storage.save(name, f)
+            profile.save()
+
+    def sweep(self, cutoff):
+        referenced = set(Profile.objects.values_list('image', flat=True)) | {DEFAULT_IMAGE}
+        hashes = set(Profile.objects.values_list('image_hash', flat=True))
+        upload_dir = Profile._meta.get_field('image').upload_to
+        orphans = [name for name in self.listdir(upload_dir) if name not in referenced]
+        orphans += [name for name in self.listdir(f'{upload_dir}/variants')
+                    if os.path.basename(name).split('_')[0] not in hashes]
+        collected = 0
+        for name in orphans:
+            if default_storage.get_modified_time(name) < cutoff:
+                self.remove(name, variants=False)
+                collected += 1
+        return collected
+
+    def listdir(self, folder):
+        if not default_storage.exists(folder):
+            return []
+        return [f'{folder}/{filename}' for filename in default_storage.listdir(folder)[1]]
+
+    def remove(self, name, variants=True):
+        self.stdout.write(f'Deleting {name}')
+        if self.dry_run:
+            return
+        default_storage.delete(name)
+        if variants and is_content_addressed(name):
+            images.delete_variants(os.path.splitext(os.path.basename(name))[0])
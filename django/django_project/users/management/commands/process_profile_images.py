@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from users import images
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Hash existing profile images and generate any missing resized variants'
+
+    def handle(self, *args, **options):
+        hashes = {}
+        processed = 0
+        for profile in Profile.objects.only('pk', 'image', 'image_hash').iterator():
+            name = profile.image.name
+            if name not in hashes:
+                hashes[name] = images.content_hash(profile.image)
+                if hashes[name]:
+                    images.process(profile.image.path, hashes[name])
+                    processed += 1
+            if hashes[name] and hashes[name] != profile.image_hash:
+                Profile.objects.filter(pk=profile.pk).update(image_hash=hashes[name])
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} images'))
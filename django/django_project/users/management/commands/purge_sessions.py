@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from django_project import sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches; run it on a schedule'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        purged = sessions.purge_expired()
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {purged} expired sessions in {time.perf_counter() - start:.2f}s'))
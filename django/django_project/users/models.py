@@ -1,22 +1,128 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import User
-from PIL import Image
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from . import images
+
+
+DEFAULT_IMAGE = 'default.jpg'
+
+
+class MediaBlobManager(models.Manager):
+    def retain(self, name):
+        if not name or name == DEFAULT_IMAGE:
+            return
+        blob, created = self.get_or_create(name=name, defaults={'refcount': 1})
+        if not created:
+            self.filter(pk=blob.pk).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+    
+    def release(self, name):
+        if not name or name == DEFAULT_IMAGE:
+            return
+        self.filter(name=name).update(refcount=F('refcount') - 1, updated_at=timezone.now())
+
+
+class MediaBlob(models.Model):
+    """A stored media file and how many rows reference it"""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = MediaBlobManager()
+    
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
 
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    image = models.ImageField(default='default.jpg', upload_to='profile_pics')
+    image = models.ImageField(default=DEFAULT_IMAGE, upload_to='profile_pics')
+    image_hash = models.CharField(max_length=32, blank=True, editable=False)
+    # kept current by users.signals; decides how blog.timeline reaches followers
+    follower_count = models.IntegerField(default=0, editable=False)
     
     def __str__(self):
         return f'{self.user.username} Profile'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'image' in field_names:
+            instance._loaded_image = values[field_names.index('image')]
+        return instance
+    
+    @property
+    def image_changed(self):
+        return self.image.name != getattr(self, '_loaded_image', None)
+    
+    def variant_url(self, size, fmt='jpg'):
+        """URL of a resized copy of the image, or of the original until it exists"""
+        if self.image_hash:
+            name = images.variant_name(self.image_hash, size, fmt)
+            if default_storage.exists(name):
+                return default_storage.url(name)
+        return self.image.url
+    
+    @property
+    def thumbnail_url(self):
+        return self.variant_url(300)
+    
+    @property
+    def thumbnail_webp_url(self):
+        return self.variant_url(300, 'webp')
+    
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        img = Image.open(self.image.path)
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.image.path)
-        
-        
\ No newline at end of file
+        # resizing happens in the background and only for a new image;
+        # users.signals saves the profile on every User save
+        changed = self.image_changed
+        if changed:
+            self.image_hash = images.content_hash(self.image)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if changed:
+                MediaBlob.objects.retain(self.image.name)
+                MediaBlob.objects.release(getattr(self, '_loaded_image', None))
+        self._loaded_image = self.image.name
+        if changed and self.image_hash:
+            images.process_in_background(self.image.path, self.image_hash)
+
+
+class FollowManager(models.Manager):
+    def follow(self, follower, author):
+        """Make ``follower`` follow ``author``; False if they already did"""
+        with transaction.atomic():
+            _, created = self.get_or_create(follower=follower, author=author)
+        return created
+    
+    def unfollow(self, follower, author):
+        """Make ``follower`` stop following ``author``; False if they didn't"""
+        with transaction.atomic():
+            deleted, _ = self.filter(follower=follower, author=author).delete()
+        return bool(deleted)
+    
+    def is_following(self, follower, author):
+        return self.filter(follower=follower, author=author).exists()
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following',
+                                 db_index=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers',
+                               db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = FollowManager()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='users_follow_unique'),
+            models.CheckConstraint(check=~Q(follower=F('author')), name='users_follow_not_self'),
+        ]
+        indexes = [
+            # fan-out walks an author's followers in id order, see blog.timeline
+            models.Index(fields=['author', 'follower'], name='users_follow_author_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.follower_id} follows {self.author_id}'
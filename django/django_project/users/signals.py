@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from .models import Follow, MediaBlob, Profile
 
 
 @receiver(post_save, sender=User)
@@ -12,3 +13,17 @@ def create_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_profile(sender, instance, **kwargs):
     instance.profile.save()
+
+@receiver(post_delete, sender=Profile)
+def release_image(sender, instance, **kwargs):
+    MediaBlob.objects.release(instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def count_follower(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Profile.objects.filter(user_id=instance.author_id).update(follower_count=F('follower_count') + 1)
+
+@receiver(post_delete, sender=Follow)
+def uncount_follower(sender, instance, **kwargs):
+    Profile.objects.filter(user_id=instance.author_id).update(follower_count=F('follower_count') - 1)
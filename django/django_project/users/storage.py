@@ -0,0 +1,39 @@
+"""Content-addressed file storage for uploaded media.
+
+Every saved file is named after the SHA-256 of its content, so an upload
+that is already on disk is not written again and its URL never changes
+meaning, which lets it be served as immutable. Which blobs are still in
+use is tracked by users.models.MediaBlob; see the media_gc command.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+
+HASH_LENGTH = 32
+
+CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{%d}(_\d+)?\.\w+$' % HASH_LENGTH)
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        dirname, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower().replace('.jpeg', '.jpg')
+        return os.path.join(dirname, digest.hexdigest()[:HASH_LENGTH] + ext).replace('\\', '/')
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
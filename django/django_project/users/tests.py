@@ -1,3 +1,247 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from blog.tests import MediaTestCase
+from django_project import sessions
+from django_project.tasks import TaskQueue
+from . import hashers, images
+from .models import MediaBlob, Profile
+from .views import serve_media
+
+
+def make_upload(name='avatar.jpg', size=(800, 600), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProfileImagePipelineTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='painter')
+        self.profile = Profile.objects.get(user=self.user)
+
+    def upload(self, **kwargs):
+        self.profile.image = make_upload(**kwargs)
+        self.profile.save()
+
+    def test_upload_produces_every_variant(self):
+        self.upload()
+        self.assertEqual(len(self.profile.image_hash), 32)
+        for name in images.variant_names(self.profile.image_hash):
+            self.assertTrue(default_storage.exists(name), name)
+        with Image.open(default_storage.path(images.variant_name(self.profile.image_hash, 125, 'webp'))) as img:
+            self.assertEqual(img.format, 'WEBP')
+            self.assertEqual(max(img.size), 125)
+        self.assertIn(self.profile.image_hash, self.profile.thumbnail_url)
+
+    def test_thumbnail_falls_back_to_original(self):
+        with mock.patch.object(images, 'process_in_background'):
+            self.upload(color='blue')
+        self.assertEqual(self.profile.thumbnail_url, self.profile.image.url)
+
+    def test_unchanged_image_is_not_reprocessed(self):
+        self.upload()
+        with mock.patch.object(images, 'process_in_background') as process:
+            self.user.save()
+            Profile.objects.get(pk=self.profile.pk).save()
+        process.assert_not_called()
+
+    def test_same_picture_shares_variants(self):
+        self.upload(name='first.jpg')
+        other = Profile.objects.get(user=User.objects.create(username='copycat'))
+        other.image = make_upload(name='second.jpg')
+        other.save()
+        self.assertEqual(other.image_hash, self.profile.image_hash)
+        with mock.patch('users.images.Image.open') as image_open:
+            images.process(other.image.path, other.image_hash)
+        image_open.assert_not_called()
+
+    def test_backfill_command(self):
+        with mock.patch.object(images, 'process_in_background'):
+            self.upload(color='green')
+        Profile.objects.filter(pk=self.profile.pk).update(image_hash='')
+        call_command('process_profile_images', stdout=io.StringIO())
+        profile = Profile.objects.get(pk=self.profile.pk)
+        self.assertEqual(len(profile.image_hash), 32)
+        self.assertTrue(default_storage.exists(images.variant_name(profile.image_hash, 64, 'jpg')))
+
+
+class ContentAddressedMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profiles = [Profile.objects.get(user=User.objects.create(username=name))
+                         for name in ('first', 'second')]
+
+    def set_image(self, profile, **kwargs):
+        profile.image = make_upload(**kwargs)
+        profile.save()
+        return profile.image.name
+
+    def test_same_content_is_stored_once(self):
+        first = self.set_image(self.profiles[0], name='a.jpg')
+        second = self.set_image(self.profiles[1], name='b.JPEG')
+        self.assertEqual(first, second)
+        self.assertEqual(first, f'profile_pics/{self.profiles[0].image_hash}.jpg')
+        self.assertEqual(default_storage.listdir('profile_pics')[1], [first.split('/')[1]])
+        self.assertEqual(MediaBlob.objects.get(name=first).refcount, 2)
+
+    def test_replacing_and_deleting_release_references(self):
+        old = self.set_image(self.profiles[0], color='red')
+        self.set_image(self.profiles[1], color='red')
+        new = self.set_image(self.profiles[0], color='blue')
+        self.assertEqual(MediaBlob.objects.get(name=old).refcount, 1)
+        self.assertEqual(MediaBlob.objects.get(name=new).refcount, 1)
+        self.profiles[1].user.delete()
+        self.assertEqual(MediaBlob.objects.get(name=old).refcount, 0)
+
+    def test_gc_removes_orphans_and_their_variants(self):
+        orphan = self.set_image(self.profiles[0], color='red')
+        orphan_hash = self.profiles[0].image_hash
+        kept = self.set_image(self.profiles[0], color='blue')
+        call_command('media_gc', grace=0, stdout=io.StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertFalse(default_storage.exists(images.variant_name(orphan_hash, 64, 'jpg')))
+        self.assertFalse(MediaBlob.objects.filter(name=orphan).exists())
+        self.assertTrue(default_storage.exists(kept))
+
+    def test_gc_respects_grace_period(self):
+        orphan = self.set_image(self.profiles[0], color='red')
+        self.set_image(self.profiles[0], color='blue')
+        call_command('media_gc', stdout=io.StringIO())
+        self.assertTrue(default_storage.exists(orphan))
+
+    def test_adopt_and_scan_dedupe_legacy_uploads(self):
+        with mock.patch.object(images, 'process_in_background'):
+            content = make_upload().read()
+            for profile, legacy in zip(self.profiles, ('copy.jpg', 'copy_a9Fmhs8.jpg')):
+                name = FileSystemStorage(location=default_storage.location).save(
+                    f'profile_pics/{legacy}', ContentFile(content))
+                Profile.objects.filter(pk=profile.pk).update(image=name)
+            call_command('media_gc', adopt=True, scan=True, grace=0, stdout=io.StringIO())
+        names = set(Profile.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(default_storage.listdir('profile_pics')[1], [names.pop().split('/')[1]])
+
+    def test_content_addressed_files_are_served_immutable(self):
+        name = self.set_image(self.profiles[0])
+        request = RequestFactory().get('/media/' + name)
+        response = serve_media(request, name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+@override_settings(PASSWORD_HASH_COSTS={'pbkdf2_sha256': 1000})
+class PasswordHashingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='hasher')
+        self.user.set_password('correct horse')
+        self.user.save()
+
+    def login(self, password='correct horse'):
+        return self.client.post(reverse('login'), {'username': 'hasher', 'password': password})
+
+    def stored_hash(self):
+        return User.objects.get(pk=self.user.pk).password
+
+    def test_cost_comes_from_settings(self):
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_upgrades_cost(self):
+        with self.settings(PASSWORD_HASH_COSTS={'pbkdf2_sha256': 2000}):
+            self.assertRedirects(self.login(), reverse('blog-home'))
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_upgrades_algorithm(self):
+        preferred = ['users.hashers.ScryptPasswordHasher', 'users.hashers.PBKDF2PasswordHasher']
+        with self.settings(PASSWORD_HASHERS=preferred, PASSWORD_HASH_COSTS={'scrypt': 2 ** 10}):
+            self.login()
+        self.assertTrue(self.stored_hash().startswith('scrypt$'))
+
+    def test_failed_login_keeps_hash(self):
+        before = self.stored_hash()
+        with self.settings(PASSWORD_HASH_COSTS={'pbkdf2_sha256': 2000}):
+            self.assertEqual(self.login('wrong').status_code, 200)
+        self.assertEqual(self.stored_hash(), before)
+
+    def test_verification_runs_on_pool(self):
+        with mock.patch.object(hashers, 'get_pool', wraps=hashers.get_pool) as get_pool:
+            self.login()
+        get_pool.assert_called()
+
+
+class SessionTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='sessions')
+
+    def create_sessions(self, count, expired):
+        for _ in range(count):
+            session = SessionStore()
+            session['seen'] = True
+            session.create()
+        expire_date = timezone.now() + timedelta(days=-1 if expired else 1)
+        Session.objects.filter(expire_date__gt=timezone.now()).update(expire_date=expire_date)
+
+    @override_settings(SESSION_PURGE_BATCH_SIZE=2)
+    def test_purge_deletes_expired_in_batches(self):
+        self.create_sessions(5, expired=True)
+        self.create_sessions(2, expired=False)
+        # three batches: two, two and the last one
+        self.assertEqual(sessions.purge_expired(), 5)
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertEqual(sessions.purge_expired(), 0)
+
+    def test_purge_command(self):
+        self.create_sessions(3, expired=True)
+        out = io.StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn('Purged 3 expired sessions', out.getvalue())
+
+    def test_scheduled_purge_waits_for_the_web_server(self):
+        queue = TaskQueue()
+        with mock.patch.object(queue, 'every') as every:
+            queue.schedule(60, sessions.purge_expired)
+            every.assert_not_called()
+            # called by django_project.wsgi and asgi only, and once is enough
+            queue.start_schedules()
+            queue.start_schedules()
+        every.assert_called_once_with(60, sessions.purge_expired)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies_store_nothing_to_purge(self):
+        self.assertIsNone(sessions.session_model())
+        self.assertEqual(sessions.purge_expired(), 0)
+
+    def test_every_engine_keeps_users_logged_in(self):
+        for engine in settings.SESSION_ENGINES.values():
+            with self.subTest(engine=engine), self.settings(SESSION_ENGINE=engine):
+                # SessionMiddleware picks its engine when a client's handler
+                # loads the middleware, so each engine needs a client of its own
+                client = Client()
+                client.force_login(self.user)
+                self.assertEqual(client.get(reverse('profile')).status_code, 200)
+                client.logout()
+                self.assertEqual(client.get(reverse('profile')).status_code, 302)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_unchanged_session_is_not_saved(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(SessionStore, 'save') as save:
+            self.client.get(reverse('profile'))
+            self.client.get(reverse('blog-home'))
+        save.assert_not_called()
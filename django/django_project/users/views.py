@@ -1,9 +1,15 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.views.decorators.http import require_POST
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
 from django.http import HttpResponseNotAllowed
+from django.conf import settings
+from django.views.static import serve
+from .models import Follow
+from .storage import is_content_addressed
 
 def register(request):
     if request.method == 'POST':
@@ -43,4 +49,31 @@ def profile(request):
         'u_form': u_form,
         'p_form': p_form
     }
-    return render(request, 'users/profile.html', context)
\ No newline at end of file
+    return render(request, 'users/profile.html', context)
+
+
+@require_POST
+@login_required
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author == request.user:
+        messages.warning(request, 'You cannot follow yourself')
+    elif Follow.objects.follow(request.user, author):
+        messages.success(request, f'You are now following {author.username}')
+    return redirect('user-posts', username=author.username)
+
+@require_POST
+@login_required
+def unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    if Follow.objects.unfollow(request.user, author):
+        messages.success(request, f'You are no longer following {author.username}')
+    return redirect('user-posts', username=author.username)
+
+
+def serve_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        # the name is the content's hash, so it can never go stale
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
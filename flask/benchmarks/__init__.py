@@ -0,0 +1,86 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file, never ``instance/site.db``.
+Run them from the ``flask`` directory, e.g.::
+
+    python -m benchmarks.pagination
+"""
+import atexit
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def create_bench_app(**config):
+    """Return an app bound to a fresh temporary database"""
+    from flask_app import create_app, db
+    from flask_app.config import Config
+    from flask_app.counters import view_counts
+
+    fd, path = tempfile.mkstemp(prefix='bench-', suffix='.db')
+    os.close(fd)
+
+    class BenchConfig(Config):
+        SECRET_KEY = 'bench'
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+
+    for key, value in config.items():
+        setattr(BenchConfig, key, value)
+
+    app = create_app(BenchConfig)
+    app.config['BENCH_DATABASE_PATH'] = path
+    # the scripts remove the database before they exit: drop the views
+    # counted against it rather than flush them into a missing file (exit
+    # handlers run newest first, so before the counters' own flush)
+    atexit.register(view_counts.clear)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect the SQL statements ``engine`` executes inside the block"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(func, repeat=50, warmup=3):
+    """Call ``func`` ``repeat`` times and return latency stats in ms"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'min': timings[0],
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+    }
+
+
+def report(name, stats):
+    print(f"{name:<44} p50 {stats['p50']:8.3f} ms   p95 {stats['p95']:8.3f} ms   "
+          f"p99 {stats['p99']:8.3f} ms")
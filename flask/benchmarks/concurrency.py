@@ -0,0 +1,109 @@
+"""User page read throughput while other threads write, per database profile.
+
+    python -m benchmarks.concurrency [--readers 4] [--writers 1] [--seconds 5]
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+from benchmarks import create_bench_app, percentile
+
+
+def seed(count):
+    from flask_app import db
+    from models.post import Post
+    from models.user import User
+
+    authors = [User(username=f'bench{i}', email=f'bench{i}@example.com', password='x')
+               for i in range(10)]
+    db.session.add_all(authors)
+    db.session.commit()
+    now = datetime.now()
+    db.session.execute(Post.__table__.insert(), [
+        {'title': f'Post {i}', 'content': 'Lorem ipsum ' * 20,
+         'date_posted': now - timedelta(seconds=i), 'user_id': authors[i % 10].id}
+        for i in range(count)
+    ])
+    db.session.commit()
+    return [author.id for author in authors]
+
+
+def run(profile, args):
+    app = create_bench_app(DATABASE_PROFILE=profile)
+    from flask_app import db
+    from models.post import Post
+
+    with app.app_context():
+        author_ids = seed(args.posts)
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+
+    def reader(number):
+        client = app.test_client()
+        url = f'/user/bench{number % 10}'
+        while not stop.is_set():
+            start = time.perf_counter()
+            if client.get(url).status_code != 200:
+                errors.append(url)
+                continue
+            reads.append((time.perf_counter() - start) * 1000)
+
+    def writer(number):
+        with app.app_context():
+            while not stop.is_set():
+                try:
+                    db.session.add(Post(title='Fresh', content='Lorem ipsum ' * 20,
+                                        user_id=author_ids[number % 10]))
+                    db.session.commit()
+                    writes.append(1)
+                except OperationalError as error:
+                    db.session.rollback()
+                    errors.append(str(error))
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+    replica = app.extensions.get('read_replica')
+    if replica is not None:
+        replica.dispose()
+    path = app.config['BENCH_DATABASE_PATH']
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    reads.sort()
+    print(f'{profile:<12} reads {len(reads) / args.seconds:8.0f}/s   '
+          f'p50 {percentile(reads, 50):7.3f} ms   p95 {percentile(reads, 95):7.3f} ms   '
+          f'p99 {percentile(reads, 99):7.3f} ms   writes {len(writes) / args.seconds:6.0f}/s   '
+          f'errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', action='append',
+                        help='Profile to run, repeatable; defaults to all of them')
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    from flask_app.config import SQLITE_PROFILES
+    print(f'{args.readers} readers, {args.writers} writers, {args.posts} posts, '
+          f'{args.seconds:g}s each')
+    for profile in args.profile or SQLITE_PROFILES:
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
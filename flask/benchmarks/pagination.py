@@ -0,0 +1,62 @@
+"""OFFSET vs keyset pagination of the home feed, page 1 vs page 10,000.
+
+    python -m benchmarks.pagination [--posts 50005]
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+from benchmarks import create_bench_app, measure, report
+
+
+def seed(count):
+    from flask_app import db
+    from models.post import Post
+    from models.user import User
+
+    author = User(username='bench', email='bench@example.com', password='x')
+    db.session.add(author)
+    db.session.commit()
+    now = datetime.now()
+    db.session.execute(Post.__table__.insert(), [
+        {'title': f'Post {i}', 'content': 'Lorem ipsum ' * 20,
+         'date_posted': now - timedelta(seconds=i), 'user_id': author.id}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=50005)
+    parser.add_argument('--per-page', type=int, default=5)
+    parser.add_argument('--page', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from flask_app.pagination import NEXT, CursorPagination, encode_cursor
+    from models.post import Post
+
+    with app.app_context():
+        seed(args.posts)
+        newest_first = Post.query.order_by(Post.date_posted.desc(), Post.id.desc())
+
+        def offset_page(number):
+            return newest_first.paginate(page=number, per_page=args.per_page).items
+
+        edge = newest_first.offset((args.page - 1) * args.per_page - 1).first()
+        deep_cursor = encode_cursor(edge, NEXT)
+        assert [p.id for p in CursorPagination(Post.query, args.per_page, deep_cursor).items] == \
+            [p.id for p in offset_page(args.page)]
+
+        print(f'{args.posts} posts, {args.per_page} per page')
+        report('offset  page 1', measure(lambda: offset_page(1)))
+        report(f'offset  page {args.page}', measure(lambda: offset_page(args.page)))
+        report('cursor  page 1', measure(lambda: CursorPagination(Post.query, args.per_page).items))
+        report(f'cursor  page {args.page}',
+               measure(lambda: CursorPagination(Post.query, args.per_page, deep_cursor).items))
+
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Login throughput at each password hashing profile.
+
+    python -m benchmarks.passwords [--logins 20] [--threads N]
+
+For every profile in flask_app.config.PASSWORD_HASH_PROFILES, times
+password verification on one thread (logins/sec per core), the same from
+``--threads`` threads at once through the shared hashing pool, and a full
+login POST through the test client. Profiles whose hashing library is not
+installed are skipped.
+"""
+import argparse
+import os
+import threading
+import time
+
+from benchmarks import create_bench_app, measure, report
+
+
+def rate(func, count, threads=1):
+    """Run ``func`` ``count`` times on each of ``threads`` threads, return calls/sec"""
+    def work():
+        for _ in range(count):
+            func()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return count * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    from flask_app import db, passwords
+    from flask_app.config import PASSWORD_HASH_PROFILES
+    from models.user import User
+
+    print(f'{os.cpu_count()} cores, {args.threads} client threads')
+    for name, profile in PASSWORD_HASH_PROFILES.items():
+        try:
+            app = create_bench_app(PASSWORD_HASH_PROFILE=name)
+        except RuntimeError as error:
+            print(f'{name:<10} skipped: {error}')
+            continue
+        try:
+            with app.app_context():
+                hashed = passwords.hash('correct horse')
+                db.session.add(User(username='bench', email='bench@example.com', password=hashed))
+                db.session.commit()
+            per_core = rate(lambda: passwords._verify('correct horse', hashed), args.logins)
+            pooled = rate(lambda: passwords.verify('correct horse', hashed), args.logins, args.threads)
+            print(f'{name:<10} {profile["algorithm"]:<8} cost {profile["cost"]:<8} '
+                  f'{per_core:8.1f} logins/s per core   {pooled:8.1f} logins/s pooled')
+
+            client = app.test_client()
+
+            def login():
+                client.post('/login', data={'email': 'bench@example.com', 'password': 'correct horse'})
+                client.get('/logout')
+            report(f'  login POST ({name})', measure(login, repeat=args.logins, warmup=1))
+        finally:
+            os.remove(app.config['BENCH_DATABASE_PATH'])
+
+
+if __name__ == '__main__':
+    main()
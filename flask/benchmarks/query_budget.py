@@ -0,0 +1,62 @@
+"""Fail (exit status 1) when a feed page exceeds its query budget.
+
+    python -m benchmarks.query_budget
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from benchmarks import count_queries, create_bench_app
+
+
+# Most queries a page may issue however many posts and authors it shows;
+# one of them is the conditional GET check (flask_app.conditional)
+QUERY_BUDGETS = {
+    '/': 3,
+    '/user/author0': 3,
+    '/post/1': 2,
+}
+
+
+def seed():
+    from flask_app import db
+    from models.author_stats import AuthorStats
+    from models.post import Post
+    from models.user import User
+
+    now = datetime.now()
+    for i in range(6):
+        author = User(username=f'author{i}', email=f'author{i}@example.com', password='x')
+        db.session.add(author)
+        for j in range(3):
+            db.session.add(Post(title=f'Post {j}', content='content', author=author,
+                                date_posted=now - timedelta(minutes=i * 3 + j)))
+    db.session.flush()
+    AuthorStats.rebuild()
+    db.session.commit()
+
+
+def main():
+    app = create_bench_app()
+    from flask_app import db
+
+    with app.app_context():
+        seed()
+        engine = db.engine
+
+    client = app.test_client()
+    failed = False
+    for url, budget in QUERY_BUDGETS.items():
+        with count_queries(engine) as statements:
+            response = client.get(url)
+        ok = response.status_code == 200 and len(statements) <= budget
+        failed = failed or not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {url:<20} {len(statements)} queries (budget {budget})")
+        if not ok:
+            print('\n'.join('     ' + statement for statement in statements))
+
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
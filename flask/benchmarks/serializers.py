@@ -0,0 +1,72 @@
+"""Serialization throughput of the /api/posts encoders against jsonify.
+
+    python -m benchmarks.serializers [--posts 1000]
+
+Times encoding one page worth of posts (``--posts``) already loaded from
+the database, so only the serializer is measured, and prints the body size
+before and after gzip.
+"""
+import argparse
+import gzip
+import os
+from datetime import datetime, timedelta
+from benchmarks import create_bench_app, measure
+
+
+def seed(count):
+    from flask_app import db
+    from flask_app.posts.commands import clean, insert_posts
+    from models.user import User
+
+    author = User(username='bench', email='bench@example.com', password='x')
+    db.session.add(author)
+    db.session.commit()
+    now = datetime.now()
+    insert_posts([clean({'title': f'Post {i}', 'content': 'lorem ipsum dolor sit amet ' * 40,
+                         'user_id': author.id, 'date_posted': (now - timedelta(seconds=i)).isoformat()},
+                        {author.id}, now)
+                  for i in range(count)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from flask import jsonify
+    from flask_app.api import routes as api
+    from models.post import Post
+
+    # url_for needs a request
+    with app.test_request_context():
+        seed(args.posts)
+        fields = list(api.FIELDS)
+        posts = api.select(Post.query, fields).order_by(Post.date_posted.desc(), Post.id.desc()).all()
+
+        def results():
+            return {'results': [api.serialize(post, fields) for post in posts]}
+
+        candidates = {
+            'jsonify': lambda: jsonify(results()).get_data(),
+            'api stdlib json': lambda: api.json_dumps(results()),
+        }
+        if api.orjson:
+            candidates['api orjson'] = lambda: api.orjson.dumps(results())
+        else:
+            print('orjson is not installed; pip install orjson to compare it')
+
+        print(f'{args.posts} posts')
+        for name, encode in candidates.items():
+            stats = measure(encode, repeat=args.repeat)
+            body = encode()
+            print(f"{name:<36} p50 {stats['p50']:8.3f} ms  {args.posts / stats['p50'] * 1000:10.0f} posts/s"
+                  f"  {len(body):9} bytes  {len(gzip.compress(body)):8} gzipped")
+
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Load and regression benchmark of the main pages.
+
+    python -m benchmarks.suite [--users 50] [--posts 5000] [--requests 200]
+                               [--server] [--output results.json]
+                               [--baseline results.json] [--tolerance 0.2]
+
+Seeds ``--users`` users and ``--posts`` posts cycled from ``--source`` (by
+default the Django app's posts.json), then requests every scenario
+``--requests`` times through the test client and, with ``--server``,
+through a local WSGI server over HTTP. Logins and new posts run a tenth as
+often, they hash a password or write. Reports requests/sec, p50/p95/p99
+latency and queries per request, counted by flask_app.metrics and read
+from the Server-Timing header.
+
+``--output`` saves the results as JSON along with the commit they ran on;
+``--baseline`` compares them with an earlier file and exits with status 1
+when a scenario's p95 grew by more than ``--tolerance`` or it runs more
+queries than before.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from benchmarks import create_bench_app, percentile
+
+PASSWORD = 'bench-pass'
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+POSTS_JSON = os.path.join(os.path.dirname(__file__), '..', '..', 'django', 'django_project', 'posts.json')
+
+
+def seed(users, posts, source, batch_size=5000):
+    from flask_app import db, passwords
+    from flask_app.posts.commands import clean, insert_posts
+    from models.post import Post
+    from models.user import User
+
+    with open(source) as fp:
+        records = json.load(fp)
+    password = passwords.hash(PASSWORD)
+    authors = [User(username=f'bench{i}', email=f'bench{i}@example.com', password=password)
+               for i in range(users)]
+    db.session.add_all(authors)
+    db.session.commit()
+    author_ids = {author.id for author in authors}
+    now = datetime.now()
+    batch = []
+    for i in range(posts):
+        record = records[i % len(records)]
+        batch.append(clean({'title': f"{record['title'][:90]} #{i}", 'content': record['content'],
+                            'user_id': authors[i % users].id,
+                            'date_posted': (now - timedelta(minutes=i)).isoformat()}, author_ids, now))
+        if len(batch) == batch_size:
+            insert_posts(batch)
+            batch = []
+    if batch:
+        insert_posts(batch)
+    db.session.commit()
+    return [author.username for author in authors], [id for (id,) in db.session.query(Post.id)]
+
+
+def scenarios(urls, usernames, post_ids):
+    """name: (share of --requests, signed in, request maker)"""
+    rng = random.Random(0)
+    return {
+        'main.home': (1, False, lambda: ('GET', urls.build('main.home'), None)),
+        'posts.post': (1, False, lambda: ('GET', urls.build('posts.post', {'post_id': rng.choice(post_ids)}),
+                                          None)),
+        'users.user': (1, False, lambda: ('GET', urls.build('users.user', {'username': rng.choice(usernames)}),
+                                          None)),
+        'api.posts': (1, False, lambda: ('GET', urls.build('api.posts'), None)),
+        'users.login': (0.1, False, lambda: ('POST', urls.build('users.login'),
+                                             login_data(rng.choice(usernames)))),
+        'posts.new_post': (0.1, True, lambda: ('POST', urls.build('posts.new_post'),
+                                               {'title': 'Benchmark post', 'content': 'Lorem ipsum ' * 50})),
+    }
+
+
+def login_data(username):
+    return {'email': f'{username}@example.com', 'password': PASSWORD}
+
+
+class TestClientDriver:
+    name = 'client'
+
+    def __init__(self, app, username=None):
+        self.client = app.test_client()
+        if username:
+            self.client.post('/login', data=login_data(username))
+
+    def request(self, method, path, data):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPDriver:
+    """Requests over HTTP, with cookies; the bench app has CSRF checks off"""
+    name = 'server'
+
+    def __init__(self, base_url, username=None):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+        if username:
+            self.request('POST', '/login', login_data(username))
+
+    def request(self, method, path, data):
+        body = urllib.parse.urlencode(data).encode() if method == 'POST' else None
+        try:
+            with self.opener.open(self.base_url + path, body) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code, error.headers.get('Server-Timing', '')
+
+
+def serve(app):
+    """Start ``app`` on a free local port, return its URL"""
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def run(driver_factory, scenarios, requests, usernames):
+    results = {}
+    for name, (share, signed_in, make_request) in scenarios.items():
+        driver = driver_factory(usernames[0] if signed_in else None)
+        count = max(1, int(requests * share))
+        timings, queries, errors = [], [], 0
+        start = time.perf_counter()
+        for _ in range(count):
+            method, path, data = make_request()
+            request_start = time.perf_counter()
+            status, timing = driver.request(method, path, data)
+            timings.append((time.perf_counter() - request_start) * 1000)
+            errors += status >= 400
+            match = QUERY_COUNT.search(timing)
+            if match:
+                queries.append(int(match.group(1)))
+        seconds = time.perf_counter() - start
+        timings.sort()
+        results[name] = {
+            'requests': count,
+            'errors': errors,
+            'throughput': count / seconds,
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+            'queries': max(queries) if queries else None,
+        }
+        print(f"{driver.name:<7} {name:<15} {results[name]['throughput']:8.1f} req/s   "
+              f"p50 {results[name]['p50']:8.3f} ms   p95 {results[name]['p95']:8.3f} ms   "
+              f"p99 {results[name]['p99']:8.3f} ms   queries {results[name]['queries']}   "
+              f"errors {errors}")
+    return results
+
+
+def compare(results, settings, baseline, tolerance):
+    """Print how ``results`` moved from ``baseline``; return the regressions"""
+    regressions = []
+    print(f"\nagainst {baseline.get('commit') or 'baseline'}:")
+    if baseline.get('settings') != settings:
+        print(f"note: the baseline ran with {baseline.get('settings')}")
+    for mode, scenarios in results.items():
+        for name, new in scenarios.items():
+            old = baseline['results'].get(mode, {}).get(name)
+            if old is None:
+                continue
+            change = (new['p95'] - old['p95']) / old['p95'] if old['p95'] else 0.0
+            slower = change > tolerance
+            more_queries = None not in (new['queries'], old['queries']) and new['queries'] > old['queries']
+            if slower or more_queries:
+                regressions.append(f'{mode} {name}')
+            print(f"{mode:<7} {name:<15} p95 {change:+7.1%}   queries {old['queries']} -> {new['queries']}"
+                  f"{'   REGRESSION' if slower or more_queries else ''}")
+    return regressions
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--source', default=POSTS_JSON, help='JSON array of posts to cycle through')
+    parser.add_argument('--server', action='store_true', help='also drive a local WSGI server')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with results written by an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='p95 growth counted as a regression, 0.2 is 20%%')
+    args = parser.parse_args()
+
+    # logins would otherwise time the production password hash cost
+    app = create_bench_app(PASSWORD_HASH_PROFILE='fast')
+    with app.app_context():
+        usernames, post_ids = seed(args.users, args.posts, args.source)
+    urls = app.url_map.bind('localhost')
+    print(f'{args.users} users, {args.posts} posts, {args.requests} requests per page')
+    results = {'client': run(lambda username: TestClientDriver(app, username),
+                             scenarios(urls, usernames, post_ids), args.requests, usernames)}
+    if args.server:
+        url = serve(app)
+        results['server'] = run(lambda username: HTTPDriver(url, username),
+                                scenarios(urls, usernames, post_ids), args.requests, usernames)
+
+    config = {'users': args.users, 'posts': args.posts, 'requests': args.requests}
+    report = {
+        'app': 'flask',
+        'commit': current_commit(),
+        'date': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'settings': config,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        if compare(results, config, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Personal timelines: fan-out cost and read latency at 10,000 followers.
+
+    python -m benchmarks.timeline [--followers 10000] [--authors 100]
+                                  [--posts 50]
+
+``--followers`` users follow one author; the reader also follows
+``--authors`` others with ``--posts`` posts each. Times fanning a new post
+out to every follower, then reads the reader's first and a deep timeline
+page three ways: materialized (flask_app.timeline), with the popular author
+read on demand and merged in, and as the naive ``user_id IN`` query over
+posts.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from benchmarks import create_bench_app, measure, report
+
+
+def seed(followers, authors, posts):
+    from flask_app import db
+    from models.follow import Follow
+    from models.post import Post
+    from models.user import User
+
+    def users(names, follower_count=0):
+        db.session.execute(User.__table__.insert(), [
+            {'username': name, 'email': f'{name}@example.com', 'password': 'x',
+             'image_file': 'default.jpg', 'follower_count': follower_count} for name in names])
+        return db.session.scalars(db.select(User.id).where(User.username.in_(names))
+                                  .order_by(User.id)).all()
+
+    popular, reader = users(['popular', 'reader'])
+    others = users([f'author{i}' for i in range(authors)], 1)
+    fans = users([f'fan{i}' for i in range(followers)])
+    db.session.execute(Follow.__table__.insert(), [
+        {'follower_id': fan, 'author_id': popular, 'created_at': datetime.now()}
+        for fan in fans + [reader]] + [
+        {'follower_id': reader, 'author_id': author, 'created_at': datetime.now()}
+        for author in others])
+    db.session.execute(db.update(User).where(User.id == popular)
+                       .values(follower_count=followers + 1))
+
+    now = datetime.now()
+    everyone = [popular] + others
+    db.session.execute(Post.__table__.insert(), [
+        {'title': f'Post {i}', 'content': 'Lorem ipsum ' * 20, 'user_id': author,
+         'date_posted': now - timedelta(seconds=i * len(everyone) + j)}
+        for i in range(posts) for j, author in enumerate(everyone)])
+    db.session.commit()
+    return popular, reader
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--followers', type=int, default=10000)
+    parser.add_argument('--authors', type=int, default=100)
+    parser.add_argument('--posts', type=int, default=50)
+    parser.add_argument('--per-page', type=int, default=5)
+    parser.add_argument('--page', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from flask_app import db, timeline
+    from flask_app.pagination import CursorPagination
+    from models.follow import Follow
+    from models.post import Post
+    from models.timeline import TimelineEntry
+
+    with app.app_context():
+        popular, reader = seed(args.followers, args.authors, args.posts)
+        print(f'{args.followers} followers, {args.authors} more authors followed by the reader, '
+              f'{args.posts} posts each')
+
+        # everyone is fanned out to
+        app.config['TIMELINE_FANOUT_LIMIT'] = args.followers + 1
+        post = Post(title='New', content='Lorem ipsum', user_id=popular)
+        db.session.add(post)
+        db.session.commit()
+        start = time.perf_counter()
+        timeline.fan_out(post.id)
+        print(f'fan-out to {args.followers + 1} followers: '
+              f'{(time.perf_counter() - start) * 1000:.1f} ms, '
+              f'{TimelineEntry.query.filter_by(post_id=post.id).count()} entries')
+        timeline.rebuild(reader)
+
+        def materialized(cursor):
+            return timeline.page(reader, args.per_page, cursor)
+
+        followed = db.select(Follow.author_id).where(Follow.follower_id == reader)
+
+        def naive(cursor):
+            return CursorPagination(Post.listing().filter(Post.user_id.in_(followed)),
+                                    args.per_page, cursor)
+
+        deep = None
+        for _ in range(args.page - 1):
+            deep = materialized(deep).next_cursor
+        assert [p.id for p in materialized(deep).items] == [p.id for p in naive(deep).items]
+        report('materialized  page 1', measure(lambda: materialized(None).items))
+        report(f'materialized  page {args.page}', measure(lambda: materialized(deep).items))
+
+        # the popular author is read on demand from here on
+        app.config['TIMELINE_FANOUT_LIMIT'] = args.followers
+        timeline.rebuild(reader)
+        assert [p.id for p in materialized(deep).items] == [p.id for p in naive(deep).items]
+        report('merged        page 1', measure(lambda: materialized(None).items))
+        report(f'merged        page {args.page}', measure(lambda: materialized(deep).items))
+
+        report('user_id IN    page 1', measure(lambda: naive(None).items))
+        report(f'user_id IN    page {args.page}', measure(lambda: naive(deep).items))
+
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Trending posts: the cost of a ranking run and of reading the top K.
+
+    python -m benchmarks.trending [--posts 100000] [--top 20]
+
+Seeds ``--posts`` posts with random view counts and times
+flask_app.trending's ranking run, first from empty and then again an hour
+on with a tenth of the posts viewed since. Then reads the top ``--top``
+from the scores, and for comparison the naive query ranking the past week's
+posts by views on every request.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from benchmarks import create_bench_app, measure, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from flask_app import db, trending
+    from models.post import Post
+    from models.user import User
+
+    with app.app_context():
+        author = User(username='bench', email='bench@example.com', password='x')
+        db.session.add(author)
+        db.session.commit()
+        now = datetime.now()
+        db.session.execute(Post.__table__.insert(), [
+            {'title': f'Post {i}', 'content': 'Lorem ipsum', 'user_id': author.id,
+             'date_posted': now - timedelta(minutes=i), 'views': random.randint(0, 1000)}
+            for i in range(args.posts)])
+        db.session.commit()
+        print(f'{args.posts} posts')
+
+        start = time.perf_counter()
+        written = trending.rank(now)
+        print(f'first run: {written} scores in {(time.perf_counter() - start) * 1000:.1f} ms')
+        ids = db.session.scalars(db.select(Post.id)).all()
+        viewed = random.sample(ids, len(ids) // 10)
+        for i in range(0, len(viewed), 900):
+            db.session.execute(db.update(Post).where(Post.id.in_(viewed[i:i + 900]))
+                               .values(views=Post.views + 10))
+        db.session.commit()
+        start = time.perf_counter()
+        written = trending.rank(now + timedelta(hours=1))
+        print(f'an hour on: {written} scores in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        report(f'top {args.top} from the scores', measure(lambda: trending.top(args.top)))
+        week = Post.listing().filter(Post.date_posted >= now - timedelta(days=7))\
+            .order_by(Post.views.desc(), Post.id.desc())
+        report(f"top {args.top} of the week's posts by views",
+               measure(lambda: week.limit(args.top).all()))
+
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Counting post views: an UPDATE per view against flask_app.counters' buffer.
+
+    python -m benchmarks.views [--threads 8] [--seconds 5] [--posts 1000]
+
+Each thread counts views of random posts for ``--seconds``, first with
+``UPDATE post SET views = views + 1`` per view, then through the buffer
+flushed every ``--flush-hits`` views. Reports views counted per second and
+the latency of counting one, in the 'production' database profile (WAL)
+unless ``--profile`` says otherwise.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from benchmarks import create_bench_app, percentile
+
+
+def run(app, args, post_ids, count):
+    stop = threading.Event()
+    timings, errors = [], []
+
+    def worker():
+        with app.app_context():
+            while not stop.is_set():
+                post_id = random.choice(post_ids)
+                start = time.perf_counter()
+                try:
+                    count(post_id)
+                except OperationalError as error:
+                    errors.append(str(error))
+                    continue
+                timings.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    timings.sort()
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', default='production')
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--flush-hits', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_bench_app(DATABASE_PROFILE=args.profile, VIEW_FLUSH_HITS=args.flush_hits)
+    from flask_app import db
+    from flask_app.counters import view_counts
+    from flask_app.tasks import tasks
+    from models.post import Post
+    from models.user import User
+
+    with app.app_context():
+        author = User(username='bench', email='bench@example.com', password='x')
+        db.session.add(author)
+        db.session.commit()
+        db.session.execute(Post.__table__.insert(), [
+            {'title': f'Post {i}', 'content': 'Lorem ipsum', 'user_id': author.id, 'views': 0}
+            for i in range(args.posts)])
+        db.session.commit()
+        post_ids = db.session.scalars(db.select(Post.id)).all()
+    print(f'{args.threads} threads, {args.posts} posts, {args.seconds:g}s each, '
+          f'{args.profile} profile')
+
+    def per_view(post_id):
+        db.session.execute(db.update(Post).where(Post.id == post_id)
+                           .values(views=Post.views + 1))
+        db.session.commit()
+
+    for name, count in (('UPDATE per view', per_view), ('buffered', view_counts.hit)):
+        with app.app_context():
+            db.session.execute(db.update(Post).values(views=0))
+            db.session.commit()
+        timings, errors = run(app, args, post_ids, count)
+        view_counts.flush()
+        tasks.join()
+        with app.app_context():
+            written = db.session.scalar(db.select(db.func.sum(Post.views)))
+        print(f'{name:<16} {len(timings) / args.seconds:9.0f} views/s   '
+              f'p50 {percentile(timings, 50):7.3f} ms   p95 {percentile(timings, 95):7.3f} ms   '
+              f'p99 {percentile(timings, 99):7.3f} ms   written {written}   '
+              f'errors {len(errors)}')
+
+    os.remove(app.config['BENCH_DATABASE_PATH'])
+
+
+if __name__ == '__main__':
+    main()
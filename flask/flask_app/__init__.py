@@ -3,14 +3,15 @@ import logging
 import os
 from flask import Flask
 from flask_mail import Mail
-from flask_bcrypt import Bcrypt
 from flask_app.config import Config
+from flask_app import assets, database, metrics
+from flask_app.passwords import passwords
+from flask_app.tasks import tasks
 from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 
 
-db = SQLAlchemy()
-bcrypt = Bcrypt()
+db = SQLAlchemy(session_options={'class_': database.RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = 'users.login'
 login_manager.login_message_category = 'info'
@@ -18,16 +19,19 @@ login_manager.login_message_category = 'info'
 
 def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
 
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
     logger.info('Initializing extensions..')
 
-    db.init_app(app)
-    bcrypt.init_app(app)
+    database.init_app(app, db)
+    passwords.init_app(app)
     login_manager.init_app(app)
+    tasks.init_app(app)
+    metrics.init_app(app)
+    assets.init_app(app)
     logger.info('Extensions initialized')
 
     logger.info('Registering blueprints..')
@@ -35,10 +39,24 @@ def create_app(config_class=Config):
     from flask_app.posts.routes import posts
     from flask_app.main.routes import main
     from flask_app.errors.handlers import errors
+    from flask_app.counters import view_counts
+    from flask_app.api.routes import api
+    from flask_app.syndication.routes import syndication
     app.register_blueprint(users)
     app.register_blueprint(posts)
     app.register_blueprint(main)
     app.register_blueprint(errors)
+    app.register_blueprint(api)
+    app.register_blueprint(syndication)
+    view_counts.init_app(app)
     logger.info('Blueprints registered')
 
+    from flask_app.schema import upgrade_db_command
+    from flask_app.timeline import rebuild_timelines_command
+    from flask_app import trending
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(rebuild_timelines_command)
+    app.cli.add_command(trending.rank_trending_command)
+    trending.schedule(app)
+
     return app
@@ -0,0 +1,210 @@
+"""JSON API over Post.
+
+    GET  /api/posts              newest first, ``?limit=`` posts a page,
+                                 ``?cursor=`` from the last page's ``next``
+    GET  /api/posts?ids=3,1,2    those posts, in that order
+    GET  /api/posts/<id>
+    POST /api/posts              a post object, or an array of them created
+                                 with one executemany; signed-in users only,
+                                 who post as themselves and as of now
+
+``?fields=id,title`` limits each post to those fields, and the query to the
+columns they need. Bodies are encoded with orjson when it is installed and
+gzipped for clients that accept it.
+"""
+import gzip
+import json
+from datetime import datetime
+from flask import Blueprint, current_app, request, url_for
+from flask_login import current_user
+from sqlalchemy.orm import joinedload, load_only
+from flask_app import db
+from flask_app.cache import feed_cache
+from flask_app.database import read_replica
+from flask_app.pagination import CursorPagination, InvalidCursor
+from flask_app.posts.commands import InvalidRecord, clean, insert_posts
+from flask_app import timeline
+from models.post import Post
+from models.user import User
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# bodies smaller than this are sent as they are
+GZIP_MIN_SIZE = 200
+
+# field: (the columns it reads, how it is read)
+FIELDS = {
+    'id': ((Post.id,), lambda post: post.id),
+    'title': ((Post.title,), lambda post: post.title),
+    'content': ((Post.content,), lambda post: post.content),
+    'excerpt': ((Post.excerpt,), lambda post: post.excerpt),
+    'word_count': ((Post.word_count,), lambda post: post.word_count),
+    'reading_time': ((Post.reading_time,), lambda post: post.reading_time),
+    'date_posted': ((Post.date_posted,), lambda post: post.date_posted.isoformat()),
+    'updated_at': ((Post.updated_at,), lambda post: post.updated_at and post.updated_at.isoformat()),
+    'author': ((Post.user_id,), lambda post: post.author.username),
+    'url': ((Post.id,), lambda post: url_for('posts.post', post_id=post.id)),
+}
+# lists leave out the content, like the feeds; ask for it with ?fields=
+LIST_FIELDS = [name for name in FIELDS if name != 'content']
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def json_dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+dumps = orjson.dumps if orjson else json_dumps
+loads = orjson.loads if orjson else json.loads
+
+
+def serialize(post, fields):
+    return {name: FIELDS[name][1](post) for name in fields}
+
+
+def json_response(data, status=200):
+    return current_app.response_class(dumps(data), status=status, mimetype='application/json')
+
+
+def error(message, status=400):
+    return json_response({'error': message}, status)
+
+
+def requested_fields(default):
+    fields = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise BadRequest(f"unknown fields {', '.join(unknown)}")
+    return fields or default
+
+
+def select(query, fields):
+    """``query`` reading only the columns ``fields`` need"""
+    # the cursor is built from these
+    columns = {Post.id, Post.date_posted}.union(*(FIELDS[name][0] for name in fields))
+    query = query.options(load_only(*columns))
+    if 'author' in fields:
+        query = query.options(joinedload(Post.author).load_only(User.username))
+    return query
+
+
+def positive_int(value, name, maximum):
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} must be a number')
+    if not 1 <= value <= maximum:
+        raise BadRequest(f'{name} must be between 1 and {maximum}')
+    return value
+
+
+@api.errorhandler(BadRequest)
+def bad_request(bad):
+    return error(str(bad))
+
+
+@api.after_request
+def compress(response):
+    if 'gzip' not in request.accept_encodings or response.direct_passthrough \
+            or response.content_length is None or response.content_length < GZIP_MIN_SIZE \
+            or 'Content-Encoding' in response.headers:
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=current_app.config['API_GZIP_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@api.route('/posts', methods=['GET', 'POST'])
+def posts():
+    if request.method == 'POST':
+        return create_posts()
+    return list_posts()
+
+
+@read_replica
+def list_posts():
+    fields = requested_fields(LIST_FIELDS)
+    query = select(Post.query, fields)
+    max_size = current_app.config['API_MAX_PAGE_SIZE']
+
+    if 'ids' in request.args:
+        try:
+            ids = [int(id) for id in request.args['ids'].split(',')]
+        except ValueError:
+            raise BadRequest('ids must be numbers')
+        if len(ids) > max_size:
+            raise BadRequest(f'at most {max_size} ids')
+        found = {post.id: post for post in query.filter(Post.id.in_(ids))}
+        return json_response({'results': [serialize(found[id], fields) for id in ids if id in found]})
+
+    limit = positive_int(request.args.get('limit', current_app.config['API_PAGE_SIZE']), 'limit', max_size)
+    try:
+        page = CursorPagination(query, limit, request.args.get('cursor'))
+    except InvalidCursor:
+        raise BadRequest('invalid cursor')
+    return json_response({
+        'results': [serialize(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.prev_cursor,
+    })
+
+
+def create_posts():
+    if not current_user.is_authenticated:
+        return error('sign in to create posts', 401)
+    fields = requested_fields(list(FIELDS))
+    # a JSON body also keeps other sites' forms out, they can't send one
+    if not request.is_json:
+        raise BadRequest('body is not JSON')
+    try:
+        body = loads(request.get_data())
+    except ValueError:
+        raise BadRequest('body is not JSON')
+    records = body if isinstance(body, list) else [body]
+    max_create = current_app.config['API_MAX_CREATE']
+    if len(records) > max_create:
+        raise BadRequest(f'at most {max_create} posts at a time')
+
+    # everything is validated before anything is written
+    now = datetime.now()
+    rows, errors = [], []
+    for index, record in enumerate(records):
+        if isinstance(record, dict):
+            # posted now, by the signed-in user; a client-chosen date could
+            # backdate a post, or pin it to the top of the feeds
+            record = dict(record, user_id=current_user.id, date_posted=None)
+        try:
+            rows.append(clean(record, {current_user.id}, now))
+        except InvalidRecord as invalid:
+            errors.append({'index': index, 'error': str(invalid)})
+    if errors:
+        return json_response({'error': 'invalid posts', 'posts': errors}, 400)
+
+    created = insert_posts(rows, returning=True) if rows else []
+    # before the commit expires them
+    results = [serialize(post, fields) for post in created]
+    post_ids = [post.id for post in created]
+    db.session.commit()
+    feed_cache.invalidate()
+    for post_id in post_ids:
+        timeline.in_background(timeline.fan_out, post_id)
+    return json_response({'results': results} if isinstance(body, list) else results[0], 201)
+
+
+@api.route('/posts/<int:post_id>')
+@read_replica
+def post(post_id):
+    fields = requested_fields(list(FIELDS))
+    post = select(Post.query, fields).filter(Post.id == post_id).first()
+    if post is None:
+        return error('no such post', 404)
+    return json_response(serialize(post, fields))
@@ -0,0 +1,151 @@
+"""Static files fingerprinted, minified and precompressed ahead of time.
+
+``flask build-assets`` copies the static folder (less the uploaded
+``profile_pics``) into STATIC_BUILD_FOLDER under names carrying a hash of
+their content, minifying CSS and writing a ``.gz``, and a ``.br`` when
+brotli is installed, next to each text file, plus a ``manifest.json``.
+Once built, ``url_for('static', ...)`` links to the fingerprinted names and
+the static endpoint serves them with the smallest encoding the client
+accepts, cached for a year as ``immutable``. Anything not in the manifest
+is served from the static folder as before.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import click
+from flask import current_app, request, send_file
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.map')
+# smaller gains are not worth a second file
+MIN_SAVING = 0.05
+# uploads, not assets; they are content-addressed already
+SKIP = ('profile_pics',)
+ONE_YEAR = 31536000
+
+# a comment, or a string or unquoted url() that must be kept as written
+CSS_TOKEN = re.compile(r'(/\*.*?\*/)|("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|url\([^)"\']*\))',
+                       re.S | re.I)
+CSS_KEPT = re.compile(r'\0(\d+)\0')
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css):
+    """Drop comments and the whitespace CSS doesn't need, leaving strings
+    and url()s as written"""
+    kept = []
+
+    def set_aside(match):
+        if match.group(1):
+            return ''
+        kept.append(match.group(2))
+        return f'\0{len(kept) - 1}\0'
+    css = CSS_TOKEN.sub(set_aside, css)
+    css = CSS_SPACE.sub(' ', css)
+    css = CSS_PUNCTUATION.sub(r'\1', css)
+    # a space before ':' can be a descendant selector, only the one after goes
+    css = css.replace(': ', ':').replace(';}', '}')
+    return CSS_KEPT.sub(lambda match: kept[int(match.group(1))], css.strip())
+
+
+def compressed_variants(data):
+    """``{extension: bytes}`` of the encodings worth keeping for ``data``"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {extension: encoded for extension, encoded in variants.items()
+            if len(encoded) <= len(data) * (1 - MIN_SAVING)}
+
+
+def build(source, target):
+    """Write the fingerprinted copies of ``source`` to ``target``, return the manifest"""
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    manifest = {}
+    for directory, subdirectories, names in os.walk(source):
+        if directory == source:
+            subdirectories[:] = [name for name in subdirectories if name not in SKIP]
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, source).replace(os.sep, '/')
+            with open(path, 'rb') as fp:
+                data = fp.read()
+            if name.endswith('.css'):
+                data = minify_css(data.decode()).encode()
+            stem, extension = os.path.splitext(relative)
+            hashed = f'{stem}.{hashlib.md5(data).hexdigest()[:12]}{extension}'
+            output = os.path.join(target, hashed)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            with open(output, 'wb') as fp:
+                fp.write(data)
+            if name.endswith(COMPRESSIBLE):
+                for suffix, encoded in compressed_variants(data).items():
+                    with open(output + suffix, 'wb') as fp:
+                        fp.write(encoded)
+            manifest[relative] = hashed
+    with open(os.path.join(target, 'manifest.json'), 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    return manifest
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint, minify and precompress the static files."""
+    manifest = build(current_app.static_folder, current_app.config['STATIC_BUILD_FOLDER'])
+    click.echo(f"Built {len(manifest)} files into {current_app.config['STATIC_BUILD_FOLDER']}")
+
+
+def load_manifest(folder):
+    try:
+        with open(os.path.join(folder, 'manifest.json')) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {}
+
+
+def init_app(app):
+    app.cli.add_command(build_assets_command)
+    folder = app.config['STATIC_BUILD_FOLDER']
+    manifest = load_manifest(folder)
+    if not manifest:
+        return
+    built = set(manifest.values())
+    send_static_file = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprinted_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        if filename not in built:
+            return send_static_file(filename=filename)
+        path = os.path.join(folder, filename)
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if candidate in accepted and os.path.exists(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+        # each encoding is its own file, so send_file gives it its own ETag
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], max_age=ONE_YEAR,
+                             conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
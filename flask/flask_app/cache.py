@@ -0,0 +1,186 @@
+"""Small in-process cache shared by the blueprints"""
+import threading
+import time
+from collections import OrderedDict
+from flask import g
+from models.generation import Generation
+
+
+class SimpleCache:
+    """Thread-safe dict cache with per-key expiry.
+
+    Entries are local to the worker process, so values served from here
+    may lag other workers by at most their timeout.
+    """
+
+    def __init__(self, default_timeout=300, max_entries=1000):
+        self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                self._prune()
+            self._data[key] = (expires, value)
+
+    def get_or_set(self, key, func, timeout=None):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = func()
+            self.set(key, value, timeout)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, (expires, _) in list(self._data.items()):
+            if expires is not None and expires <= now:
+                del self._data[key]
+        if len(self._data) >= self.max_entries:
+            # still full: drop the oldest third (dicts keep insertion order)
+            for key in list(self._data)[:max(1, self.max_entries // 3)]:
+                del self._data[key]
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with per-key expiry.
+
+    Keeps at most ``max_entries`` keys, evicting the one read or written
+    longest ago, and counts hits and misses for ``stats()``.
+    """
+
+    def __init__(self, default_timeout=300, max_entries=1000):
+        self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+        }
+
+
+cache = SimpleCache()
+
+
+class FragmentCache:
+    """Rendered HTML fragments, dropped all at once by ``invalidate()``.
+
+    Keys are prefixed with a generation number that invalidation bumps, so
+    stale fragments are never served and just age out of ``backend``. The
+    number is kept in the database (models.generation), so a change made
+    through one worker drops the fragments, and moves the feed ETags, of
+    every worker; a request reads it once.
+    """
+
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        generations = g.setdefault('cache_generations', {})
+        if self.name not in generations:
+            generations[self.name] = Generation.current(self.name)
+        return generations[self.name]
+
+    def _key(self, key):
+        return f'{self.name}:{self.generation}:{key}'
+
+    def get(self, key):
+        html = self.backend.get(self._key(key))
+        with self._lock:
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return html
+
+    def set(self, key, html, timeout=None):
+        self.backend.set(self._key(key), html, timeout)
+
+    def invalidate(self):
+        """Drop every fragment; commits the session"""
+        g.setdefault('cache_generations', {})[self.name] = Generation.bump(self.name)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'generation': self.generation,
+        }
+
+
+feed_cache = FragmentCache('feed', cache)
+
+# column values of signed-in users by id, see models.user.load_user;
+# every hit is a user query saved
+user_cache = LRUCache(max_entries=1000)
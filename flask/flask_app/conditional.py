@@ -0,0 +1,83 @@
+"""Conditional GET for the post pages and feeds.
+
+Each validator returns ``(etag, last_modified)`` for a page from at most
+one small query, or ``None`` when the page can't be validated, so a client
+that already has the page gets a 304 without the view rendering anything.
+Pages differ for signed-in users, so the user id from the session is part
+of every ETag and responses are marked private.
+"""
+import functools
+import hashlib
+from flask import current_app, make_response, request, session
+from sqlalchemy import func
+from flask_app import db
+from flask_app.cache import feed_cache
+from models.post import Post
+from models.user import User
+
+
+def _etag(*parts):
+    # flask_login keeps the user id in the (cookie) session: no query
+    viewer = session.get('_user_id', '')
+    state = ':'.join(str(part) for part in (viewer, current_app.config['POSTS_PAGINATION']) + parts)
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def feed():
+    # the feed cache generation moves on every change the feed can show, in
+    # every worker: it is read from the database
+    return _etag(feed_cache.generation, request.query_string.decode()), None
+
+
+def user_feed(username):
+    # every follow and unfollow changes the follower count, and with it the
+    # follow button
+    row = db.session.query(User.id, User.image_file, User.follower_count, func.max(Post.updated_at),
+                           func.count(Post.id))\
+        .outerjoin(Post, Post.user_id == User.id).filter(User.username == username)\
+        .group_by(User.id).first()
+    if row is None:
+        return None
+    id, image_file, followers, latest, posts = row
+    return _etag(id, image_file, followers, latest, posts, request.query_string.decode()), latest
+
+
+def post(post_id):
+    # the view count moves only when buffered views are written
+    row = db.session.query(Post.updated_at, Post.views, User.username, User.image_file)\
+        .join(User, Post.user_id == User.id).filter(Post.id == post_id).first()
+    if row is None:
+        return None
+    updated_at, views, username, image_file = row
+    return _etag(post_id, updated_at, views, username, image_file), updated_at
+
+
+def conditional(validators):
+    """Answer conditional GETs for the decorated view with ``validators``"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # one-time flashed messages would be lost on a 304
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+            validated = validators(*args, **kwargs)
+            if validated is None:
+                return view(*args, **kwargs)
+            etag, last_modified = validated
+            if request.if_none_match.contains(etag) or (
+                    not request.if_none_match and last_modified and request.if_modified_since
+                    and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            # always revalidate; the answer depends on who is signed in
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
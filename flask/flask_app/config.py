@@ -1,7 +1,111 @@
 import os
 
+# 'production' runs SQLite in WAL mode with tuned pragmas, a larger
+# connection pool and a query-only replica engine for the read-only views,
+# see flask_app.database; 'default' is SQLite as shipped
+SQLITE_PROFILES = {
+    'default': {
+        'pragmas': {},
+        'engine_options': {},
+        'replica': False,
+    },
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -64000,  # KiB
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+        'engine_options': {'pool_size': 10, 'max_overflow': 20},
+        'replica': True,
+    },
+}
+
+# algorithm and cost of new password hashes, see flask_app.passwords; 'cost'
+# is bcrypt rounds, the scrypt N, PBKDF2 iterations or the argon2 time cost.
+# argon2 needs argon2-cffi installed.
+PASSWORD_HASH_PROFILES = {
+    'default': {'algorithm': 'bcrypt', 'cost': 12},
+    # cheaper logins for development and load tests, not for production
+    'fast': {'algorithm': 'bcrypt', 'cost': 8},
+    'scrypt': {'algorithm': 'scrypt', 'cost': 2 ** 15},
+    'pbkdf2': {'algorithm': 'pbkdf2', 'cost': 600000},
+    'argon2': {'algorithm': 'argon2', 'cost': 2},
+}
+
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'default')
+    PASSWORD_HASH_PROFILE = os.environ.get('PASSWORD_HASH_PROFILE', 'default')
+    # threads hashing passwords at once per process, None for one per core
+    PASSWORD_HASH_WORKERS = None
+    POSTS_PER_PAGE = 5
+    # 'cursor' pages feeds on (date_posted, id), 'offset' keeps numbered pages
+    POSTS_PAGINATION = os.environ.get('POSTS_PAGINATION', 'cursor')
+    POSTS_COUNT_CACHE_TIMEOUT = 60
+    FEED_CACHE_TIMEOUT = 300
+    # a post's rendered body, cached by id and updated_at, see flask_app.text
+    POST_BODY_CACHE_TIMEOUT = 3600
+    # rows fetched at a time and characters sent at a time by streamed pages
+    # such as the archive, see flask_app.streaming
+    STREAM_CHUNK_SIZE = 100
+    STREAM_BUFFER_SIZE = 16384
+    # how long another worker may serve a stale signed-in user, 0 disables the cache
+    USER_CACHE_TIMEOUT = 300
+    # posts per page of /api/posts unless ?limit= asks otherwise, the most one
+    # page or ?ids= may ask for and the most one POST may create, see
+    # flask_app.api.routes
+    API_PAGE_SIZE = 20
+    API_MAX_PAGE_SIZE = 100
+    API_MAX_CREATE = 1000
+    API_GZIP_LEVEL = 6
+    # entries kept per personal timeline, authors whose posts reach followers
+    # through reads rather than writes once they have more followers than
+    # this, and followers written per INSERT when a post is fanned out; see
+    # flask_app.timeline
+    TIMELINE_LENGTH = 500
+    TIMELINE_FANOUT_LIMIT = 5000
+    TIMELINE_BATCH_SIZE = 1000
+    # post views are buffered in each process and written once this many have
+    # been counted or this many seconds after the first; the most viewed
+    # ranking lists MOST_VIEWED_COUNT posts and is cached for
+    # MOST_VIEWED_TIMEOUT when no views are written; see flask_app.counters
+    VIEW_FLUSH_HITS = 1000
+    VIEW_FLUSH_SECONDS = 10
+    MOST_VIEWED_COUNT = 10
+    MOST_VIEWED_TIMEOUT = 300
+    # trending scores are post views halved every TRENDING_HALF_LIFE_HOURS,
+    # ranked by `flask rank-trending` and, when set, every
+    # TRENDING_SCHEDULE_SECONDS by the web process (one process is enough);
+    # /trending lists TRENDING_COUNT posts, the home page's sidebar a few,
+    # cached for TRENDING_CACHE_TIMEOUT when no run replaces them; see
+    # flask_app.trending
+    TRENDING_HALF_LIFE_HOURS = 24
+    TRENDING_SCHEDULE_SECONDS = int(os.environ.get('TRENDING_SCHEDULE_SECONDS', 0))
+    TRENDING_BATCH_SIZE = 1000
+    TRENDING_COUNT = 20
+    TRENDING_SIDEBAR_COUNT = 5
+    TRENDING_CACHE_TIMEOUT = 600
+    # requests slower than this are logged with their query and template
+    # times, see flask_app.metrics
+    METRICS_SLOW_REQUEST_SECONDS = 1.0
+    # fingerprinted, minified and precompressed static files written by
+    # `flask build-assets` and served in their place, see flask_app.assets
+    STATIC_BUILD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static_build')
+    # sitemaps list SITEMAP_SHARD_SIZE URLs per file and feeds the newest
+    # SYNDICATION_ITEMS posts; both are written to SYNDICATION_FOLDER and
+    # cached by clients for SYNDICATION_MAX_AGE, see flask_app.syndication
+    SYNDICATION_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'syndication_cache')
+    SITEMAP_SHARD_SIZE = 50000
+    SYNDICATION_ITEMS = 50
+    SYNDICATION_MAX_AGE = 300
+    # search ranks only the newest this many matches, see flask_app.search
+    SEARCH_CANDIDATES = 1000
+    # threads running off-request work such as image resizing, 0 runs it inline
+    BACKGROUND_TASK_WORKERS = 2
+    PROFILE_IMAGE_QUALITY = 85
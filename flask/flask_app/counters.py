@@ -0,0 +1,131 @@
+"""Buffered post view counts and the most viewed ranking.
+
+Counting each view with ``UPDATE post SET views = views + 1`` would queue
+every reader of a post page behind SQLite's single writer.
+``view_counts.hit()`` only adds to a buffer in the worker process; the
+buffer is written in one transaction, one UPDATE per distinct count, in a
+background task once VIEW_FLUSH_HITS views are buffered or
+VIEW_FLUSH_SECONDS after the first, and in the process itself when it
+exits.
+
+Each write ranks the most viewed posts again and caches the ranking, so
+``most_viewed()`` is a cache read and a primary key lookup. Views buffered
+by a process that is killed are lost; the counts are a popularity signal,
+not a ledger.
+"""
+import atexit
+import threading
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import func, select, update
+from flask_app import db
+from flask_app.cache import cache
+from flask_app.tasks import tasks
+from models.post import Post
+
+
+RANKING_KEY = 'posts:most-viewed'
+
+
+def write(counts):
+    """Add ``{post_id: views}`` to the posts' counts and rank them again"""
+    by_count = defaultdict(list)
+    for post_id, views in counts.items():
+        by_count[views].append(post_id)
+    for views, post_ids in by_count.items():
+        # a view doesn't change the post: keep updated_at from its onupdate
+        db.session.execute(update(Post).where(Post.id.in_(post_ids))
+                           .values(views=func.coalesce(Post.views, 0) + views,
+                                   updated_at=Post.updated_at)
+                           .execution_options(synchronize_session=False))
+    db.session.commit()
+    rank()
+
+
+def rank():
+    """Cache and return the ids of the most viewed posts"""
+    ranking = db.session.scalars(
+        select(Post.id).where(Post.views > 0).order_by(Post.views.desc(), Post.id.desc())
+        .limit(current_app.config['MOST_VIEWED_COUNT'])).all()
+    cache.set(RANKING_KEY, ranking, current_app.config['MOST_VIEWED_TIMEOUT'])
+    return ranking
+
+
+def most_viewed():
+    """The most viewed posts, as the feeds show them"""
+    ranking = cache.get(RANKING_KEY)
+    if ranking is None:
+        ranking = rank()
+    if not ranking:
+        return []
+    posts = {post.id: post for post in Post.listing().filter(Post.id.in_(ranking))}
+    # a ranked post may have been deleted since
+    return [posts[post_id] for post_id in ranking if post_id in posts]
+
+
+class ViewCounter:
+    """Thread-safe per-process buffer of post views"""
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._hits = 0
+        self._timer = None
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_hits = app.config['VIEW_FLUSH_HITS']
+        self.flush_seconds = app.config['VIEW_FLUSH_SECONDS']
+
+    def hit(self, post_id):
+        with self._lock:
+            self._counts[post_id] += 1
+            self._hits += 1
+            if self._hits >= self.flush_hits:
+                counts = self._take()
+            else:
+                counts = None
+                if self._timer is None and self.flush_seconds:
+                    self._timer = threading.Timer(self.flush_seconds, self._flush_in_background)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if counts:
+            tasks.submit(self._write, counts)
+
+    def flush(self):
+        """Write the buffered views now, in this thread"""
+        with self._lock:
+            counts = self._take()
+        if counts:
+            self._write(counts)
+
+    def clear(self):
+        """Drop the buffered views"""
+        with self._lock:
+            self._take()
+
+    def _write(self, counts):
+        # background tasks have no app context of their own
+        with self.app.app_context():
+            write(counts)
+
+    def _flush_in_background(self):
+        with self._lock:
+            counts = self._take()
+        if counts:
+            tasks.submit(self._write, counts)
+
+    def _take(self):
+        # called with the lock held
+        counts, self._counts, self._hits = self._counts, Counter(), 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return counts
+
+
+view_counts = ViewCounter()
+# exit handlers run newest first: this flush, then tasks.join waiting for
+# the writes already queued
+atexit.register(view_counts.flush)
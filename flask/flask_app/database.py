@@ -0,0 +1,66 @@
+"""SQLite tuning and the read/write split.
+
+``DATABASE_PROFILE`` picks an entry of ``SQLITE_PROFILES``: its pragmas run
+on every new connection, its engine options size the connection pool, and
+with ``replica`` on, views marked ``read_replica`` read through a second,
+``query_only`` engine on the same file. In WAL mode those reads run
+alongside the single writer instead of queueing behind it.
+"""
+import functools
+import re
+from flask import current_app, g
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.sql.dml import UpdateBase
+from flask_app.config import SQLITE_PROFILES
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) \
+                and g.get('use_replica'):
+            replica = current_app.extensions.get('read_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+def read_replica(view):
+    """Route the queries ``view`` makes to the read replica, if there is one"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def apply_pragmas(engine, pragmas):
+    for name, value in pragmas.items():
+        # PRAGMA takes no bound parameters, so only plain words and numbers
+        if not (PRAGMA_VALUE.match(name) and PRAGMA_VALUE.match(str(value))):
+            raise ValueError(f'Invalid SQLite pragma {name} = {value!r}')
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}').fetchall()
+        cursor.close()
+
+
+def init_app(app, db):
+    profile = SQLITE_PROFILES[app.config['DATABASE_PROFILE']]
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', profile['engine_options'])
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+    apply_pragmas(engine, profile['pragmas'])
+    if profile['replica'] and engine.url.database not in (None, '', ':memory:'):
+        replica = create_engine(engine.url, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        apply_pragmas(replica, {**profile['pragmas'], 'query_only': 'ON'})
+        app.extensions['read_replica'] = replica
@@ -1,17 +1,89 @@
 from flask import Blueprint
-from flask import request, render_template
+from flask import abort, current_app, jsonify, request, render_template
+from markupsafe import Markup
 from models.post import Post
+from flask_app import conditional, counters, timeline as timelines, trending
+from flask_app.cache import feed_cache, user_cache
+from flask_app.database import read_replica
+from flask_app.pagination import InvalidCursor, paginate_posts
+from flask_login import current_user, login_required
+from flask_app.search import search_posts
+from flask_app.streaming import stream_page
 
 main = Blueprint('main', __name__)
 
 @main.route("/")
 @main.route("/home")
 @main.route("/index")
+@read_replica
+@conditional.conditional(conditional.feed)
 def home():
-    page = request.args.get('page', 1, type=int)
-    posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=5)
-    return render_template("home.html", title="Home", posts=posts)
+    # the feed fragment is the same for every visitor, see flask_app.cache
+    key = request.query_string.decode()
+    feed = feed_cache.get(key)
+    if feed is None:
+        posts = paginate_posts(Post.listing(), count_key='posts:count')
+        feed = render_template("feed.html", posts=posts)
+        feed_cache.set(key, feed, current_app.config['FEED_CACHE_TIMEOUT'])
+    # ranked ahead of time, see flask_app.trending
+    return render_template("home.html", title="Home", feed=Markup(feed), trending=trending.sidebar())
+
+@main.route("/archive")
+@read_replica
+@conditional.conditional(conditional.feed)
+def archive():
+    # every post, fetched as the template reaches them
+    posts = Post.listing()\
+        .order_by(Post.date_posted.desc(), Post.id.desc())\
+        .yield_per(current_app.config['STREAM_CHUNK_SIZE'])
+    return stream_page('archive.html', title='Archive', posts=posts)
+
+@main.route("/most-viewed")
+@read_replica
+def most_viewed():
+    # ranked whenever buffered views are written, see flask_app.counters
+    return render_template("most_viewed.html", title="Most Viewed", posts=counters.most_viewed())
+
+@main.route("/trending")
+@read_replica
+def trending_posts():
+    # scored by `flask rank-trending`, see flask_app.trending
+    return render_template("trending.html", title="Trending", posts=trending.top())
+
+@main.route("/timeline")
+@login_required
+@read_replica
+def timeline():
+    # newest posts of the authors the user follows, see flask_app.timeline
+    try:
+        posts = timelines.page(current_user.id, current_app.config['POSTS_PER_PAGE'],
+                               request.args.get('cursor'))
+    except InvalidCursor:
+        abort(404)
+    return render_template("timeline.html", title="Timeline", posts=posts)
 
 @main.route("/about")
 def about():
-    return render_template("about.html", title="About")
\ No newline at end of file
+    return render_template("about.html", title="About")
+
+@main.route("/search")
+@read_replica
+def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        abort(404)
+    posts, has_next = search_posts(query, page)
+    return render_template("search.html", title="Search", query=query, posts=posts,
+                           page=page, has_next=has_next)
+
+@main.route("/stats/feed-cache")
+def feed_cache_stats():
+    return jsonify(feed_cache.stats())
+
+@main.route("/stats/user-cache")
+def user_cache_stats():
+    # each hit is a user query saved by models.user.load_user
+    stats = user_cache.stats()
+    stats['queries_saved'] = stats['hits']
+    return jsonify(stats)
@@ -0,0 +1,199 @@
+"""Request timing: latency, queries, template rendering and response size.
+
+``metrics.init_app`` times each request and, through SQLAlchemy cursor
+events and Flask's template signals, the queries it runs and the templates
+it renders. The totals go out on the response as a ``Server-Timing``
+header, into per-endpoint histograms served in Prometheus text format by
+``/metrics``, and to the log when a request takes longer than
+``METRICS_SLOW_REQUEST_SECONDS``.
+
+The histograms live in the worker process; each worker reports its own.
+Rows a streamed page renders after its response starts are not counted.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from flask import before_render_template, current_app, g, has_request_context, request, \
+    template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES = (1024, 4096, 16384, 65536, 262144, 1048576)
+QUERIES = (1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Time to the response, by endpoint', SECONDS),
+    'http_requests_total': ('counter', 'Requests answered, by endpoint and status', None),
+    'http_response_size_bytes': ('histogram', 'Size of non-streamed response bodies', BYTES),
+    'db_queries_per_request': ('histogram', 'Queries run by a request', QUERIES),
+    'db_query_duration_seconds': ('histogram', 'Time spent in queries by a request', SECONDS),
+    'template_render_duration_seconds': ('histogram', 'Time spent rendering templates by a request',
+                                         SECONDS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Counters and histograms keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = Histogram(METRICS[name][2])
+            self._values[key].observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """The metrics in Prometheus text exposition format"""
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: item[0])
+            lines = []
+            for name, (kind, help_text, buckets) in METRICS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for (metric, labels), value in values:
+                    if metric != name:
+                        continue
+                    if kind == 'counter':
+                        lines.append(f'{name}{_labels(labels)} {value}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ('+Inf',), value.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {value.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+registry = Registry()
+
+
+class RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_starts = []
+
+
+def _stats():
+    return g.get('request_stats') if has_request_context() else None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info['query_start'].pop()
+    stats = _stats()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    if exception_context.connection is not None:
+        starts = exception_context.connection.info.get('query_start')
+        if starts:
+            starts.pop()
+
+
+def before_render(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None:
+        stats.template_starts.append(time.perf_counter())
+
+
+def rendered(sender, template, context, **extra):
+    stats = _stats()
+    if stats is not None and stats.template_starts:
+        stats.template_time += time.perf_counter() - stats.template_starts.pop()
+
+
+def start_request():
+    g.request_stats = RequestStats()
+
+
+def finish_request(response):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+    duration = time.perf_counter() - stats.start
+    endpoint = request.endpoint or '<unmatched>'
+    labels = {'endpoint': endpoint, 'method': request.method}
+    registry.inc('http_requests_total', {**labels, 'status': response.status_code})
+    registry.observe('http_request_duration_seconds', labels, duration)
+    registry.observe('db_queries_per_request', labels, stats.queries)
+    registry.observe('db_query_duration_seconds', labels, stats.db_time)
+    registry.observe('template_render_duration_seconds', labels, stats.template_time)
+    if not response.is_streamed:
+        registry.observe('http_response_size_bytes', labels, response.calculate_content_length() or 0)
+
+    response.headers['Server-Timing'] = ', '.join((
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+        f'tpl;dur={stats.template_time * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ))
+    if duration >= current_app.config['METRICS_SLOW_REQUEST_SECONDS']:
+        logger.warning('Slow request: %s %s (%s) took %.0f ms, %d queries in %.0f ms, '
+                       'templates %.0f ms', request.method, request.full_path.rstrip('?'), endpoint,
+                       duration * 1000, stats.queries, stats.db_time * 1000,
+                       stats.template_time * 1000)
+    return response
+
+
+def metrics():
+    return current_app.response_class(registry.render(),
+                                      content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    before_render_template.connect(before_render, app)
+    template_rendered.connect(rendered, app)
+    app.add_url_rule('/metrics', 'metrics', metrics)
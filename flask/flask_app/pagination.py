@@ -0,0 +1,143 @@
+"""Keyset (cursor) pagination for the post feeds.
+
+Pages are addressed by the ``(date_posted, id)`` of the row at their edge
+instead of an OFFSET, so deep pages cost the same index seek as page 1.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+from flask_app.cache import cache
+from models.post import Post
+
+
+NEXT = 'n'
+PREVIOUS = 'p'
+LAST = 'last'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(post, direction):
+    payload = json.dumps([direction, post.date_posted.isoformat(), post.id],
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        payload = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, date_posted, post_id = json.loads(payload)
+        date_posted = datetime.fromisoformat(date_posted)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if direction not in (NEXT, PREVIOUS) or not isinstance(post_id, int):
+        raise InvalidCursor('Invalid cursor')
+    return direction, date_posted, post_id
+
+
+class CursorPagination:
+    """Drop-in for ``Query.paginate`` results in the feed templates.
+
+    ``total`` is only counted when a template asks for it and, given a
+    ``count_key``, is cached for ``POSTS_COUNT_CACHE_TIMEOUT`` seconds. A
+    ``total`` known up front, e.g. from AuthorStats, is used as is.
+    """
+    is_cursor = True
+    # the (date, id) columns pages are ordered and sought on; a subclass
+    # paging another model names its own. A tuple, since mapped columns read
+    # through an instance would look for the instance's own mapping
+    columns = (Post.date_posted, Post.id)
+
+    def __init__(self, query, per_page, cursor=None, count_key=None, count_timeout=60, total=None):
+        self.query = query
+        self._total = total
+        self.per_page = per_page
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+        self.has_next = False
+        self.has_prev = False
+        self.items = self._fetch(cursor)
+
+    def _fetch(self, cursor):
+        date_posted, id = self.columns
+        newest_first = (date_posted.desc(), id.desc())
+        oldest_first = (date_posted.asc(), id.asc())
+        limit = self.per_page + 1
+
+        if not cursor:
+            rows = self.query.order_by(*newest_first).limit(limit).all()
+            self.has_next = len(rows) > self.per_page
+            return rows[:self.per_page]
+
+        if cursor == LAST:
+            rows = self.query.order_by(*oldest_first).limit(limit).all()
+            self.has_prev = len(rows) > self.per_page
+            return rows[:self.per_page][::-1]
+
+        direction, edge_date, edge_id = decode_cursor(cursor)
+        if direction == NEXT:
+            # date_posted <= d narrows the index range; the OR breaks ties on id
+            rows = self.query.filter(and_(
+                date_posted <= edge_date,
+                or_(date_posted < edge_date, id < edge_id),
+            )).order_by(*newest_first).limit(limit).all()
+            self.has_prev = True
+            self.has_next = len(rows) > self.per_page
+            return rows[:self.per_page]
+
+        rows = self.query.filter(and_(
+            date_posted >= edge_date,
+            or_(date_posted > edge_date, id > edge_id),
+        )).order_by(*oldest_first).limit(limit).all()
+        self.has_next = True
+        self.has_prev = len(rows) > self.per_page
+        return rows[:self.per_page][::-1]
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @property
+    def total(self):
+        if self._total is not None:
+            return self._total
+        if self.count_key is None:
+            return self.query.order_by(None).count()
+        return cache.get_or_set(self.count_key, self.query.order_by(None).count,
+                                self.count_timeout)
+
+    @property
+    def next_cursor(self):
+        if self.has_next:
+            return encode_cursor(self.items[-1], NEXT)
+
+    @property
+    def prev_cursor(self):
+        if self.has_prev:
+            return encode_cursor(self.items[0], PREVIOUS)
+
+
+def paginate_posts(query, count_key=None, total=None):
+    """Paginate ``query`` from the request args in the configured mode;
+    ``total`` skips counting the rows"""
+    per_page = current_app.config['POSTS_PER_PAGE']
+    if current_app.config['POSTS_PAGINATION'] != 'cursor':
+        page = request.args.get('page', 1, type=int)
+        pagination = query.order_by(Post.date_posted.desc(), Post.id.desc())\
+            .paginate(page=page, per_page=per_page, count=total is None)
+        if total is not None:
+            pagination.total = total
+        return pagination
+    try:
+        return CursorPagination(query, per_page, request.args.get('cursor'),
+                                count_key=count_key, total=total,
+                                count_timeout=current_app.config['POSTS_COUNT_CACHE_TIMEOUT'])
+    except InvalidCursor:
+        abort(404)
@@ -0,0 +1,92 @@
+"""Password hashing with a cost set per environment.
+
+``PASSWORD_HASH_PROFILE`` picks the algorithm and cost new hashes use from
+``config.PASSWORD_HASH_PROFILES``. Hashes made with another algorithm or
+cost still verify, and ``verify`` reports them as needing a rehash so the
+login view can upgrade them while it has the plain password.
+
+Hashing and verification run on a shared pool of ``PASSWORD_HASH_WORKERS``
+threads, which bounds concurrent hashing: a burst of logins keeps at most
+that many cores busy, leaving CPU for the requests serving pages. The
+request thread of each login still waits for its hash.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.algorithm = 'bcrypt'
+        self.cost = 12
+        self._pool = None
+
+    def init_app(self, app):
+        from flask_app.config import PASSWORD_HASH_PROFILES
+
+        profile = PASSWORD_HASH_PROFILES[app.config['PASSWORD_HASH_PROFILE']]
+        self.algorithm = profile['algorithm']
+        self.cost = profile['cost']
+        if self.algorithm == 'argon2' and argon2 is None:
+            raise RuntimeError('The argon2 password hash profile needs argon2-cffi installed')
+        workers = app.config['PASSWORD_HASH_WORKERS'] or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def hash(self, password):
+        return self._run(self._hash, password)
+
+    def verify(self, password, hashed):
+        """Return whether ``password`` matches ``hashed`` and, if it does,
+        whether ``hashed`` should be replaced by ``hash(password)``"""
+        return self._run(self._verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        if hashed.startswith('$2'):
+            return self.algorithm != 'bcrypt' or int(hashed.split('$')[2]) != self.cost
+        if hashed.startswith('$argon2'):
+            return self.algorithm != 'argon2' or self._argon2().check_needs_rehash(hashed)
+        return hashed.split('$', 1)[0] != self._werkzeug_method()
+
+    def _run(self, func, *args):
+        if self._pool is None:
+            return func(*args)
+        return self._pool.submit(func, *args).result()
+
+    def _hash(self, password):
+        if self.algorithm == 'bcrypt':
+            return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.cost)).decode()
+        if self.algorithm == 'argon2':
+            return self._argon2().hash(password)
+        return generate_password_hash(password, self._werkzeug_method())
+
+    def _verify(self, password, hashed):
+        if hashed.startswith('$2'):
+            valid = bcrypt.checkpw(password.encode(), hashed.encode())
+        elif hashed.startswith('$argon2'):
+            if argon2 is None:
+                raise RuntimeError('Verifying argon2 password hashes needs argon2-cffi installed')
+            try:
+                valid = self._argon2().verify(hashed, password)
+            except argon2.exceptions.VerificationError:
+                valid = False
+        else:
+            valid = check_password_hash(hashed, password)
+        return valid, valid and self.needs_rehash(hashed)
+
+    def _argon2(self):
+        return argon2.PasswordHasher(time_cost=self.cost)
+
+    def _werkzeug_method(self):
+        if self.algorithm == 'scrypt':
+            return f'scrypt:{self.cost}:8:1'
+        return f'pbkdf2:sha256:{self.cost}'
+
+
+passwords = PasswordHasher()
@@ -0,0 +1,263 @@
+"""Streaming bulk import and export of posts.
+
+Files are JSON arrays (like the Django app's ``posts.json``) or JSON Lines,
+read and written one record at a time so memory use stays flat.
+"""
+import json
+import time
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from flask_app import db, text
+from flask_app.cache import feed_cache
+from models.author_stats import AuthorStats
+from models.post import Post
+from models.user import User
+
+CHUNK_SIZE = 64 * 1024
+TITLE_LENGTH = Post.__table__.c.title.type.length
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def iter_records(fp, chunk_size=CHUNK_SIZE):
+    """Yield the values of a JSON array or a JSON Lines stream one at a time"""
+    decoder = json.JSONDecoder()
+    buffer, eof = '', False
+    while not buffer and not eof:
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer = chunk.lstrip()
+    array = buffer.startswith('[')
+    if array:
+        buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if array and buffer[:1] == ',':
+            buffer = buffer[1:].lstrip()
+        if array and buffer[:1] == ']':
+            return
+        if buffer:
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a number ending exactly at the chunk edge may continue
+                if end < len(buffer) or eof or not isinstance(value, (int, float)):
+                    yield value
+                    buffer = buffer[end:]
+                    continue
+        elif eof:
+            if array:
+                raise json.JSONDecodeError('Unterminated array', '', 0)
+            return
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def clean(record, user_ids, now):
+    """Return the insert parameters for ``record`` or raise InvalidRecord"""
+    if not isinstance(record, dict):
+        raise InvalidRecord('not an object')
+    title, content, user_id = record.get('title'), record.get('content'), record.get('user_id')
+    if not isinstance(title, str) or not title.strip():
+        raise InvalidRecord('missing title')
+    if len(title) > TITLE_LENGTH:
+        raise InvalidRecord(f'title longer than {TITLE_LENGTH} characters')
+    if not isinstance(content, str):
+        raise InvalidRecord('missing content')
+    if user_id not in user_ids or isinstance(user_id, bool):
+        raise InvalidRecord(f'unknown user_id {user_id!r}')
+    date_posted = now
+    if record.get('date_posted') is not None:
+        try:
+            date_posted = datetime.fromisoformat(str(record['date_posted']))
+        except ValueError:
+            raise InvalidRecord(f"bad date_posted {record['date_posted']!r}")
+        if date_posted.tzinfo is not None:
+            # the column holds naive local times, like datetime.now()
+            date_posted = date_posted.astimezone().replace(tzinfo=None)
+    # a Core insert skips the Post.content validator, which fills these in
+    excerpt, word_count, reading_time = text.summarize(content)
+    return {'title': title, 'content': content, 'user_id': user_id, 'date_posted': date_posted,
+            'excerpt': excerpt, 'word_count': word_count, 'reading_time': reading_time}
+
+
+def insert_posts(rows, returning=False):
+    """Insert the ``clean``ed ``rows`` with one executemany and count them in
+    AuthorStats; commits with the session. With ``returning``, return the
+    new Posts in ``rows`` order."""
+    totals = {}
+    for row in rows:
+        count, length, latest = totals.get(row['user_id'], (0, 0, row['date_posted']))
+        totals[row['user_id']] = (count + 1, length + len(row['content']),
+                                  max(latest, row['date_posted']))
+    posts = None
+    if returning:
+        posts = db.session.scalars(
+            db.insert(Post).returning(Post, sort_by_parameter_order=True), rows).all()
+    else:
+        db.session.execute(Post.__table__.insert(), rows)
+    for user_id, (count, length, latest) in totals.items():
+        AuthorStats.posts_added(user_id, count, length, latest)
+    return posts
+
+
+def import_posts(records, batch_size=1000, on_error=None):
+    """Insert ``records`` with one executemany per batch, each committed on
+    its own, and return ``(imported, skipped, seconds)``"""
+    user_ids = {id for (id,) in db.session.query(User.id)}
+    now = datetime.now()
+    imported = skipped = 0
+    start = time.perf_counter()
+    batch = []
+
+    def flush():
+        insert_posts(batch)
+        db.session.commit()
+        return len(batch)
+
+    for index, record in enumerate(records):
+        try:
+            batch.append(clean(record, user_ids, now))
+        except InvalidRecord as error:
+            skipped += 1
+            if on_error:
+                on_error(index, error)
+            continue
+        if len(batch) >= batch_size:
+            imported += flush()
+            batch = []
+    if batch:
+        imported += flush()
+    if imported:
+        feed_cache.invalidate()
+    return imported, skipped, time.perf_counter() - start
+
+
+def export_posts(fp, fmt='jsonl', batch_size=1000):
+    """Write every post to ``fp`` oldest first and return ``(exported, seconds)``"""
+    columns = Post.__table__.c
+    rows = db.session.execute(
+        db.select(columns.id, columns.title, columns.content, columns.user_id, columns.date_posted)
+        .order_by(columns.id).execution_options(yield_per=batch_size))
+    start = time.perf_counter()
+    exported = 0
+    if fmt == 'json':
+        fp.write('[')
+    for id, title, content, user_id, date_posted in rows:
+        line = json.dumps({'id': id, 'title': title, 'content': content, 'user_id': user_id,
+                           'date_posted': date_posted.isoformat()})
+        if fmt == 'json':
+            fp.write(',\n' if exported else '\n')
+            fp.write(line)
+        else:
+            fp.write(line + '\n')
+        exported += 1
+    if fmt == 'json':
+        fp.write('\n]\n')
+    return exported, time.perf_counter() - start
+
+
+def rate(rows, seconds):
+    return rows / seconds if seconds else 0.0
+
+
+@click.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--batch-size', default=1000, type=click.IntRange(min=1),
+              help='Rows per INSERT and per transaction')
+@with_appcontext
+def import_posts_command(source, batch_size):
+    """Load posts from a JSON array or JSON Lines file ('-' for stdin)."""
+    def report(index, error):
+        click.echo(f'Skipped record {index}: {error}', err=True)
+
+    try:
+        imported, skipped, seconds = import_posts(iter_records(source), batch_size, report)
+    except json.JSONDecodeError as error:
+        raise click.ClickException(f'Invalid JSON: {error}')
+    click.echo(f'Imported {imported} posts, skipped {skipped} in {seconds:.2f}s '
+               f'({rate(imported, seconds):.0f} rows/sec)')
+
+
+@click.command('export')
+@click.argument('target', default='-', type=click.File('w', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'json']), default='jsonl')
+@click.option('--batch-size', default=1000, type=click.IntRange(min=1),
+              help='Rows fetched from the database at a time')
+@with_appcontext
+def export_posts_command(target, fmt, batch_size):
+    """Write every post as JSON Lines or a JSON array ('-' for stdout)."""
+    exported, seconds = export_posts(target, fmt, batch_size)
+    # stdout may be the export itself
+    click.echo(f'Exported {exported} posts in {seconds:.2f}s '
+               f'({rate(exported, seconds):.0f} rows/sec)', err=True)
+
+
+@click.command('reconcile-stats')
+@click.option('--dry-run', is_flag=True, help='Only report authors whose stats are out of date')
+@with_appcontext
+def reconcile_stats_command(dry_run):
+    """Recompute every author's post stats from the posts table."""
+    start = time.perf_counter()
+    stored = {row[0]: tuple(row[1:]) for row in db.session.execute(
+        db.select(AuthorStats.user_id, AuthorStats.post_count,
+                  AuthorStats.last_posted_at, AuthorStats.content_length))}
+    computed = {row[0]: tuple(row[1:]) for row in db.session.execute(AuthorStats.computed())}
+    stale = sorted(user_id for user_id in stored.keys() | computed.keys()
+                   if stored.get(user_id) != computed.get(user_id))
+    for user_id in stale:
+        click.echo(f'Author {user_id}: stored {stored.get(user_id)}, expected {computed.get(user_id)}')
+    if stale and not dry_run:
+        AuthorStats.rebuild()
+        db.session.commit()
+    click.echo(f'Checked {len(computed)} authors, {len(stale)} out of date'
+               f'{"" if dry_run or not stale else ", rebuilt"} in {time.perf_counter() - start:.2f}s')
+
+
+def backfill_summaries(connection, batch_size=1000, everything=False):
+    """Store the excerpt, word count and reading time of posts missing them
+    (of every post with ``everything``) and return how many were updated"""
+    columns = Post.__table__.c
+    query = db.select(columns.id, columns.content).order_by(columns.id).limit(batch_size)
+    if not everything:
+        query = query.where(columns.word_count.is_(None))
+    updated, last_id = 0, 0
+    while True:
+        # seek on id rather than OFFSET, updated rows leave the filter
+        rows = connection.execute(query.where(columns.id > last_id)).all()
+        if not rows:
+            return updated
+        values = []
+        for id, content in rows:
+            excerpt, word_count, reading_time = text.summarize(content)
+            values.append({'row_id': id, 'excerpt': excerpt, 'word_count': word_count,
+                           'reading_time': reading_time})
+        connection.execute(
+            Post.__table__.update().where(columns.id == db.bindparam('row_id'))
+            .values(excerpt=db.bindparam('excerpt'), word_count=db.bindparam('word_count'),
+                    reading_time=db.bindparam('reading_time')),
+            values)
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+@click.command('backfill-summaries')
+@click.option('--batch-size', default=1000, type=click.IntRange(min=1),
+              help='Posts read and updated per query')
+@click.option('--all', 'everything', is_flag=True,
+              help='Recompute every post, not only those never summarized')
+@with_appcontext
+def backfill_summaries_command(batch_size, everything):
+    """Fill in the stored excerpt, word count and reading time of posts."""
+    start = time.perf_counter()
+    with db.engine.begin() as connection:
+        updated = backfill_summaries(connection, batch_size, everything)
+    feed_cache.invalidate()
+    click.echo(f'Summarized {updated} posts in {time.perf_counter() - start:.2f}s')
@@ -1,10 +1,21 @@
 from flask import Blueprint, render_template, flash, redirect, url_for, abort, request
 from flask_login import login_required, current_user
-from flask_app import db
+from sqlalchemy.orm import joinedload
+from flask_app import conditional, db, timeline, trending
+from flask_app.counters import view_counts
+from flask_app.cache import feed_cache
+from flask_app.database import read_replica
 from models.post import Post
 from flask_app.posts.forms import PostForm
+from flask_app.posts.commands import import_posts_command, export_posts_command, reconcile_stats_command, \
+    backfill_summaries_command
+from models.author_stats import AuthorStats
 
 posts = Blueprint('posts', __name__)
+posts.cli.add_command(import_posts_command)
+posts.cli.add_command(export_posts_command)
+posts.cli.add_command(reconcile_stats_command)
+posts.cli.add_command(backfill_summaries_command)
 
 
 @posts.route("/post/new", methods=['GET', 'POST'])
@@ -14,15 +25,23 @@ def new_post():
     if form.validate_on_submit():
         post = Post(title=form.title.data, content=form.content.data, author=current_user)
         db.session.add(post)
+        db.session.flush()  # fills in date_posted
+        AuthorStats.posts_added(post.user_id, 1, len(post.content), post.date_posted)
         db.session.commit()
+        feed_cache.invalidate()
+        timeline.in_background(timeline.fan_out, post.id)
         flash('Your Post has been created!', 'success')
         return redirect(url_for('main.home'))
     return render_template('create_post.html', title='New Post',
                            form=form, legend='New Post')
 
 @posts.route('/post/<int:post_id>')
+@read_replica
+@conditional.conditional(conditional.post)
 def post(post_id):
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(joinedload(Post.author)).get_or_404(post_id)
+    # buffered, see flask_app.counters; a 304 isn't counted
+    view_counts.hit(post.id)
     return render_template('post.html', title=post.title, post=post)
 
 @posts.route('/post/<int:post_id>/update', methods=['GET', 'POST'])
@@ -33,9 +52,11 @@ def update_post(post_id):
         abort(403)
     form = PostForm()
     if form.validate_on_submit():
+        AuthorStats.post_changed(post.user_id, len(form.content.data) - len(post.content))
         post.title = form.title.data
         post.content = form.content.data
         db.session.commit()
+        feed_cache.invalidate()
         flash('Your Post has been updated!', 'success')
         return redirect(url_for('posts.post', post_id=post.id))
     elif request.method == 'GET':
@@ -51,6 +72,11 @@ def delete_post(post_id):
     if post.author != current_user:
         abort(403)
     db.session.delete(post)
+    db.session.flush()
+    AuthorStats.post_removed(post.user_id, len(post.content), post.date_posted)
+    timeline.remove(post.id)
+    trending.remove(post.id)
     db.session.commit()
+    feed_cache.invalidate()
     flash('Your Post has been deleted!', 'success')
     return redirect(url_for('main.home'))
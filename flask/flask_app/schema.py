@@ -0,0 +1,76 @@
+"""Schema upkeep for databases created before a model change.
+
+``db.create_all()`` only creates missing tables; columns and indexes added
+to an existing table are created here instead, as is the full-text index.
+New columns on existing tables must be nullable; BACKFILLS fills them in,
+and TABLE_BACKFILLS fills tables derived from existing rows.
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from flask_app import db, search
+from flask_app.posts.commands import backfill_summaries
+
+
+# SQL, or a function of the connection, run once after the column and the
+# rest of its table's new columns are added
+BACKFILLS = {
+    ('post', 'updated_at'): 'UPDATE post SET updated_at = date_posted',
+    # fills word_count and reading_time too
+    ('post', 'excerpt'): backfill_summaries,
+    ('post', 'views'): 'UPDATE post SET views = 0',
+    ('user', 'follower_count'): 'UPDATE user SET follower_count = '
+                                '(SELECT count(*) FROM follow WHERE follow.author_id = user.id)',
+}
+
+# SQL run once, right after the table is created
+TABLE_BACKFILLS = {
+    'author_stats': 'INSERT INTO author_stats (user_id, post_count, last_posted_at, content_length) '
+                    'SELECT user_id, count(*), max(date_posted), coalesce(sum(length(content)), 0) '
+                    'FROM post WHERE user_id IS NOT NULL GROUP BY user_id',
+}
+
+
+def upgrade_schema():
+    missing = set(db.metadata.tables) - set(inspect(db.engine).get_table_names())
+    db.create_all()
+    with db.engine.begin() as connection:
+        for table in sorted(missing & TABLE_BACKFILLS.keys()):
+            connection.execute(text(TABLE_BACKFILLS[table]))
+    inspector = inspect(db.engine)
+    created = sorted(missing)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        added = [column for column in table.columns if column.name not in existing]
+        if added:
+            with db.engine.begin() as connection:
+                for column in added:
+                    ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                    created.append(f'{table.name}.{column.name}')
+                for column in added:
+                    backfill = BACKFILLS.get((table.name, column.name))
+                    if callable(backfill):
+                        backfill(connection)
+                    elif backfill:
+                        connection.execute(text(backfill))
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    with db.engine.begin() as connection:
+        if search.install(connection):
+            created.append(search.FTS_TABLE)
+    return created
+
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Create missing tables, columns and indexes."""
+    created = upgrade_schema()
+    for name in created:
+        click.echo(f'Created {name}')
+    click.echo('Database is up to date')
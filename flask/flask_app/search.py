@@ -0,0 +1,130 @@
+"""Full-text search over posts with SQLite FTS5.
+
+``post_fts`` is an external-content FTS5 index over the title and content
+of ``post``, kept current by triggers on every insert, update and delete.
+It is created with the ``post`` table, or by ``flask upgrade-db`` for an
+existing database. Without it (another database, or an SQLite built
+without FTS5) search falls back to an ``ilike`` scan.
+"""
+import re
+from flask import current_app
+from sqlalchemy import event, inspect, or_, text
+from sqlalchemy.exc import OperationalError
+from flask_app import db
+from models.post import Post
+
+
+FTS_TABLE = 'post_fts'
+
+CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, content, content='post', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+"""
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_fts_insert AFTER INSERT ON post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_fts_delete AFTER DELETE ON post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_fts_update AFTER UPDATE OF title, content ON post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+# bm25 column weights: a hit in the title counts ten times one in the body
+RANK = f'bm25({FTS_TABLE}, 10.0, 1.0)'
+
+# Scoring every match of a word found in most posts walks the whole index,
+# so only the newest SEARCH_CANDIDATES matches are ranked
+SEARCH_CANDIDATES = 1000
+
+TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def install(connection):
+    """Create the index and its triggers if they are missing"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    created = not inspect(connection).has_table(FTS_TABLE)
+    if created:
+        try:
+            connection.exec_driver_sql(CREATE_TABLE)
+        except OperationalError:
+            return False  # SQLite without FTS5
+    for sql in TRIGGERS:
+        connection.exec_driver_sql(sql)
+    if created:
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return created
+
+
+@event.listens_for(Post.__table__, 'after_create')
+def create_with_post_table(target, connection, **kw):
+    install(connection)
+
+
+def match_expression(query):
+    """Turn user input into a safe FTS5 query.
+
+    Words must all match; "quoted words" must match as a phrase. Every term
+    is quoted, so FTS5 operators in the input are searched for literally.
+    """
+    terms = []
+    for phrase, word in TOKEN.findall(query):
+        words = re.findall(r'\w+', phrase or word)
+        if words:
+            terms.append('"%s"' % ' '.join(words))
+    return ' '.join(terms)
+
+
+def search_posts(query, page=1, per_page=10):
+    """Return ``(posts, has_next)`` for one page of matches, best first"""
+    expression = match_expression(query)
+    if not expression:
+        return [], False
+    offset = (page - 1) * per_page
+    try:
+        ids = fts_ids(expression, per_page + 1, offset)
+    except OperationalError:
+        db.session.rollback()
+        ids = None
+    if ids is None:
+        return scan(query, per_page, offset)
+
+    found = {post.id: post for post in Post.listing().filter(Post.id.in_(ids[:per_page]))}
+    return [found[id] for id in ids[:per_page] if id in found], len(ids) > per_page
+
+
+def fts_ids(expression, limit, offset):
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    candidates = current_app.config.get('SEARCH_CANDIDATES', SEARCH_CANDIDATES)
+    rows = db.session.execute(text(
+        f'SELECT id FROM ('
+        f'  SELECT rowid AS id, {RANK} AS score FROM {FTS_TABLE}'
+        f'  WHERE {FTS_TABLE} MATCH :expression ORDER BY rowid DESC LIMIT :candidates'
+        f') ORDER BY score, id DESC LIMIT :limit OFFSET :offset'
+    ), {'expression': expression, 'candidates': candidates, 'limit': limit, 'offset': offset})
+    return [row[0] for row in rows]
+
+
+def scan(query, per_page, offset):
+    conditions = [or_(Post.title.ilike(f'%{phrase or word}%'), Post.content.ilike(f'%{phrase or word}%'))
+                  for phrase, word in TOKEN.findall(query)]
+    posts = Post.listing().filter(*conditions)\
+        .order_by(Post.date_posted.desc(), Post.id.desc())\
+        .offset(offset).limit(per_page + 1).all()
+    return posts[:per_page], len(posts) > per_page
@@ -0,0 +1,32 @@
+"""Streamed HTML pages for lists too long to build in memory.
+
+``stream_page`` renders a template with Flask's ``stream_template``, which
+keeps the request context alive while the response is sent, so a
+``yield_per`` query passed in is fetched as the template reaches it rather
+than up front. Jinja yields many small strings; they go out joined into
+pieces of at least ``STREAM_BUFFER_SIZE`` characters, or sooner where the
+template outputs ``{{ flush }}``, e.g. right after the navbar.
+"""
+from flask import current_app, stream_template
+from markupsafe import Markup
+
+
+FLUSH = '<!-- flush -->'
+
+
+def buffered(pieces, size):
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size or piece == FLUSH:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+    pieces = stream_template(template_name, flush=Markup(FLUSH), **context)
+    return current_app.response_class(
+        buffered(pieces, current_app.config['STREAM_BUFFER_SIZE']), mimetype='text/html')
@@ -0,0 +1,263 @@
+"""Sitemaps and Atom/RSS feeds, for crawlers and feed readers.
+
+    GET /sitemap.xml                      index of the shards below
+    GET /sitemap-posts-<n>.xml            post pages, by id range
+    GET /sitemap-users-<n>.xml            pages of users who have posted
+    GET /feeds/posts.atom|rss             newest posts
+    GET /feeds/user/<username>.atom|rss   newest posts of one author
+
+Sitemap shards cover SITEMAP_SHARD_SIZE ids each (50,000 URLs is the
+protocol's limit); feeds carry the newest SYNDICATION_ITEMS posts.
+
+Each document has a version computed from one small query over the rows it
+lists: their count and newest change for a sitemap shard, the ids and
+updated_at of its items for a feed. It is written to SYNDICATION_FOLDER
+under that version from a ``yield_per`` query, so memory stays flat however
+big the shard, and served from disk as long as the version holds. Only the
+shards and feeds whose posts changed are written again. The version is the
+response's ETag and the newest change its Last-Modified.
+
+A renamed author's sitemap entry changes with their next post.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+from sqlalchemy import func, select
+from flask_app import db
+from flask_app.database import read_replica
+from models.author_stats import AuthorStats
+from models.post import Post
+from models.user import User
+
+
+syndication = Blueprint('syndication', __name__)
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+# rows fetched at a time while a document is written
+CHUNK_SIZE = 2000
+
+
+def _version(*parts):
+    # absolute URLs go into the documents; each host gets its own
+    state = ':'.join(str(part) for part in (request.host_url,) + parts)
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def _path(name, version):
+    return os.path.join(current_app.config['SYNDICATION_FOLDER'], f'{name}.{version}.xml')
+
+
+def _open(name, version, write):
+    """The document ``name`` at ``version``, written by ``write(fp)`` unless
+    it is on disk already"""
+    path = _path(name, version)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    folder = current_app.config['SYNDICATION_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    # written aside and renamed into place, so no reader sees half a file
+    fd, temporary = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            write(fp)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    document = open(path, 'rb')
+    for old in glob.glob(_path(glob.escape(name), '*')):
+        if old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass  # removed by another process
+    return document
+
+
+def _respond(name, version, last_modified, mimetype, write):
+    if request.if_none_match.contains(version) or (
+            not request.if_none_match and last_modified and request.if_modified_since
+            and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)):
+        response = current_app.response_class(status=304)
+    else:
+        response = send_file(_open(name, version, write), mimetype=mimetype)
+    response.set_etag(version)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['SYNDICATION_MAX_AGE']
+    return response
+
+
+def _w3c(value):
+    # stored naive, in local time
+    return value.replace(microsecond=0).astimezone().isoformat()
+
+
+def _entries(fp, tag, urls):
+    for url, lastmod in urls:
+        fp.write(f'<{tag}><loc>{escape(url)}</loc>')
+        if lastmod:
+            fp.write(f'<lastmod>{_w3c(lastmod)}</lastmod>')
+        fp.write(f'</{tag}>\n')
+
+
+def _urlset(urls):
+    """A ``write`` for the sitemap of the ``(url, lastmod)`` pairs ``urls()``
+    yields, queried only if the sitemap is written"""
+    def write(fp):
+        fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        _entries(fp, 'url', urls())
+        fp.write('</urlset>\n')
+    return write
+
+
+def _shards(key, lastmod, *criteria):
+    """``(shard, lastmod)`` of the non-empty shards of the rows of ``key``"""
+    shard = ((key - 1) // current_app.config['SITEMAP_SHARD_SIZE'] + 1).label('shard')
+    return db.session.execute(select(shard, func.max(lastmod)).where(*criteria)
+                              .group_by(shard).order_by(shard)).all()
+
+
+def _shard_range(key, shard):
+    size = current_app.config['SITEMAP_SHARD_SIZE']
+    return key > (shard - 1) * size, key <= shard * size
+
+
+@syndication.route('/sitemap.xml')
+@read_replica
+def sitemap_index():
+    sitemaps = [(url_for('syndication.sitemap_posts', shard=shard, _external=True), lastmod)
+                for shard, lastmod in _shards(Post.id, Post.updated_at)]
+    sitemaps += [(url_for('syndication.sitemap_users', shard=shard, _external=True), lastmod)
+                 for shard, lastmod in _shards(AuthorStats.user_id, AuthorStats.last_posted_at,
+                                               AuthorStats.post_count > 0)]
+    last_modified = max((lastmod for _, lastmod in sitemaps if lastmod), default=None)
+
+    def write(fp):
+        fp.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        _entries(fp, 'sitemap', sitemaps)
+        fp.write('</sitemapindex>\n')
+    return _respond('sitemap', _version(*sitemaps), last_modified, 'application/xml', write)
+
+
+@syndication.route('/sitemap-posts-<int:shard>.xml')
+@read_replica
+def sitemap_posts(shard):
+    in_shard = _shard_range(Post.id, shard)
+    count, lastmod = db.session.execute(
+        select(func.count(Post.id), func.max(Post.updated_at)).where(*in_shard)).one()
+    if not count:
+        abort(404)
+
+    def urls():
+        rows = db.session.execute(select(Post.id, Post.updated_at).where(*in_shard)
+                                  .order_by(Post.id).execution_options(yield_per=CHUNK_SIZE))
+        for post_id, updated_at in rows:
+            yield url_for('posts.post', post_id=post_id, _external=True), updated_at
+    return _respond(f'sitemap-posts-{shard}', _version(shard, count, lastmod), lastmod,
+                    'application/xml', _urlset(urls))
+
+
+@syndication.route('/sitemap-users-<int:shard>.xml')
+@read_replica
+def sitemap_users(shard):
+    criteria = _shard_range(AuthorStats.user_id, shard) + (AuthorStats.post_count > 0,)
+    count, lastmod = db.session.execute(
+        select(func.count(AuthorStats.user_id), func.max(AuthorStats.last_posted_at))
+        .where(*criteria)).one()
+    if not count:
+        abort(404)
+
+    def urls():
+        rows = db.session.execute(select(User.username, AuthorStats.last_posted_at)
+                                  .join(User, User.id == AuthorStats.user_id).where(*criteria)
+                                  .order_by(AuthorStats.user_id)
+                                  .execution_options(yield_per=CHUNK_SIZE))
+        for username, last_posted_at in rows:
+            yield url_for('users.user', username=username, _external=True), last_posted_at
+    return _respond(f'sitemap-users-{shard}', _version(shard, count, lastmod), lastmod,
+                    'application/xml', _urlset(urls))
+
+
+def _atom(fp, title, link, description, updated, posts):
+    fp.write('<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n'
+             f'<title>{escape(title)}</title><subtitle>{escape(description)}</subtitle>\n'
+             f'<link href="{escape(link)}" rel="alternate"/>'
+             f'<link href="{escape(request.base_url)}" rel="self"/>\n'
+             f'<id>{escape(link)}</id><updated>{_w3c(updated)}</updated>\n')
+    for post in posts:
+        url = url_for('posts.post', post_id=post.id, _external=True)
+        fp.write(f'<entry><title>{escape(post.title)}</title>'
+                 f'<link href="{escape(url)}" rel="alternate"/><id>{escape(url)}</id>'
+                 f'<published>{_w3c(post.date_posted)}</published>'
+                 f'<updated>{_w3c(post.updated_at or post.date_posted)}</updated>'
+                 f'<author><name>{escape(post.author.username)}</name></author>'
+                 f'<summary>{escape(post.excerpt or "")}</summary></entry>\n')
+    fp.write('</feed>\n')
+
+
+def _rss(fp, title, link, description, updated, posts):
+    fp.write('<?xml version="1.0" encoding="utf-8"?>\n'
+             '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"'
+             ' xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>\n'
+             f'<title>{escape(title)}</title><link>{escape(link)}</link>'
+             f'<description>{escape(description)}</description>\n'
+             f'<atom:link href="{escape(request.base_url)}" rel="self"/>'
+             f'<lastBuildDate>{format_datetime(updated.astimezone())}</lastBuildDate>\n')
+    for post in posts:
+        url = url_for('posts.post', post_id=post.id, _external=True)
+        fp.write(f'<item><title>{escape(post.title)}</title><link>{escape(url)}</link>'
+                 f'<description>{escape(post.excerpt or "")}</description>'
+                 f'<dc:creator>{escape(post.author.username)}</dc:creator>'
+                 f'<pubDate>{format_datetime(post.date_posted.astimezone())}</pubDate>'
+                 f'<guid>{escape(url)}</guid></item>\n')
+    fp.write('</channel></rss>\n')
+
+
+FEEDS = {
+    'atom': ('application/atom+xml; charset=utf-8', _atom),
+    'rss': ('application/rss+xml; charset=utf-8', _rss),
+}
+
+
+def _feed(kind, name, criteria, title, link, description):
+    if kind not in FEEDS:
+        abort(404)
+    mimetype, write_feed = FEEDS[kind]
+    newest = select(Post.id, Post.updated_at).where(*criteria)\
+        .order_by(Post.date_posted.desc(), Post.id.desc())\
+        .limit(current_app.config['SYNDICATION_ITEMS'])
+    rows = [tuple(row) for row in db.session.execute(newest)]
+    last_modified = max((updated_at for _, updated_at in rows if updated_at), default=None)
+    ids = [post_id for post_id, _ in rows]
+
+    def write(fp):
+        posts = Post.listing().filter(Post.id.in_(ids))\
+            .order_by(Post.date_posted.desc(), Post.id.desc()).yield_per(CHUNK_SIZE)
+        write_feed(fp, title, link, description, last_modified or datetime.now(), posts)
+    return _respond(f'{name}-{kind}', _version(title, *rows), last_modified, mimetype, write)
+
+
+@syndication.route('/feeds/posts.<kind>')
+@read_replica
+def posts_feed(kind):
+    return _feed(kind, 'feed', (), 'Flask Blog', url_for('main.home', _external=True),
+                 'The newest posts on Flask Blog')
+
+
+@syndication.route('/feeds/user/<string:username>.<kind>')
+@read_replica
+def user_feed(username, kind):
+    author = User.query.filter_by(username=username).first_or_404()
+    return _feed(kind, f'feed-user-{author.id}', (Post.user_id == author.id,),
+                 f'Flask Blog - {author.username}',
+                 url_for('users.user', username=author.username, _external=True),
+                 f'The newest posts by {author.username}')
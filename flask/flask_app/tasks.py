@@ -0,0 +1,79 @@
+"""In-process background task queue.
+
+Work is handed to a few daemon threads through a local queue so the request
+that produced it can return straight away. With
+``BACKGROUND_TASK_WORKERS = 0`` tasks run inline. Tasks must be idempotent:
+queued work is lost if the process dies. ``every()`` submits a task on a
+schedule, for jobs such as ranking trending posts that can run from the web
+process.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    def __init__(self):
+        self.workers = 2
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config['BACKGROUND_TASK_WORKERS']
+
+    def submit(self, func, *args, **kwargs):
+        if not self.workers:
+            self._call(func, args, kwargs)
+            return
+        self._start()
+        self._queue.put((func, args, kwargs))
+
+    def every(self, seconds, func, *args, **kwargs):
+        """Submit ``func`` every ``seconds``, the first time ``seconds`` from now"""
+        def schedule():
+            while True:
+                time.sleep(seconds)
+                self.submit(func, *args, **kwargs)
+
+        thread = threading.Thread(target=schedule, daemon=True,
+                                  name=f"schedule-{getattr(func, '__name__', func)}")
+        thread.start()
+        return thread
+
+    def join(self):
+        """Block until every queued task has run"""
+        self._queue.join()
+
+    def _start(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'task-worker-{len(self._threads)}')
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            func, args, kwargs = self._queue.get()
+            try:
+                self._call(func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    def _call(self, func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Background task %s failed', getattr(func, '__name__', func))
+
+
+tasks = TaskQueue()
+atexit.register(tasks.join)
@@ -0,0 +1,39 @@
+"""Derived forms of a post's content: the feed excerpt, word count and
+reading time stored on Post, and the rendered HTML body."""
+import math
+import re
+
+from flask import current_app
+from markupsafe import Markup, escape
+from flask_app.cache import cache
+
+EXCERPT_WORDS = 50
+WORDS_PER_MINUTE = 200
+PARAGRAPH = re.compile(r'\n\s*\n')
+
+
+def summarize(content):
+    """Return ``(excerpt, word_count, reading_time)`` for ``content``"""
+    words = content.split()
+    excerpt = ' '.join(words[:EXCERPT_WORDS])
+    if len(words) > EXCERPT_WORDS:
+        excerpt += '…'
+    return excerpt, len(words), max(1, math.ceil(len(words) / WORDS_PER_MINUTE))
+
+
+def render(content):
+    """``content`` as escaped HTML paragraphs, single newlines as <br>"""
+    paragraphs = PARAGRAPH.split(content.replace('\r\n', '\n').strip())
+    return Markup('\n\n').join(Markup('<p>%s</p>') % Markup('<br>').join(map(escape, paragraph.split('\n')))
+                               for paragraph in paragraphs if paragraph)
+
+
+def rendered_body(post):
+    """``render(post.content)``, cached per post version"""
+    # updated_at moves on every edit, so an edited post never hits an old body
+    key = f'post-body:{post.id}:{post.updated_at.timestamp() if post.updated_at else ""}'
+    html = cache.get(key)
+    if html is None:
+        html = render(post.content)
+        cache.set(key, html, current_app.config['POST_BODY_CACHE_TIMEOUT'])
+    return html
@@ -0,0 +1,185 @@
+"""Personal timelines: the newest posts of the authors a user follows.
+
+A timeline is materialized as TimelineEntry rows, one per post, written by
+``fan_out`` in a background task when a followed author posts (fan-out on
+write), so a page is one index seek however many authors the reader
+follows. Authors with more than TIMELINE_FANOUT_LIMIT followers are not
+fanned out, each post would write that many rows; ``page`` reads their
+posts from the posts table and merges them in (fan-out on read).
+
+``trim`` keeps each timeline to its newest TIMELINE_LENGTH entries; it runs
+after every backfill and from ``flask rebuild-timelines --trim``, as
+trimming on every fan-out would cost more than the write. Pages never read
+past what they show, so a timeline waiting to be trimmed is no slower to
+read. Background tasks are lost if the process dies; ``flask
+rebuild-timelines`` rewrites every timeline from the follow graph.
+"""
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+from sqlalchemy.orm import aliased, defer, joinedload
+from flask_app import db
+from flask_app.pagination import LAST, PREVIOUS, CursorPagination, decode_cursor
+from flask_app.tasks import tasks
+from models.follow import Follow
+from models.post import Post
+from models.timeline import TimelineEntry
+from models.user import User
+
+
+def in_background(func, *args):
+    """Run ``func(*args)`` as a background task, in an app context of its own"""
+    app = current_app._get_current_object()
+
+    def task():
+        with app.app_context():
+            func(*args)
+
+    task.__name__ = func.__name__
+    tasks.submit(task)
+
+
+def is_popular(follower_count):
+    return (follower_count or 0) > current_app.config['TIMELINE_FANOUT_LIMIT']
+
+
+def fan_out(post_id):
+    """Add a new post to the timelines of its author's followers"""
+    row = db.session.execute(
+        select(Post.user_id, Post.date_posted, User.follower_count)
+        .join(User, User.id == Post.user_id).where(Post.id == post_id)).first()
+    if row is None or is_popular(row.follower_count):
+        return  # deleted before the task ran, or read on demand
+    author_id, date_posted, _ = row
+    followers = select(Follow.follower_id).where(Follow.author_id == author_id)\
+        .order_by(Follow.follower_id).limit(current_app.config['TIMELINE_BATCH_SIZE'])
+    last = 0
+    while True:
+        batch = db.session.scalars(followers.where(Follow.follower_id > last)).all()
+        if not batch:
+            break
+        db.session.execute(upsert(TimelineEntry).on_conflict_do_nothing(), [
+            {'user_id': user_id, 'post_id': post_id, 'author_id': author_id,
+             'date_posted': date_posted} for user_id in batch])
+        db.session.commit()
+        last = batch[-1]
+
+
+def backfill(user_id, author_id):
+    """Add the newest posts of a newly followed author to ``user_id``'s timeline"""
+    if is_popular(db.session.scalar(select(User.follower_count).where(User.id == author_id))):
+        return
+    posts = select(literal(user_id), Post.id, Post.user_id, Post.date_posted)\
+        .where(Post.user_id == author_id).order_by(Post.date_posted.desc(), Post.id.desc())\
+        .limit(current_app.config['TIMELINE_LENGTH'])
+    db.session.execute(upsert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'author_id', 'date_posted'], posts).on_conflict_do_nothing())
+    trim([user_id])
+    db.session.commit()
+
+
+def forget(user_id, author_id):
+    """Take an unfollowed author's posts out of ``user_id``'s timeline"""
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.user_id == user_id,
+                                                   TimelineEntry.author_id == author_id))
+    db.session.commit()
+
+
+def remove(post_id):
+    """Take a deleted post out of every timeline; commits with the session"""
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id)
+                       .execution_options(synchronize_session=False))
+
+
+def trim(user_ids=None):
+    """Drop all but the newest TIMELINE_LENGTH entries of the timelines of
+    ``user_ids`` (default all); return how many were dropped"""
+    kept = aliased(TimelineEntry)
+    oldest_kept = select(kept.date_posted).where(kept.user_id == TimelineEntry.user_id)\
+        .order_by(kept.date_posted.desc(), kept.post_id.desc())\
+        .offset(current_app.config['TIMELINE_LENGTH'] - 1).limit(1).scalar_subquery()
+    statement = delete(TimelineEntry).where(TimelineEntry.date_posted < oldest_kept)
+    if user_ids is not None:
+        statement = statement.where(TimelineEntry.user_id.in_(user_ids))
+    return db.session.execute(statement.execution_options(synchronize_session=False)).rowcount
+
+
+def rebuild(user_id):
+    """Rewrite ``user_id``'s timeline from the authors they follow"""
+    authors = select(Follow.author_id).join(User, User.id == Follow.author_id).where(
+        Follow.follower_id == user_id,
+        func.coalesce(User.follower_count, 0) <= current_app.config['TIMELINE_FANOUT_LIMIT'])
+    posts = select(literal(user_id), Post.id, Post.user_id, Post.date_posted)\
+        .where(Post.user_id.in_(authors)).order_by(Post.date_posted.desc(), Post.id.desc())\
+        .limit(current_app.config['TIMELINE_LENGTH'])
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.user_id == user_id))
+    db.session.execute(insert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'author_id', 'date_posted'], posts))
+    db.session.commit()
+
+
+class TimelinePagination(CursorPagination):
+    """Pages a user's TimelineEntry rows, with their posts as ``items``"""
+    columns = (TimelineEntry.date_posted, TimelineEntry.post_id)
+
+    def _fetch(self, cursor):
+        return [entry.post for entry in super()._fetch(cursor)]
+
+
+class MergedPagination(CursorPagination):
+    """The ``per_page`` posts nearest the cursor among several paginations
+    of it, e.g. the timeline and the posts of popular authors"""
+
+    def __init__(self, sources, per_page, cursor=None):
+        self._total = None
+        self.per_page = per_page
+        direction = LAST if cursor == LAST else decode_cursor(cursor)[0] if cursor else None
+        rows = sorted({post.id: post for source in sources for post in source}.values(),
+                      key=lambda post: (post.date_posted, post.id), reverse=True)
+        more = len(rows) > per_page
+        if direction in (LAST, PREVIOUS):
+            self.items = rows[-per_page:]
+            self.has_next = direction == PREVIOUS
+            self.has_prev = more or any(source.has_prev for source in sources)
+        else:
+            self.items = rows[:per_page]
+            self.has_next = more or any(source.has_next for source in sources)
+            self.has_prev = direction is not None
+
+
+def page(user_id, per_page, cursor=None):
+    """The timeline page at ``cursor``; raises InvalidCursor"""
+    entries = TimelineEntry.query.filter_by(user_id=user_id).options(
+        joinedload(TimelineEntry.post).options(joinedload(Post.author), defer(Post.content)))
+    sources = [TimelinePagination(entries, per_page, cursor)]
+    popular = db.session.scalars(
+        select(Follow.author_id).join(User, User.id == Follow.author_id).where(
+            Follow.follower_id == user_id,
+            User.follower_count > current_app.config['TIMELINE_FANOUT_LIMIT'])).all()
+    if popular:
+        sources.append(CursorPagination(Post.listing().filter(Post.user_id.in_(popular)),
+                                        per_page, cursor))
+    if len(sources) == 1:
+        return sources[0]
+    return MergedPagination(sources, per_page, cursor)
+
+
+@click.command('rebuild-timelines')
+@click.option('--trim', 'trim_only', is_flag=True, help='Only drop entries beyond TIMELINE_LENGTH')
+@with_appcontext
+def rebuild_timelines_command(trim_only):
+    """Rewrite every timeline from the follow graph."""
+    start = time.perf_counter()
+    if trim_only:
+        dropped = trim()
+        db.session.commit()
+        click.echo(f'Dropped {dropped} entries in {time.perf_counter() - start:.2f}s')
+        return
+    followers = db.session.scalars(select(Follow.follower_id).distinct()
+                                   .order_by(Follow.follower_id)).all()
+    for user_id in followers:
+        rebuild(user_id)
+    click.echo(f'Rebuilt {len(followers)} timelines in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,129 @@
+"""Trending posts: view counts decayed by age, ranked ahead of time.
+
+``rank()`` walks the viewed posts in one pass and writes each a
+TrendingScore: its previous score, halved every TRENDING_HALF_LIFE_HOURS,
+plus the views counted since (see flask_app.counters). A post read a lot
+this morning outranks one read more last month. ``top()`` reads the scores
+off their index and stops after K, so no page aggregates anything per
+request.
+
+Run it on a schedule with ``flask rank-trending``, or set
+TRENDING_SCHEDULE_SECONDS to run it from the web process; one process is
+enough. Scores are written as values, not increments, so a run that
+overlaps another doesn't count views twice.
+"""
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+from sqlalchemy.orm import defer, joinedload
+from flask_app import db
+from flask_app.cache import cache, feed_cache
+from flask_app.tasks import tasks
+from models.post import Post
+from models.trending import TrendingScore
+
+
+SIDEBAR_KEY = 'posts:trending:sidebar'
+# below this a score is as good as 0; it is stored as 0 and skipped after
+MIN_SCORE = 0.01
+
+
+def decayed(score, since, now):
+    half_life = current_app.config['TRENDING_HALF_LIFE_HOURS'] * 3600
+    half_lives = (now - since).total_seconds() / half_life
+    return score * 0.5 ** half_lives
+
+
+def _scores(rows, now):
+    for post_id, views, score, seen, computed_at in rows:
+        if score is None:
+            score, seen, computed_at = 0.0, 0, now
+        if views == seen and not score:
+            continue  # nothing to decay, nothing new
+        score = decayed(score, computed_at, now) + views - seen
+        yield {'post_id': post_id, 'score': score if score >= MIN_SCORE else 0.0,
+               'views_seen': views, 'computed_at': now}
+
+
+def rank(now=None):
+    """Score every viewed post as of ``now``; return how many were written"""
+    now = now or datetime.now()
+    # in batches of posts walked in id order, one transaction each
+    rows = select(Post.id, Post.views, TrendingScore.score, TrendingScore.views_seen,
+                  TrendingScore.computed_at)\
+        .outerjoin(TrendingScore, TrendingScore.post_id == Post.id).where(Post.views > 0)\
+        .order_by(Post.id).limit(current_app.config['TRENDING_BATCH_SIZE'])
+    written = last = 0
+    while True:
+        batch = db.session.execute(rows.where(Post.id > last)).all()
+        if not batch:
+            break
+        scores = list(_scores(batch, now))
+        if scores:
+            statement = upsert(TrendingScore)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[TrendingScore.post_id],
+                set_={column: statement.excluded[column]
+                      for column in ('score', 'views_seen', 'computed_at')}), scores)
+        db.session.commit()
+        written += len(scores)
+        last = batch[-1].id
+    cache.delete(SIDEBAR_KEY)
+    # the home page shows the sidebar; move its ETag on
+    feed_cache.invalidate()
+    return written
+
+
+def remove(post_id):
+    """Drop a deleted post's score; commits with the session"""
+    db.session.execute(delete(TrendingScore).where(TrendingScore.post_id == post_id)
+                       .execution_options(synchronize_session=False))
+
+
+def _ranked(*columns):
+    return select(*columns).where(TrendingScore.score > 0)\
+        .order_by(TrendingScore.score.desc(), TrendingScore.post_id.desc())
+
+
+def top(limit=None):
+    """The trending posts, highest score first, as the feeds show them"""
+    scores = db.session.scalars(
+        _ranked(TrendingScore).limit(limit or current_app.config['TRENDING_COUNT'])
+        .options(joinedload(TrendingScore.post).options(joinedload(Post.author),
+                                                        defer(Post.content))))
+    return [score.post for score in scores]
+
+
+def sidebar():
+    """``(post id, title)`` of the top few trending posts, cached between runs"""
+    def rows():
+        ranked = _ranked(Post.id, Post.title).select_from(TrendingScore)\
+            .join(Post, Post.id == TrendingScore.post_id).limit(current_app.config['TRENDING_SIDEBAR_COUNT'])
+        return [tuple(row) for row in db.session.execute(ranked)]
+    return cache.get_or_set(SIDEBAR_KEY, rows, current_app.config['TRENDING_CACHE_TIMEOUT'])
+
+
+def schedule(app):
+    """Rank every TRENDING_SCHEDULE_SECONDS from this process, if set"""
+    seconds = app.config['TRENDING_SCHEDULE_SECONDS']
+    if not seconds:
+        return
+
+    def rank_trending():
+        with app.app_context():
+            rank()
+
+    tasks.every(seconds, rank_trending)
+
+
+@click.command('rank-trending')
+@with_appcontext
+def rank_trending_command():
+    """Score the viewed posts for /trending; run it on a schedule."""
+    start = time.perf_counter()
+    written = rank()
+    click.echo(f'Scored {written} posts in {time.perf_counter() - start:.2f}s')
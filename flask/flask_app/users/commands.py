@@ -0,0 +1,58 @@
+import os
+import time
+import click
+from flask.cli import with_appcontext
+from flask_app import db
+from flask_app.users import images
+from flask_app.users.utils import picture_folder, CONTENT_ADDRESSED
+from models.media import DEFAULT_IMAGE, MediaBlob
+from models.user import User
+
+
+@click.command('gc-media')
+@click.option('--grace', default=3600, help='Only collect files unreferenced for this many seconds')
+@click.option('--scan', is_flag=True, help='Also sweep untracked files out of profile_pics')
+@click.option('--dry-run', is_flag=True)
+@with_appcontext
+def gc_media_command(grace, scan, dry_run):
+    """Delete profile pictures no user references any more."""
+    folder = picture_folder()
+    cutoff = time.time() - grace
+    orphans = []
+
+    for blob in MediaBlob.query.filter(MediaBlob.refcount <= 0).all():
+        if blob.updated_at.timestamp() >= cutoff:
+            continue
+        # refcounts are the fast path; the user table has the final say
+        if not User.query.filter_by(image_file=blob.name).first():
+            orphans.append(blob.name)
+        if not dry_run:
+            db.session.delete(blob)
+
+    if scan:
+        referenced = {name for (name,) in db.session.query(User.image_file).distinct()}
+        referenced.add(DEFAULT_IMAGE)
+        for filename in os.listdir(folder):
+            path = os.path.join(folder, filename)
+            if os.path.isfile(path) and filename not in referenced \
+                    and os.path.getmtime(path) < cutoff and filename not in orphans:
+                orphans.append(filename)
+
+    for filename in orphans:
+        click.echo(f'Deleting {filename}')
+        if not dry_run:
+            remove_picture(folder, filename)
+    db.session.commit()
+    click.echo(f'Collected {len(orphans)} files')
+
+
+def remove_picture(folder, filename):
+    paths = [filename]
+    if CONTENT_ADDRESSED.match(filename):
+        paths += [images.variant_name(filename, size, fmt)
+                  for size in images.SIZES for fmt in images.FORMATS]
+    for path in paths:
+        try:
+            os.remove(os.path.join(folder, path))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,45 @@
+"""Profile picture variants, produced off the request path.
+
+``save_picture`` stores the upload under the hash of its content and
+queues ``process``, which writes one file per size and format into
+``profile_pics/variants``. An unchanged picture is never reprocessed.
+"""
+import os
+import secrets
+from PIL import Image, ImageOps
+
+
+SIZES = (64, 125, 300)
+FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+
+
+def variant_name(filename, size, fmt):
+    stem, _ = os.path.splitext(filename)
+    return f'variants/{stem}_{size}.{fmt}'
+
+
+def process(path, quality=85):
+    """Write every missing variant of the picture at ``path``"""
+    folder, filename = os.path.split(path)
+    missing = {}
+    for size in SIZES:
+        for fmt in FORMATS:
+            target = os.path.join(folder, variant_name(filename, size, fmt))
+            if not os.path.exists(target):
+                missing[size, fmt] = target
+    if not missing:
+        return
+    os.makedirs(os.path.join(folder, 'variants'), exist_ok=True)
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for size in SIZES:
+            img = original.copy()
+            img.thumbnail((size, size))
+            for fmt, pil_format in FORMATS.items():
+                target = missing.get((size, fmt))
+                if target is None:
+                    continue
+                # write then rename so readers never see a half-written file
+                partial = f'{target}.{secrets.token_hex(4)}.part'
+                img.save(partial, pil_format, quality=quality)
+                os.replace(partial, target)
@@ -1,13 +1,37 @@
-from flask_app import db, bcrypt
+from flask_app import conditional, db, passwords, timeline
+from flask_app.cache import feed_cache
+from flask_app.database import read_replica
+from models.author_stats import AuthorStats
 from models.post import Post
-from models.user import User
-from flask_app.users.utils import save_picture
+from sqlalchemy.orm import defer
+from models.user import User, forget_user
+from models.follow import Follow
+from models.media import MediaBlob
+from flask_app.users.utils import save_picture, profile_image_url, CONTENT_ADDRESSED
+from flask_app.users.commands import gc_media_command
+from flask_app.pagination import paginate_posts
 from flask_login import current_user, login_user, logout_user, login_required
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_app.users.forms import (LoginForm, RegistrationForm, UpdateAccountForm,
                              RequestResetForm, ResetPasswordForm)
 
 users = Blueprint('users', __name__)
+users.add_app_template_global(profile_image_url)
+users.cli.add_command(gc_media_command)
+
+
+@users.after_app_request
+def cache_profile_pictures(response):
+    # content-addressed pictures never change under the same name
+    filename = request.view_args.get('filename', '') if request.view_args else ''
+    if request.endpoint == 'static' and response.status_code in (200, 304) \
+            and filename.startswith('profile_pics/') \
+            and CONTENT_ADDRESSED.match(filename[len('profile_pics/'):]):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
 
 @users.route("/login", methods=['GET', 'POST'])
 def login():
@@ -17,7 +41,12 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        valid, upgrade = passwords.verify(form.password.data, user.password) if user else (False, False)
+        if valid:
+            if upgrade:
+                # hashed with an older algorithm or cost, see flask_app.passwords
+                user.password = passwords.hash(form.password.data)
+                db.session.commit()
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             flash(f'Login successful! Welcome back, {user.username}', 'success')
@@ -33,7 +62,7 @@ def register():
 
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_pwd = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        hashed_pwd = passwords.hash(form.password.data)
         user = User(username=form.username.data, email=form.email.data, password=hashed_pwd)
         db.session.add(user)
         db.session.commit()
@@ -43,6 +72,8 @@ def register():
 
 @users.route('/logout')
 def logout():
+    if current_user.is_authenticated:
+        forget_user(current_user.id)
     logout_user()
     return redirect(url_for('main.home'))
 
@@ -51,30 +82,74 @@ def logout():
 @login_required
 def account():
     form = UpdateAccountForm()
-    user = User.query.filter_by(username=current_user.username).first()
-    posts = Post.query.filter_by(author=user).all()
     if form.validate_on_submit():
+        feed_changed = False
         if form.picture.data:
             filename = save_picture(form.picture.data)
+            feed_changed = filename != current_user.image_file
+            if feed_changed:
+                MediaBlob.retain(filename)
+                MediaBlob.release(current_user.image_file)
             current_user.image_file = filename
 
+        # the feed shows usernames and profile pictures
+        feed_changed = feed_changed or form.username.data != current_user.username
         current_user.username = form.username.data
         current_user.email = form.email.data
         db.session.commit()
+        forget_user(current_user.id)
+        if feed_changed:
+            feed_cache.invalidate()
         flash('Your account is successfully updated!', 'success')
         return redirect(url_for('users.account'))
     elif request.method == 'GET':
         form.username.data = current_user.username
         form.email.data = current_user.email
-    image_file = url_for('static', filename='profile_pics/' + current_user.image_file)
-    return render_template('account.html', user=user, posts=posts, title='Account', image_file=image_file, form=form)
+    image_file = profile_image_url(current_user.image_file, 300)
+    # one page at a time, and only when the page is rendered
+    posts = paginate_posts(Post.query.options(defer(Post.content)).filter_by(user_id=current_user.id),
+                           total=AuthorStats.count_for(current_user.id))
+    return render_template('account.html', user=current_user, posts=posts, title='Account', image_file=image_file, form=form)
 
 
 @users.route("/user/<string:username>")
+@read_replica
+@conditional.conditional(conditional.user_feed)
 def user(username):
-    page = request.args.get('page', 1, type=int)
+    user, post_count = db.session.query(User, AuthorStats.post_count)\
+        .outerjoin(AuthorStats, AuthorStats.user_id == User.id)\
+        .filter(User.username == username).first_or_404()
+    # every post's author is ``user``, already in the session's identity map,
+    # so post.author in the template resolves without a query per post
+    posts = paginate_posts(Post.query.options(defer(Post.content)).filter_by(author=user),
+                           total=post_count or 0)
+    # no query for visitors, who see no follow button
+    following = None
+    if current_user.is_authenticated and current_user.id != user.id:
+        following = Follow.is_following(current_user.id, user.id)
+    return render_template("user_posts.html", title=f"{username}", posts=posts, user=user,
+                           following=following)
+
+
+@users.route("/user/<string:username>/follow", methods=['POST'])
+@login_required
+def follow(username):
     user = User.query.filter_by(username=username).first_or_404()
-    posts = Post.query.filter_by(author=user)\
-        .order_by(Post.date_posted.desc())\
-        .paginate(page=page, per_page=5)
-    return render_template("user_posts.html", title=f"{username}", posts=posts, user=user)
+    if user.id == current_user.id:
+        flash('You cannot follow yourself', 'warning')
+    elif Follow.follow(current_user.id, user.id):
+        db.session.commit()
+        timeline.in_background(timeline.backfill, current_user.id, user.id)
+        flash(f'You are now following {user.username}', 'success')
+    return redirect(url_for('users.user', username=user.username))
+
+
+@users.route("/user/<string:username>/unfollow", methods=['POST'])
+@login_required
+def unfollow(username):
+    user = User.query.filter_by(username=username).first_or_404()
+    if Follow.unfollow(current_user.id, user.id):
+        db.session.commit()
+        timeline.in_background(timeline.forget, current_user.id, user.id)
+        flash(f'You are no longer following {user.username}', 'success')
+    return redirect(url_for('users.user', username=user.username))
@@ -1,19 +1,42 @@
+import hashlib
 import os
-import secrets
-from PIL import Image
-from flask import url_for
+import re
+from flask import current_app, url_for
+from flask_app.tasks import tasks
+from flask_app.users import images
+
+
+# <16 hex digits>.<ext> and its variants, see save_picture
+CONTENT_ADDRESSED = re.compile(r'^(variants/)?[0-9a-f]{16}(_\d+)?\.\w+$')
+
+
+def picture_folder():
+    return os.path.join(current_app.root_path, 'static/profile_pics')
 
 
 def save_picture(form_picture):
-    random_hex = secrets.token_hex(8)
+    """Store an upload and queue its resizing; returns the new filename.
+
+    The name is the hash of the content, so re-uploading the same picture
+    reuses the stored file and its variants.
+    """
+    data = form_picture.read()
     _, f_ext = os.path.splitext(form_picture.filename)
-    filename = random_hex + f_ext
-    picture_path = os.path.join(app.root_path, 'static/profile_pics', filename)
-    
-    # image resize
-    output_size = (125, 125)
-    i = Image.open(form_picture)
-    i.thumbnail(output_size)
-    i.save(picture_path)
-    
+    f_ext = f_ext.lower().replace('.jpeg', '.jpg')
+    filename = hashlib.sha256(data).hexdigest()[:16] + f_ext
+    picture_path = os.path.join(picture_folder(), filename)
+
+    if not os.path.exists(picture_path):
+        with open(picture_path, 'wb') as f:
+            f.write(data)
+    tasks.submit(images.process, picture_path, current_app.config['PROFILE_IMAGE_QUALITY'])
+
     return filename
+
+
+def profile_image_url(image_file, size=125, fmt='jpg'):
+    """URL of a resized copy of a profile picture, or of the original until it exists"""
+    variant = images.variant_name(image_file, size, fmt)
+    if os.path.exists(os.path.join(picture_folder(), variant)):
+        return url_for('static', filename='profile_pics/' + variant)
+    return url_for('static', filename='profile_pics/' + image_file)
@@ -0,0 +1,95 @@
+from flask_app import db
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as upsert
+from models.post import Post
+
+
+class AuthorStats(db.Model):
+    """Per-author totals over Post.
+
+    The post routes and ``flask posts import`` update a row in the same
+    commit as the posts they change; ``flask posts reconcile-stats``
+    rebuilds the table from the posts in bulk.
+    """
+    __tablename__ = 'author_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+    last_posted_at = db.Column(db.DateTime)
+    content_length = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_author_stats_top', post_count.desc(), last_posted_at.desc()),
+    )
+
+    @staticmethod
+    def posts_added(user_id, count, content_length, latest):
+        """Count new posts of ``user_id``; commits with the session"""
+        statement = upsert(AuthorStats).values(user_id=user_id, post_count=count,
+                                               content_length=content_length,
+                                               last_posted_at=latest)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={
+                'post_count': AuthorStats.post_count + statement.excluded.post_count,
+                'content_length': AuthorStats.content_length + statement.excluded.content_length,
+                # SQLite's two-argument max() is scalar
+                'last_posted_at': func.max(func.coalesce(AuthorStats.last_posted_at,
+                                                         statement.excluded.last_posted_at),
+                                           statement.excluded.last_posted_at),
+            },
+        ))
+
+    @staticmethod
+    def post_removed(user_id, content_length, date_posted):
+        """Uncount a post already deleted in this session"""
+        db.session.execute(
+            update(AuthorStats).where(AuthorStats.user_id == user_id)
+            .values(post_count=AuthorStats.post_count - 1,
+                    content_length=AuthorStats.content_length - content_length)
+            .execution_options(synchronize_session=False))
+        # only deleting the newest post moves last_posted_at back
+        latest = select(func.max(Post.date_posted))\
+            .where(Post.user_id == AuthorStats.user_id).scalar_subquery()
+        db.session.execute(
+            update(AuthorStats)
+            .where(AuthorStats.user_id == user_id, AuthorStats.last_posted_at <= date_posted)
+            .values(last_posted_at=latest)
+            .execution_options(synchronize_session=False))
+
+    @staticmethod
+    def post_changed(user_id, content_delta):
+        if content_delta:
+            db.session.execute(
+                update(AuthorStats).where(AuthorStats.user_id == user_id)
+                .values(content_length=AuthorStats.content_length + content_delta)
+                .execution_options(synchronize_session=False))
+
+    @staticmethod
+    def computed():
+        """``(user_id, post_count, last_posted_at, content_length)`` per author,
+        as the posts table says they should be"""
+        return select(Post.user_id, func.count(Post.id), func.max(Post.date_posted),
+                      func.coalesce(func.sum(func.length(Post.content)), 0))\
+            .where(Post.user_id.is_not(None)).group_by(Post.user_id)
+
+    @staticmethod
+    def rebuild():
+        """Replace every row with ``computed()`` in one INSERT ... SELECT"""
+        db.session.execute(delete(AuthorStats))
+        db.session.execute(insert(AuthorStats).from_select(
+            ['user_id', 'post_count', 'last_posted_at', 'content_length'],
+            AuthorStats.computed()))
+
+    @staticmethod
+    def count_for(user_id):
+        return db.session.scalar(select(AuthorStats.post_count)
+                                 .where(AuthorStats.user_id == user_id)) or 0
+
+    @staticmethod
+    def top(limit=10):
+        """The authors with the most posts, newest activity first on ties"""
+        return AuthorStats.query.order_by(AuthorStats.post_count.desc(),
+                                          AuthorStats.last_posted_at.desc()).limit(limit).all()
+
+    def __repr__(self):
+        return f"AuthorStats({self.user_id}, {self.post_count})"
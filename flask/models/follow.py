@@ -0,0 +1,54 @@
+from flask_app import db
+from datetime import datetime
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as upsert
+from models.user import User
+
+
+class Follow(db.Model):
+    follower_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        db.CheckConstraint('follower_id != author_id', name='ck_follow_not_self'),
+        # fan-out walks an author's followers in id order, see flask_app.timeline
+        db.Index('ix_follow_author_follower', 'author_id', 'follower_id'),
+    )
+
+    @staticmethod
+    def follow(follower_id, author_id):
+        """Follow ``author_id``; False if already following. Commits with
+        the session"""
+        created = db.session.execute(
+            upsert(Follow).values(follower_id=follower_id, author_id=author_id,
+                                  created_at=datetime.now())
+            .on_conflict_do_nothing()).rowcount
+        if created:
+            Follow._count(author_id, 1)
+        return bool(created)
+
+    @staticmethod
+    def unfollow(follower_id, author_id):
+        """Stop following ``author_id``; False if not following"""
+        deleted = db.session.execute(
+            delete(Follow).where(Follow.follower_id == follower_id, Follow.author_id == author_id)
+            .execution_options(synchronize_session=False)).rowcount
+        if deleted:
+            Follow._count(author_id, -1)
+        return bool(deleted)
+
+    @staticmethod
+    def _count(author_id, change):
+        db.session.execute(
+            update(User).where(User.id == author_id)
+            .values(follower_count=User.follower_count + change)
+            .execution_options(synchronize_session=False))
+
+    @staticmethod
+    def is_following(follower_id, author_id):
+        return db.session.scalar(select(Follow.follower_id).where(
+            Follow.follower_id == follower_id, Follow.author_id == author_id)) is not None
+
+    def __repr__(self):
+        return f"Follow({self.follower_id}, {self.author_id})"
@@ -0,0 +1,34 @@
+import time
+from flask_app import db
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as upsert
+
+
+class Generation(db.Model):
+    """A named number bumped to drop cached state, see flask_app.cache.
+
+    Kept in the database rather than in the process, so a bump made by one
+    worker moves every worker on.
+    """
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False)
+
+    @staticmethod
+    def current(name):
+        """The value of ``name``, 0 until it is first bumped"""
+        return db.session.scalar(select(Generation.value).where(Generation.name == name)) or 0
+
+    @staticmethod
+    def bump(name):
+        """Move ``name`` on and commit; return its new value"""
+        # the first value comes from the clock, so a recreated table never
+        # repeats one that went out in an ETag
+        statement = upsert(Generation).values(name=name, value=time.time_ns())
+        value = db.session.scalar(statement.on_conflict_do_update(
+            index_elements=['name'], set_={'value': Generation.value + 1},
+        ).returning(Generation.value))
+        db.session.commit()
+        return value
+
+    def __repr__(self):
+        return f"Generation('{self.name}', {self.value})"
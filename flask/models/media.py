@@ -0,0 +1,34 @@
+from flask_app import db
+from datetime import datetime
+
+
+DEFAULT_IMAGE = 'default.jpg'
+
+
+class MediaBlob(db.Model):
+    """A stored profile picture and how many users reference it"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    @staticmethod
+    def retain(name):
+        """Count a new reference to ``name``; commits with the session"""
+        if not name or name == DEFAULT_IMAGE:
+            return
+        blob = MediaBlob.query.filter_by(name=name).first()
+        if blob is None:
+            db.session.add(MediaBlob(name=name, refcount=1))
+        else:
+            blob.refcount = MediaBlob.refcount + 1
+
+    @staticmethod
+    def release(name):
+        if not name or name == DEFAULT_IMAGE:
+            return
+        MediaBlob.query.filter_by(name=name).update(
+            {'refcount': MediaBlob.refcount - 1, 'updated_at': datetime.now()})
+
+    def __repr__(self):
+        return f"MediaBlob('{self.name}', {self.refcount})"
@@ -1,12 +1,50 @@
-from flask_app import db
+from flask_app import db, text
 from datetime import datetime
+from sqlalchemy.orm import defer, joinedload, validates
 
 class Post(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    # conditional GETs compare against this, see flask_app.conditional;
+    # nullable only so upgrade-db can add it to an existing table
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     content = db.Column(db.Text, nullable=False)
+    # derived from content whenever it is set, see flask_app.text; nullable
+    # only so upgrade-db can add them to an existing table
+    excerpt = db.Column(db.Text)
+    word_count = db.Column(db.Integer)
+    reading_time = db.Column(db.Integer)
+    # written in batches from a per-process buffer, see flask_app.counters;
+    # nullable only so upgrade-db can add it to an existing table
+    views = db.Column(db.Integer, default=0)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
+    # keyset pagination seeks on (date_posted, id), see flask_app.pagination
+    __table_args__ = (
+        db.Index('ix_post_date_posted_id', 'date_posted', 'id'),
+        db.Index('ix_post_user_date_posted_id', 'user_id', 'date_posted', 'id'),
+        db.Index('ix_post_views_id', 'views', 'id'),
+    )
+
+    @staticmethod
+    def listing():
+        """Posts as the feeds show them: with their author, without the
+        full content (the feeds show the excerpt)"""
+        return Post.query.options(joinedload(Post.author), defer(Post.content))
+
+    @validates('content')
+    def summarize(self, key, content):
+        self.excerpt, self.word_count, self.reading_time = text.summarize(content)
+        return content
+
+    @property
+    def is_truncated(self):
+        return (self.word_count or 0) > text.EXCERPT_WORDS
+
+    @property
+    def rendered_content(self):
+        return text.rendered_body(self)
+
     def __repr__(self):
         return f"Post('{self.title}', '{self.date_posted}')"
@@ -0,0 +1,22 @@
+from flask_app import db
+
+
+class TimelineEntry(db.Model):
+    """A post in the timeline of one of its author's followers, written by
+    flask_app.timeline"""
+    __tablename__ = 'timeline_entry'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+    # copies of the post's, so unfollowing and paging need no join
+    author_id = db.Column(db.Integer, nullable=False)
+    date_posted = db.Column(db.DateTime, nullable=False)
+    post = db.relationship('Post')
+
+    __table_args__ = (
+        # pages seek on (date_posted, post_id) like the feeds, see flask_app.pagination
+        db.Index('ix_timeline_entry_user_date', 'user_id', 'date_posted', 'post_id'),
+        db.Index('ix_timeline_entry_post', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f"TimelineEntry({self.user_id}, {self.post_id})"
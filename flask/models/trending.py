@@ -0,0 +1,20 @@
+from flask_app import db
+
+
+class TrendingScore(db.Model):
+    """A post's views decayed by age, written by flask_app.trending"""
+    __tablename__ = 'trending_score'
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0)
+    # the post's view count when the score was computed; views past it are new
+    views_seen = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, nullable=False)
+    post = db.relationship('Post')
+
+    __table_args__ = (
+        # top() reads the scores in this order and stops after K
+        db.Index('ix_trending_score_score', 'score', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f"TrendingScore({self.post_id}, {self.score:.2f})"
@@ -1,11 +1,38 @@
+from flask import current_app
 from flask_login import UserMixin
+from sqlalchemy.orm import make_transient_to_detached
 from flask_app import db, login_manager
+from flask_app.cache import user_cache
 # from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
 
 
+# what the pages show of the signed-in user; never the password hash, nor
+# the follower count, which every follow moves
+IDENTITY_COLUMNS = ('id', 'username', 'email', 'image_file')
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    timeout = current_app.config['USER_CACHE_TIMEOUT']
+    columns = user_cache.get(user_id) if timeout else None
+    if columns is None:
+        user = User.query.get(user_id)
+        if user is not None and timeout:
+            user_cache.set(user_id, {key: getattr(user, key) for key in IDENTITY_COLUMNS},
+                           timeout)
+        return user
+    # attach a copy to the session as if loaded, without a query; it takes
+    # part in flushes and lazy loads like any other persistent instance, and
+    # the columns left out load from the database when first read
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def forget_user(user_id):
+    """Drop a cached identity after changing the user, see load_user"""
+    user_cache.delete(user_id)
 
 
 class User(db.Model, UserMixin):
@@ -13,8 +40,12 @@ class User(db.Model, UserMixin):
     username = db.Column(db.String(20), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     image_file = db.Column(db.String(20), nullable=False, default='default.jpg')
-    password = db.Column(db.String(60), nullable=False)
+    # 60 fits bcrypt only; scrypt and argon2 hashes are longer
+    password = db.Column(db.String(255), nullable=False)
     posts = db.relationship('Post', backref='author', lazy=True)
+    # kept current by models.follow; decides how flask_app.timeline reaches
+    # followers. Nullable only so upgrade-db can add it to an existing table
+    follower_count = db.Column(db.Integer, default=0)
 
     """
     def get_reset_token(self, expires_sec=1800):
@@ -0,0 +1,22 @@
+"""Minified static files, see flask_app.assets."""
+import unittest
+from flask_app import assets
+
+
+class MinifyCssTests(unittest.TestCase):
+    def test_drops_comments_and_whitespace(self):
+        css = '/* note */\n.a  .b > p {\n  color: red;\n  margin: 0 auto;\n}\n'
+        self.assertEqual(assets.minify_css(css), '.a .b>p{color:red;margin:0 auto}')
+
+    def test_keeps_strings_and_urls(self):
+        css = ('p::after {\n  content: "a : b; /* c */ { d }";\n'
+               "  quotes: 'it\\'s ,  x';\n"
+               '  background: url(data:image/png;base64,AA==) , url( "x y.png" );\n}\n')
+        self.assertEqual(assets.minify_css(css),
+                         'p::after{content:"a : b; /* c */ { d }";'
+                         "quotes:'it\\'s ,  x';"
+                         'background:url(data:image/png;base64,AA==),url( "x y.png" )}')
+
+
+if __name__ == '__main__':
+    unittest.main()
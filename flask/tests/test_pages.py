@@ -0,0 +1,198 @@
+"""Requests through the paginated pages, against a throwaway SQLite file.
+
+Run from the ``flask`` directory::
+
+    python -m unittest discover tests
+"""
+import os
+import re
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from benchmarks import count_queries
+from flask_app import create_app, db
+from flask_app.cache import user_cache
+from flask_app.config import Config
+from flask_app.counters import view_counts
+
+
+class PagesTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, path = tempfile.mkstemp(prefix='test-', suffix='.db')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        class TestConfig(Config):
+            SECRET_KEY = 'test'
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+            TESTING = True
+            WTF_CSRF_ENABLED = False
+            # background work runs inline, views are written by no timer
+            BACKGROUND_TASK_WORKERS = 0
+            VIEW_FLUSH_SECONDS = 0
+            POSTS_PAGINATION = 'cursor'
+            POSTS_PER_PAGE = 5
+
+        self.app = create_app(TestConfig)
+        self.addCleanup(view_counts.clear)
+        # user ids repeat from one throwaway database to the next
+        self.addCleanup(user_cache.clear)
+        # only around setup: requests reuse a pushed context, and its ``g``
+        with self.app.app_context():
+            db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+
+    def create_user(self, username):
+        """Return the id of a new user ``username``"""
+        from models.user import User
+        with self.app.app_context():
+            user = User(username=username, email=f'{username}@example.com', password='x')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    def create_posts(self, author_id, count):
+        from models.author_stats import AuthorStats
+        from models.post import Post
+        now = datetime.now()
+        with self.app.app_context():
+            for i in range(count):
+                db.session.add(Post(title=f'Post {i}', content='content', user_id=author_id,
+                                    date_posted=now - timedelta(minutes=i)))
+            db.session.flush()
+            AuthorStats.rebuild()
+            db.session.commit()
+
+    def login(self, user_id):
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+
+class CursorPagesTests(PagesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author_id = self.create_user('writer')
+        self.create_posts(self.author_id, 7)
+
+    def test_home_pages_with_cursor(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        page = response.get_data(as_text=True)
+        self.assertIn('Post 0', page)
+        self.assertNotIn('Post 5', page)
+        self.assertIn('?cursor=', page)
+
+        response = self.client.get('/', query_string={'cursor': 'last'})
+        self.assertIn('Post 6', response.get_data(as_text=True))
+        self.assertEqual(self.client.get('/', query_string={'cursor': 'nope'}).status_code, 404)
+
+    def test_user_posts_and_account(self):
+        response = self.client.get('/user/writer')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('writer (7)', response.get_data(as_text=True))
+
+        self.login(self.author_id)
+        self.assertEqual(self.client.get('/account').status_code, 200)
+
+    def test_api_list(self):
+        response = self.client.get('/api/posts')
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_create_ignores_date_posted(self):
+        self.login(self.author_id)
+        before = datetime.now()
+        for date_posted in ('2999-01-01T00:00:00', '2000-01-01T00:00:00'):
+            response = self.client.post('/api/posts', json={'title': 'Dated', 'content': 'text',
+                                                            'date_posted': date_posted})
+            self.assertEqual(response.status_code, 201)
+            date_posted = datetime.fromisoformat(response.get_json()['date_posted'])
+            self.assertTrue(before <= date_posted <= datetime.now())
+
+    def test_timeline(self):
+        reader = self.create_user('reader')
+        self.login(reader)
+        self.assertEqual(self.client.post('/user/writer/follow').status_code, 302)
+        response = self.client.get('/timeline')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Post 0', response.get_data(as_text=True))
+
+
+class AccountPageTests(PagesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author_id = self.create_user('writer')
+        self.create_posts(self.author_id, 7)
+        self.create_posts(self.create_user('other'), 2)
+        self.login(self.author_id)
+        with self.app.app_context():
+            self.engine = db.engine
+
+    def post_statements(self, statements):
+        return [statement for statement in statements if 'FROM post' in statement]
+
+    def test_pages_own_posts_without_content(self):
+        with count_queries(self.engine) as statements:
+            response = self.client.get('/account')
+        page = response.get_data(as_text=True)
+        self.assertIn('User Posts (7)', page)
+        self.assertIn('Post 4', page)
+        self.assertNotIn('Post 5', page)
+        posts = self.post_statements(statements)
+        self.assertEqual(len(posts), 1)
+        self.assertNotIn('post.content', posts[0])
+
+        cursor = re.search(r'/account\?cursor=([^"&]+)', page).group(1)
+        page = self.client.get('/account', query_string={'cursor': cursor}).get_data(as_text=True)
+        self.assertIn('Post 6', page)
+        self.assertNotIn('Post 4', page)
+
+    def test_total_comes_from_author_stats(self):
+        from models.author_stats import AuthorStats
+        with self.app.app_context():
+            db.session.execute(update(AuthorStats).where(AuthorStats.user_id == self.author_id)
+                               .values(post_count=42))
+            db.session.commit()
+        with count_queries(self.engine) as statements:
+            page = self.client.get('/account').get_data(as_text=True)
+        self.assertIn('User Posts (42)', page)
+        self.assertFalse([statement for statement in statements if 'count(' in statement])
+
+    def test_update_redirects_without_reading_posts(self):
+        with count_queries(self.engine) as statements:
+            response = self.client.post('/account', data={'username': 'writer',
+                                                          'email': 'writer@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.post_statements(statements), [])
+
+
+class FeedGenerationTests(PagesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author_id = self.create_user('writer')
+        self.create_posts(self.author_id, 3)
+
+    def test_another_workers_change_moves_etag_and_fragment(self):
+        from models.generation import Generation
+        from models.post import Post
+        etag = self.client.get('/').headers['ETag']
+        self.assertEqual(self.client.get('/', headers={'If-None-Match': etag}).status_code, 304)
+
+        # as another worker would: write a post and bump the shared generation
+        with self.app.app_context():
+            db.session.add(Post(title='Fresh', content='content', user_id=self.author_id))
+            db.session.commit()
+            Generation.bump('feed')
+        response = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn('Fresh', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
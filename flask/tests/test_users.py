@@ -0,0 +1,67 @@
+"""The signed-in user, loaded through the identity cache (models.user)."""
+import unittest
+from sqlalchemy import inspect, update
+from benchmarks import count_queries
+from flask_app import db
+from flask_app.cache import user_cache
+from tests.test_pages import PagesTestCase
+
+
+class UserCacheTests(PagesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.create_user('writer')
+        self.login(self.user_id)
+
+    def cached(self):
+        return user_cache.get(self.user_id)
+
+    def test_second_request_loads_no_user(self):
+        self.client.get('/account')
+        self.assertEqual(set(self.cached()), {'id', 'username', 'email', 'image_file'})
+        with self.app.app_context():
+            engine = db.engine
+        with count_queries(engine) as statements:
+            self.assertEqual(self.client.get('/about').status_code, 200)
+        self.assertEqual(statements, [])
+
+    def test_follower_count_is_read_fresh(self):
+        from models.user import User
+        self.client.get('/account')
+        with self.app.app_context():
+            db.session.execute(update(User).where(User.id == self.user_id).values(follower_count=2))
+            db.session.commit()
+        self.assertIsNotNone(self.cached())
+        self.assertIn('2 followers', self.client.get('/user/writer').get_data(as_text=True))
+
+    def test_cached_user_is_merged_into_the_session(self):
+        from models.user import User, load_user
+        with self.app.test_request_context():
+            load_user(str(self.user_id))
+            db.session.remove()
+            user = load_user(str(self.user_id))
+            self.assertTrue(inspect(user).persistent)
+            self.assertIs(db.session.get(User, self.user_id), user)
+            # the columns left out of the cache load when first read
+            self.assertEqual(user.password, 'x')
+            user.email = 'new@example.com'
+            db.session.commit()
+        with self.app.app_context():
+            self.assertEqual(db.session.get(User, self.user_id).email, 'new@example.com')
+
+    def test_account_update_forgets_the_user(self):
+        self.client.get('/account')
+        response = self.client.post('/account', data={'username': 'renamed',
+                                                      'email': 'renamed@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(self.cached())
+        self.assertIn('renamed', self.client.get('/account').get_data(as_text=True))
+
+    def test_logout_forgets_the_user(self):
+        self.client.get('/account')
+        self.client.get('/logout')
+        self.assertIsNone(self.cached())
+
+
+if __name__ == '__main__':
+    unittest.main()